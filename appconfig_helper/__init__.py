@@ -1,3 +1,78 @@
-from .appconfig_helper import AppConfigHelper  # noqa: F401
+"""
+Sample helper library for AWS AppConfig
 
-__all__ = ["AppConfigHelper"]
+The classes and functions below are imported from their modules when they
+are first used, so that importing the package stays fast.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .agent import AgentClient  # noqa: F401
+    from .appconfig_helper import AppConfigHelper  # noqa: F401
+    from .async_helper import AsyncAppConfigHelper  # noqa: F401
+    from .broadcast import ConfigPublisher, ConfigSubscriber  # noqa: F401
+    from .deserializers import (  # noqa: F401
+        register_deserializer,
+        unregister_deserializer,
+        use_fast_json,
+    )
+    from .diff import ConfigDiff  # noqa: F401
+    from .feature_flags import FeatureFlags  # noqa: F401
+    from .manager import AppConfigManager, WarmUpResult  # noqa: F401
+    from .metrics import (  # noqa: F401
+        CallbackMetricsSink,
+        MetricsSink,
+        PrometheusMetricsSink,
+    )
+    from .middleware import (  # noqa: F401
+        AppConfigASGIMiddleware,
+        AppConfigWSGIMiddleware,
+    )
+    from .retry import CircuitBreaker, CircuitOpenError, RetryPolicy  # noqa: F401
+    from .schema import SchemaError, compile_schema  # noqa: F401
+    from .shared import SharedAppConfigHelper  # noqa: F401
+    from .snapshot import ConfigSnapshot  # noqa: F401
+
+_MODULES = {
+    "AgentClient": "agent",
+    "AppConfigASGIMiddleware": "middleware",
+    "AppConfigHelper": "appconfig_helper",
+    "AppConfigManager": "manager",
+    "AppConfigWSGIMiddleware": "middleware",
+    "AsyncAppConfigHelper": "async_helper",
+    "CallbackMetricsSink": "metrics",
+    "CircuitBreaker": "retry",
+    "CircuitOpenError": "retry",
+    "ConfigDiff": "diff",
+    "ConfigPublisher": "broadcast",
+    "ConfigSnapshot": "snapshot",
+    "ConfigSubscriber": "broadcast",
+    "FeatureFlags": "feature_flags",
+    "MetricsSink": "metrics",
+    "PrometheusMetricsSink": "metrics",
+    "RetryPolicy": "retry",
+    "SchemaError": "schema",
+    "SharedAppConfigHelper": "shared",
+    "WarmUpResult": "manager",
+    "compile_schema": "schema",
+    "register_deserializer": "deserializers",
+    "unregister_deserializer": "deserializers",
+    "use_fast_json": "deserializers",
+}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name: str) -> Any:
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_MODULES))
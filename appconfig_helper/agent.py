@@ -0,0 +1,176 @@
+"""
+Client for the AppConfig Agent's local HTTP endpoint
+"""
+
+import http.client
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+_ERROR_CODES = {
+    400: "BadRequestException",
+    404: "ResourceNotFoundException",
+    429: "ThrottlingException",
+}
+
+
+def _default_url() -> str:
+    port = os.environ.get("AWS_APPCONFIG_EXTENSION_HTTP_PORT", "2772")
+    return f"http://localhost:{port}"
+
+
+class _Body:
+    """Response body which hands the connection back to the pool once it has
+    been read to the end."""
+
+    __slots__ = ("_response", "_release")
+
+    def __init__(
+        self, response: http.client.HTTPResponse, release: Callable[[], None]
+    ) -> None:
+        self._response = response
+        self._release = release  # type: Optional[Callable[[], None]]
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._response.read() if size < 0 else self._response.read(size)
+        if self._release is not None and self._response.isclosed():
+            self._release()
+            self._release = None
+        return data
+
+
+class AgentClient:
+    """
+    Reads configuration from the AppConfig Agent, or the AppConfig Lambda
+    extension, rather than from the AppConfig Data API.
+
+    Pass it to `AppConfigHelper`, `AsyncAppConfigHelper` or `AppConfigManager`
+    as `client`, in place of a boto3 `appconfigdata` client. It provides
+    `start_configuration_session()` and `get_latest_configuration()` with
+    the same arguments and responses, implemented with requests to
+    `/applications/{application}/environments/{environment}/configurations/
+    {profile}` on `url`, so the helper needs no AWS credentials and creates
+    no boto3 client. The agent polls AppConfig itself, and always returns
+    the whole configuration; the helper recognises and skips a configuration
+    which has not changed.
+
+    `url` defaults to localhost on the port in the
+    `AWS_APPCONFIG_EXTENSION_HTTP_PORT` environment variable, or 2772.
+    Connections are kept alive and reused, up to `max_pool_connections`
+    idle ones at a time. Errors are raised as botocore `ClientError` and
+    `EndpointConnectionError`, so retries behave as they do with boto3, but
+    botocore is only imported if there is an error.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        timeout: float = 5.0,
+        max_pool_connections: int = 10,
+    ) -> None:
+        self.url = (url or _default_url()).rstrip("/")
+        parts = urlsplit(self.url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError("url must be an http:// URL")
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._timeout = timeout
+        self._max_pool_connections = max_pool_connections
+        self._pool: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for connection in pool:
+            connection.close()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._pool:
+                return self._pool.pop()
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._pool) < self._max_pool_connections:
+                self._pool.append(connection)
+                return
+        connection.close()
+
+    def start_configuration_session(self, **kwargs: Any) -> Dict[str, Any]:
+        """Return a token for the configuration profile. No request is made;
+        the token is the path of the profile on the agent."""
+        path = "/applications/{}/environments/{}/configurations/{}".format(
+            *(
+                quote(kwargs[name], safe="")
+                for name in (
+                    "ApplicationIdentifier",
+                    "EnvironmentIdentifier",
+                    "ConfigurationProfileIdentifier",
+                )
+            )
+        )
+        interval = kwargs.get("RequiredMinimumPollIntervalInSeconds", 60)
+        return {"InitialConfigurationToken": f"{interval}{path}"}
+
+    def get_latest_configuration(self, ConfigurationToken: str) -> Dict[str, Any]:
+        """Fetch the configuration from the agent."""
+        interval, slash, path = ConfigurationToken.partition("/")
+        path = slash + path
+        connection, response = self._request(path)
+        headers = response.headers
+        return {
+            "Configuration": _Body(response, lambda: self._release(connection)),
+            "ContentType": headers.get("Content-Type", "application/octet-stream"),
+            "NextPollConfigurationToken": ConfigurationToken,
+            "NextPollIntervalInSeconds": int(interval),
+            "VersionLabel": headers.get(
+                "Version-Label", headers.get("Configuration-Version")
+            ),
+        }
+
+    def _request(
+        self, path: str
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        connection = self._connection()
+        try:
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError):
+                # The agent closed an idle connection; retry on a new one.
+                connection.close()
+                connection.request("GET", path)
+                response = connection.getresponse()
+        except OSError as error:
+            import botocore.exceptions
+
+            connection.close()
+            raise botocore.exceptions.EndpointConnectionError(
+                endpoint_url=self.url + path, error=error
+            ) from error
+        if response.status != 200:
+            import botocore.exceptions
+
+            message = response.read().decode("utf-8", "replace").strip()
+            self._release(connection)
+            code = _ERROR_CODES.get(response.status, "InternalServerException")
+            raise botocore.exceptions.ClientError(
+                {
+                    "Error": {"Code": code, "Message": message},
+                    "ResponseMetadata": {
+                        "RequestId": "",
+                        "HostId": "",
+                        "HTTPStatusCode": response.status,
+                        "HTTPHeaders": {
+                            name.lower(): value for name, value in response.getheaders()
+                        },
+                        "RetryAttempts": 0,
+                    },
+                },
+                "GetLatestConfiguration",
+            )
+        return connection, response
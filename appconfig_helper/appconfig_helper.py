@@ -2,50 +2,177 @@
 AppConfig Helper class
 """
 
-import json
+import contextlib
+import contextvars
+import functools
+import hashlib
+import logging
+import os
+import random
+import threading
 import time
-from typing import Any, Dict, Optional, Union, cast
+from concurrent.futures import Executor, Future
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
-import boto3
-import botocore
+from . import metrics
+from .cache import CacheEntry, FileCache
+from .deserializers import deserialize, get_deserializer, streamable
+from .diff import ConfigDiff, diff_config
+from .history import ConfigHistory
+from .paths import Path, PathIndex
+from .retry import (
+    CircuitBreaker,
+    RetryPolicy,
+    client_errors,
+    is_connection_error,
+    is_throttling_error,
+)
+from .schema import compile_schema
+from .snapshot import EMPTY_SNAPSHOT, ConfigSnapshot, freeze
 
-try:
-    import yaml
+if TYPE_CHECKING:
+    import boto3
 
-    yaml_available = True
-except ImportError:
-    yaml_available = False
+logger = logging.getLogger(__name__)
 
+ChangeCallback = Callable[[Any, Any, ConfigDiff], None]
+ChangeListener = Tuple[ChangeCallback, Optional[Executor]]
 
-class AppConfigHelper:
-    """
-    AWS AppConfig Helper class.
+# Block size for reading configuration which is parsed as it arrives.
+READ_CHUNK_SIZE = 64 * 1024
 
-    Helps you fetch configuration from AWS AppConfig easily. Parses JSON and
-    YAML configurations into native Python dicts, and keeps plain text as
-    str.
 
-    `appconfig_application`, `appconfig_environment` and `appconfig_profile`
-    are the names or IDs of the AWS AppConfig application, environment and
-    profile (configuration) respectively.
+def _call_change_callback(
+    callback: ChangeCallback, old: Any, new: Any, diff: Callable[[], ConfigDiff]
+) -> None:
+    callback(old, new, diff())
 
-    `max_config_age` is the minimum interval in seconds between attempts to
-    update the configuration. Set it low enough that your application
-    receives new configuration in good time, but not so high that you are
-    unnecessarily polling the AWS AppConfig service. A minimum of 15 seconds
-    is enforced to help avoid throttling. Note that the value can be updated
-    internally by the response from AppConfig.
 
-    If you need to override credentials or AWS Region, set `session` to a
-    preconfigured `boto3.Session` object.
+def _change_callback_done(callback: ChangeCallback, future: "Future[None]") -> None:
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(
+            "AppConfig change callback %r failed",
+            callback,
+            exc_info=(type(error), error, error.__traceback__),
+        )
 
-    If `fetch_on_init` is set, attempt to fetch configuration when the
-    instance is created.
 
-    If `fetch_on_read` is set, every time the `config` property is read, the
-    configuration will be refreshed (if it has been at least `max_config_age`
-    seconds since the last refresh).
-    """
+def _create_client(
+    session: Optional["boto3.Session"], max_pool_connections: Optional[int] = None
+) -> Any:
+    import boto3
+    import botocore.config
+
+    # A single attempt at each request, so that `RetryPolicy` and
+    # `CircuitBreaker` are the only retries made.
+    options: Dict[str, Any] = {"retries": {"total_max_attempts": 1}}
+    if max_pool_connections is not None:
+        options["max_pool_connections"] = max_pool_connections
+    config = botocore.config.Config(**options)
+    if isinstance(session, boto3.Session):
+        return session.client("appconfigdata", config=config)
+    return boto3.client("appconfigdata", config=config)
+
+
+class _LazyClient:
+    """Stands in for an `appconfigdata` client, which is only created, with
+    boto3 imported, when it is first used."""
+
+    __slots__ = ("_session", "_max_pool_connections", "_client", "_lock")
+
+    def __init__(
+        self,
+        session: Optional["boto3.Session"],
+        max_pool_connections: Optional[int] = None,
+    ) -> None:
+        self._session = session
+        self._max_pool_connections = max_pool_connections
+        self._client = None  # type: Any
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = _create_client(
+                        self._session, self._max_pool_connections
+                    )
+                client = self._client
+        return getattr(client, name)
+
+
+class _HashingReader:
+    """File-like wrapper for a response body which keeps the SHA-256 digest
+    and size of everything read through it."""
+
+    __slots__ = ("_stream", "_hash", "size")
+
+    def __init__(self, stream: Any) -> None:
+        self._stream = stream
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size) if size >= 0 else self._stream.read()
+        self._hash.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        while self.read(READ_CHUNK_SIZE):
+            pass
+        return self._hash.hexdigest()
+
+
+class _Body(NamedTuple):
+    """A configuration response body, read and possibly already parsed."""
+
+    content: Optional[bytes]
+    size: int
+    digest: str
+    parsed: bool = False
+    config: Any = None
+    parse_seconds: float = 0.0
+    error: Optional[Exception] = None
+
+
+class _Pin(NamedTuple):
+    """A configuration version pinned for the current context."""
+
+    snapshot: ConfigSnapshot
+    path_index: PathIndex
+
+
+# The versions pinned by `pin()` in the current context, for each helper.
+_PINS: "contextvars.ContextVar[Optional[Dict[Any, _Pin]]]" = contextvars.ContextVar(
+    "appconfig_pins", default=None
+)
+
+
+class _AppConfigHelperBase:
+    """State and AppConfig Data API response handling shared by the helpers.
+
+    Subclasses set `_client`, decide when and how (in whichever style suits
+    them) to make the API calls, and hand the responses to the methods
+    here."""
+
+    _client = None  # type: Any
 
     def __init__(
         self,
@@ -53,31 +180,71 @@ class AppConfigHelper:
         appconfig_environment: str,
         appconfig_profile: str,
         max_config_age: int,
-        *,
-        session: Optional[boto3.Session] = None,
-        fetch_on_init: bool = False,
-        fetch_on_read: bool = False,
+        cache_dir: Union[None, str, "os.PathLike[str]"] = None,
+        frozen_config: bool = False,
+        metrics_sink: Optional[metrics.MetricsSink] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        poll_jitter: float = 0.0,
+        retain_raw_config: bool = True,
+        schema: Any = None,
+        history_size: int = 0,
+        history_bytes: Optional[int] = None,
     ) -> None:
-        if isinstance(session, boto3.Session):
-            self._client = session.client("appconfigdata")
-        else:
-            self._client = boto3.client("appconfigdata")
         self._appconfig_profile = appconfig_profile
         self._appconfig_environment = appconfig_environment
         self._appconfig_application = appconfig_application
         if max_config_age < 15:
             raise ValueError("max_config_age must be at least 15 seconds")
+        if not 0.0 <= poll_jitter <= 1.0:
+            raise ValueError("poll_jitter must be between 0 and 1")
+        if cache_dir is not None and not retain_raw_config:
+            raise ValueError("cache_dir requires retain_raw_config")
+        if schema is not None and frozen_config:
+            raise ValueError("schema and frozen_config are exclusive")
+        if history_size < 0:
+            raise ValueError("history_size must not be negative")
+        if history_bytes is not None and not history_size:
+            raise ValueError("history_bytes requires history_size")
         self._max_config_age = max_config_age
         self._last_update_time = 0.0
         self._config = None  # type: Union[None, Dict[Any, Any], str, bytes]
         self._raw_config = None  # type: Union[None, bytes]
+        self._config_digest = None  # type: Optional[str]
         self._content_type = None  # type: Union[None, str]
-        self._fetch_on_read = fetch_on_read
         self._next_config_token = None  # type: Optional[str]
         self._poll_interval = max_config_age
+        self._poll_jitter = poll_jitter
+        self._poll_offset = 0.0
+        # No refresh is due before this, after a failed one
+        self._retry_not_before = 0.0
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._circuit_breaker = circuit_breaker
         self._version_label = None  # type: Optional[str]
-        if fetch_on_init:
-            self.update_config()
+        self._path_index = PathIndex(None)
+        self._snapshot = EMPTY_SNAPSHOT
+        # The last version received, which differs from the one published
+        # after rollback().
+        self._latest = EMPTY_SNAPSHOT
+        self._history = None  # type: Optional[ConfigHistory]
+        if history_size:
+            self._history = ConfigHistory(history_size, history_bytes)
+        self._held = False
+        self._frozen_config = frozen_config
+        self._retain_raw_config = retain_raw_config
+        self._bind = None if schema is None else compile_schema(schema)
+        self._change_listeners = ()  # type: Tuple[ChangeListener, ...]
+        self._metrics = metrics_sink
+        self._metric_labels = {
+            "application": appconfig_application,
+            "environment": appconfig_environment,
+            "profile": appconfig_profile,
+        }
+        self._cache = None  # type: Optional[FileCache]
+        self._loaded_from_cache = False
+        if cache_dir is not None:
+            self._cache = FileCache(cache_dir)
+            self._load_cache()
 
     @property
     def appconfig_profile(self) -> str:
@@ -94,107 +261,919 @@ class AppConfigHelper:
         """The application in use."""
         return self._appconfig_application
 
-    @property
-    def config(self) -> Union[None, Dict[Any, Any], str, bytes]:
-        """The application configuration content.
-
-        If initialsed with `fetch_on_read` = True, will attempt to update the
-        config before returning it to you."""
-        if self._fetch_on_read:
-            self.update_config()
-        return self._config
-
     @property
     def raw_config(self) -> Union[None, bytes]:
         """The application configuration content retrieved from AppConfig.
 
         No processing is performed on this content. Accessing this property does not
-        trigger an update, even if `fetch_on_read` is True."""
+        trigger an update, even if `fetch_on_read` is True. It is None if the
+        helper was created with `retain_raw_config` = False."""
+        pin = self._pinned()
+        if pin is not None:
+            return pin.snapshot.raw_config
         return self._raw_config
 
+    @property
+    def config_digest(self) -> Optional[str]:
+        """The SHA-256 hex digest of `raw_config`.
+
+        Compare digests to cheaply tell whether two configurations differ."""
+        pin = self._pinned()
+        if pin is not None:
+            return pin.snapshot.config_digest
+        return self._config_digest
+
     @property
     def content_type(self) -> Union[None, str]:
         """The content type of the configuration retrieved from AppConfig."""
+        pin = self._pinned()
+        if pin is not None:
+            return pin.snapshot.content_type
         return self._content_type
 
     @property
     def version_label(self) -> Optional[str]:
         """The version label of the configuration retrieved from AppConfig."""
+        pin = self._pinned()
+        if pin is not None:
+            return pin.snapshot.version_label
         return self._version_label
 
-    def start_session(self) -> None:
-        """Start the config session and receive the next config token and poll interval"""
-        response = self._client.start_configuration_session(
-            ApplicationIdentifier=self._appconfig_application,
-            ConfigurationProfileIdentifier=self._appconfig_profile,
-            EnvironmentIdentifier=self._appconfig_environment,
-            RequiredMinimumPollIntervalInSeconds=self._max_config_age,
+    @property
+    def config_age(self) -> Optional[float]:
+        """Seconds since the configuration was last successfully checked with
+        AppConfig, or None if it never has been."""
+        if not self._last_update_time:
+            return None
+        return time.time() - self._last_update_time
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """The current configuration and its metadata, as one consistent
+        `ConfigSnapshot`.
+
+        Reading this property does not trigger an update."""
+        pin = self._pinned()
+        if pin is not None:
+            return pin.snapshot
+        return self._snapshot
+
+    def get(self, path: Path, default: Any = None) -> Any:
+        """Return a single value from the configuration.
+
+        `path` is a dotted path through nested mappings and lists, such as
+        "limits.default" or "regions.0", or a tuple of keys. Returns
+        `default` if there is no value at `path`. Results are remembered for
+        each version of the configuration, so repeated reads of the same path
+        are a single dict lookup."""
+        pins = _PINS.get()
+        if pins is not None and self in pins:
+            return pins[self].path_index.get(path, default)
+        self._refresh_on_read()
+        return self._path_index.get(path, default)
+
+    def _pinned(self) -> Optional[_Pin]:
+        pins = _PINS.get()
+        return None if pins is None else pins.get(self)
+
+    @contextlib.contextmanager
+    def _pin(self) -> Iterator[ConfigSnapshot]:
+        pins = _PINS.get() or {}
+        if self in pins:
+            yield pins[self].snapshot
+            return
+        snapshot = self._snapshot
+        path_index = self._path_index
+        if path_index._config is not snapshot.config:
+            # A new version was published between reading the two.
+            path_index = PathIndex(snapshot.config)
+        token = _PINS.set({**pins, self: _Pin(snapshot, path_index)})
+        try:
+            yield snapshot
+        finally:
+            _PINS.reset(token)
+
+    def _refresh_on_read(self) -> None:
+        """Called before the configuration is read; subclasses may update it."""
+
+    def on_change(
+        self, callback: ChangeCallback, executor: Optional[Executor] = None
+    ) -> ChangeCallback:
+        """Call `callback` each time a new version of configuration is received.
+
+        `callback` is called with the old configuration, the new
+        configuration and a `ConfigDiff` of the key paths which differ between
+        them. By default it is called synchronously by whichever thread
+        received the new version, after the new version has been published;
+        exceptions it raises are logged. Set `executor` to a
+        `concurrent.futures.Executor` to run it there instead, so that a slow
+        callback, or comparing large configurations, does not hold up
+        refreshing; its exceptions are logged there too.
+
+        Returns `callback`, so this can be used as a decorator."""
+        self._change_listeners = self._change_listeners + ((callback, executor),)
+        return callback
+
+    def remove_on_change(self, callback: ChangeCallback) -> None:
+        """Stop calling a callback registered with `on_change()`."""
+        self._change_listeners = tuple(
+            listener for listener in self._change_listeners if listener[0] != callback
         )
-        self._next_config_token = response["InitialConfigurationToken"]
-        self._poll_interval = self._max_config_age
 
-    def update_config(self, force_update: bool = False) -> bool:
-        """Request the lastest configration.
+    def _notify_change(self, old: Any, new: Any) -> None:
+        listeners = self._change_listeners
+        if not listeners:
+            return
+        # Computed once, by the first callback to run, so that callbacks on
+        # an executor do not hold up the thread which received the version.
+        diff = functools.lru_cache(maxsize=None)(
+            functools.partial(diff_config, old, new)
+        )
+        for callback, executor in listeners:
+            if executor is not None:
+                future = executor.submit(
+                    _call_change_callback, callback, old, new, diff
+                )
+                future.add_done_callback(
+                    functools.partial(_change_callback_done, callback)
+                )
+                continue
+            try:
+                _call_change_callback(callback, old, new, diff)
+            except Exception:
+                logger.exception("AppConfig change callback %r failed", callback)
 
-        `force_update`: set to True to request configuration event if it's not time yet
+    @property
+    def loaded_from_cache(self) -> bool:
+        """True if the configuration currently held was loaded from the
+        on-disk cache rather than received from AppConfig."""
+        return self._loaded_from_cache
 
-        Returns True if a new version of configuration was received. False
-        indicates that no attempt was made, or that no new version was found.
-        """
-        if (
-            time.time() - self._last_update_time < self._poll_interval
-        ) and not force_update:
+    def _load_cache(self) -> None:
+        assert self._cache is not None
+        entry = self._cache.load(
+            self._appconfig_application,
+            self._appconfig_environment,
+            self._appconfig_profile,
+        )
+        if entry is None:
+            return
+        try:
+            config = self._parse(entry.content, entry.content_type)
+        except (RuntimeError, ValueError):
+            logger.warning("Ignoring unparseable cached configuration", exc_info=True)
+            return
+        self._publish(
+            ConfigSnapshot(
+                config,
+                entry.content,
+                entry.content_type,
+                entry.version_label,
+                hashlib.sha256(entry.content).hexdigest(),
+            )
+        )
+        self._latest = self._snapshot
+        if self._history is not None:
+            self._history.add(self._snapshot, len(entry.content))
+        # Its age is that of the cached entry, so that it is served as
+        # configuration of that age rather than as no configuration at all.
+        self._last_update_time = min(entry.timestamp, time.time())
+        self._loaded_from_cache = True
+
+    def _store_cache(self) -> None:
+        latest = self._latest
+        assert self._cache is not None and latest.raw_config is not None
+        entry = CacheEntry(
+            latest.raw_config,
+            cast(str, latest.content_type),
+            latest.version_label,
+            self._last_update_time,
+        )
+        try:
+            self._cache.store(
+                self._appconfig_application,
+                self._appconfig_environment,
+                self._appconfig_profile,
+                entry,
+            )
+        except OSError:
+            logger.warning("Unable to write AppConfig cache file", exc_info=True)
+
+    def _parse(self, content: bytes, content_type: str) -> Any:
+        return self._convert(deserialize(content, content_type))
+
+    def _convert(self, config: Any) -> Any:
+        if self._bind is not None:
+            return self._bind(config)
+        if self._frozen_config:
+            config = freeze(config, self._config)
+        return config
+
+    def _publish(self, snapshot: ConfigSnapshot) -> None:
+        """Make a new version of the configuration visible to readers.
+
+        Everything is built before any reference is swapped, so readers never
+        see a partially built configuration."""
+        path_index = PathIndex(snapshot.config)
+        self._raw_config = snapshot.raw_config
+        self._config_digest = snapshot.config_digest
+        self._content_type = snapshot.content_type
+        self._version_label = snapshot.version_label
+        self._config = snapshot.config
+        self._path_index = path_index
+        self._snapshot = snapshot
+
+    @property
+    def history(self) -> Tuple[ConfigSnapshot, ...]:
+        """The versions of the configuration retained for `rollback()`,
+        most recently received first. Empty unless `history_size` is set."""
+        if self._history is None:
+            return ()
+        return self._history.snapshots()
+
+    @property
+    def held(self) -> bool:
+        """True if `rollback()` is holding a version in place of new ones."""
+        return self._held
+
+    def rollback(
+        self,
+        version_label: Optional[str] = None,
+        *,
+        digest: Optional[str] = None,
+        hold: bool = False,
+    ) -> ConfigSnapshot:
+        """Switch back to a version of the configuration in `history`.
+
+        With no arguments, switches to the version received before the
+        current one; calling it again steps back further. Otherwise switches
+        to the most recent version with `version_label` and/or `digest`. The
+        retained version is published as it is, without a request or parsing
+        it again, and `on_change()` callbacks are called.
+
+        The version stays in use until AppConfig delivers one which differs
+        from the last one received. With `hold`, it stays in use until
+        `release()` is called: versions received meanwhile are retained, but
+        not used, and `update_config()` returns False for them.
+
+        Returns the version now in use. Raises KeyError if there is no such
+        version in `history`, and RuntimeError if `history_size` is not set."""
+        if self._history is None:
+            raise RuntimeError("rollback requires history_size")
+        snapshot = self._history.find(
+            version_label, digest, before=self._snapshot.config_digest
+        )
+        self._held = hold
+        if snapshot is not self._snapshot:
+            old_config = self._config
+            self._publish(snapshot)
+            self._notify_change(old_config, snapshot.config)
+        return snapshot
+
+    def release(self) -> bool:
+        """Undo `rollback()`, switching to the last version received.
+
+        Returns True if the configuration changed."""
+        self._held = False
+        latest = self._latest
+        if latest is self._snapshot:
             return False
+        old_config = self._config
+        self._publish(latest)
+        self._notify_change(old_config, latest.config)
+        return True
+
+    def _increment(self, name: str, **labels: str) -> None:
+        if self._metrics is not None:
+            self._metrics.increment(name, 1, dict(self._metric_labels, **labels))
+
+    def _observe(self, name: str, value: float, **labels: str) -> None:
+        if self._metrics is not None:
+            self._metrics.observe(name, value, dict(self._metric_labels, **labels))
+
+    def _request_session(self) -> Mapping[str, Any]:
+        start = time.perf_counter()
+        response = self._client.start_configuration_session(
+            **self._session_parameters()
+        )
+        self._observe(metrics.SESSION_START_SECONDS, time.perf_counter() - start)
+        return cast(Mapping[str, Any], response)
+
+    def _get_latest_configuration(self) -> Tuple[Mapping[str, Any], _Body]:
+        start = time.perf_counter()
+        response = self._client.get_latest_configuration(
+            ConfigurationToken=self._next_config_token
+        )
+        body = self._read_body(response)
+        self._observe(metrics.GET_CONFIGURATION_SECONDS, time.perf_counter() - start)
+        return response, body
+
+    def _read_body(self, response: Mapping[str, Any]) -> _Body:
+        """Read the configuration from a response.
 
-        if self._next_config_token is None:
-            self.start_session()
+        If the raw configuration is not kept and it can be parsed from a
+        stream, it is parsed as it is read, so that the whole content is
+        never held in memory at once."""
+        stream = response["Configuration"]
+        deserializer = None
+        if not self._retain_raw_config:
+            deserializer = get_deserializer(response.get("ContentType") or "")
+        if deserializer is None or not streamable(deserializer):
+            content = stream.read()  # type: bytes
+            return _Body(content, len(content), hashlib.sha256(content).hexdigest())
 
+        reader = _HashingReader(stream)
+        start = time.perf_counter()
         try:
-            response = self._client.get_latest_configuration(
-                ConfigurationToken=self._next_config_token
+            config = deserializer(cast(bytes, reader))
+        except (RuntimeError, ValueError) as error:
+            return _Body(None, reader.size, reader.hexdigest(), True, error=error)
+        elapsed = time.perf_counter() - start
+        return _Body(None, reader.size, reader.hexdigest(), True, config, elapsed)
+
+    def _session_parameters(self) -> Dict[str, Any]:
+        return {
+            "ApplicationIdentifier": self._appconfig_application,
+            "ConfigurationProfileIdentifier": self._appconfig_profile,
+            "EnvironmentIdentifier": self._appconfig_environment,
+            "RequiredMinimumPollIntervalInSeconds": self._max_config_age,
+        }
+
+    def _handle_session_response(self, response: Mapping[str, Any]) -> None:
+        self._next_config_token = response["InitialConfigurationToken"]
+        self._set_poll_interval(self._max_config_age)
+
+    def _next_poll_time(self) -> float:
+        """When the configuration is next due for refresh, by `time.time()`."""
+        if self._loaded_from_cache:
+            # Check configuration loaded from the cache with AppConfig at once.
+            due = self._last_update_time
+        else:
+            due = self._last_update_time + self._poll_interval + self._poll_offset
+        return max(due, self._retry_not_before)
+
+    def _update_due(self, force_update: bool) -> bool:
+        return force_update or time.time() >= self._next_poll_time()
+
+    def _set_poll_interval(self, interval: int) -> None:
+        self._poll_interval = interval
+        # Spread the polls of many instances started together over time
+        self._poll_offset = random.uniform(0.0, self._poll_jitter * interval)
+
+    def _before_request(self) -> None:
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.before_call()
+
+    def _request_succeeded(self) -> None:
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_success()
+
+    def _request_failed(self) -> None:
+        # Any error, not only one from botocore, ends a half-open trial.
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_failure()
+
+    def _retry_delay(
+        self, error: Exception, attempt: int, starting_session: bool
+    ) -> Optional[float]:
+        """Return the number of seconds to wait before retrying after the
+        `attempt`th (from 0) request failed with `error`, or None to give up.
+        `starting_session` is True if the error is from starting a session.
+
+        Forgets the session token if a new session should be started."""
+        import botocore.exceptions
+
+        policy = self._retry_policy
+        delay = None  # type: Optional[float]
+        if attempt + 1 < policy.max_attempts:
+            if is_throttling_error(error) or is_connection_error(error):
+                delay = policy.delay(attempt)
+            elif isinstance(error, botocore.exceptions.ClientError):
+                if not starting_session:
+                    self._increment(metrics.SESSION_RESTARTS)
+                    self._next_config_token = None
+                    delay = policy.delay(attempt) if attempt else 0.0
+        return delay
+
+    def _record_poll(self, result: str) -> None:
+        if self._metrics is not None:
+            self._metrics.increment(
+                metrics.POLLS, 1, dict(self._metric_labels, result=result)
             )
-        except botocore.exceptions.ClientError:
-            self.start_session()
-            response = self._client.get_latest_configuration(
-                ConfigurationToken=self._next_config_token
+            self._metrics.gauge(
+                metrics.LAST_UPDATE_TIMESTAMP,
+                self._last_update_time,
+                self._metric_labels,
             )
 
+    def _handle_configuration_response(
+        self, response: Mapping[str, Any], body: _Body
+    ) -> bool:
+        """Process a GetLatestConfiguration response whose body has been read.
+
+        Returns True if a new version of configuration was received."""
         self._next_config_token = response["NextPollConfigurationToken"]
-        self._poll_interval = int(response["NextPollIntervalInSeconds"])
+        self._set_poll_interval(int(response["NextPollIntervalInSeconds"]))
 
-        content = response["Configuration"].read()  # type: bytes
-        if content == b"":
+        if body.size == 0:
             self._last_update_time = time.time()
+            self._record_poll("empty")
             return False
 
-        if response["ContentType"] == "application/x-yaml":
-            if not yaml_available:
-                raise RuntimeError(
-                    "Configuration in YAML format received and missing "
-                    "yaml library; pip install pyyaml?"
-                )
-            try:
-                self._config = yaml.safe_load(content)
-            except yaml.YAMLError as error:
-                message = "Unable to parse YAML configuration data"
-                if hasattr(error, "problem_mark"):
-                    message = (
-                        f"{message} at line {error.problem_mark.line + 1} "
-                        f"column {error.problem_mark.column + 1}"
-                    )
-                raise ValueError(message) from error
-        elif response["ContentType"] == "application/json":
-            try:
-                self._config = json.loads(content.decode("utf-8"))
-            except json.JSONDecodeError as error:
-                raise ValueError(error.msg) from error
-        elif response["ContentType"] == "text/plain":
-            self._config = content.decode("utf-8")
-        else:
-            self._config = content
+        content_type = response["ContentType"]
+        digest = body.digest
+        latest = self._latest
+        if digest == latest.config_digest and content_type == latest.content_type:
+            # Identical to the configuration we already have, for example
+            # after a new session was started; skip parsing it again, but
+            # keep the label it now has.
+            version_label = cast(Optional[str], response.get("VersionLabel"))
+            self._last_update_time = time.time()
+            self._loaded_from_cache = False
+            if version_label != latest.version_label:
+                relabelled = latest._replace(version_label=version_label)
+                if self._history is not None:
+                    self._history.add(relabelled, body.size)
+                self._latest = relabelled
+                if self._snapshot is latest:
+                    self._publish(relabelled)
+                if self._cache is not None:
+                    self._store_cache()
+            self._record_poll("unchanged")
+            return False
 
+        version_label = cast(Optional[str], response.get("VersionLabel"))
+        retained = None
+        if self._history is not None:
+            retained = self._history.get(digest)
+        if retained is not None and retained.content_type == content_type:
+            # A version received before, such as after a rollback in
+            # AppConfig; reuse it rather than parsing it again.
+            snapshot = retained._replace(version_label=version_label)
+        else:
+            if body.error is not None:
+                raise body.error
+            start = time.perf_counter()
+            if body.parsed:
+                config = self._convert(body.config)
+            else:
+                config = self._parse(cast(bytes, body.content), content_type)
+            self._observe(
+                metrics.PARSE_SECONDS,
+                time.perf_counter() - start + body.parse_seconds,
+                content_type=content_type,
+            )
+            snapshot = ConfigSnapshot(
+                config,
+                body.content if self._retain_raw_config else None,
+                content_type,
+                version_label,
+                digest,
+            )
+        if self._history is not None:
+            self._history.add(snapshot, body.size)
+        self._latest = snapshot
+        old_config = self._config
+        if not self._held:
+            self._publish(snapshot)
         self._last_update_time = time.time()
-        self._raw_config = content
-        self._content_type = response["ContentType"]
-        self._version_label = cast(Optional[str], response.get("VersionLabel"))
+        self._loaded_from_cache = False
+        self._record_poll("new")
+        if self._metrics is not None:
+            self._metrics.observe(metrics.PAYLOAD_BYTES, body.size, self._metric_labels)
+        if self._cache is not None:
+            self._store_cache()
+        if self._held:
+            return False
+        self._notify_change(old_config, snapshot.config)
         return True
+
+
+class _Refresh:
+    """The outcome of an update in progress, for threads waiting on it."""
+
+    __slots__ = ("_done", "result", "error")
+
+    def __init__(self) -> None:
+        self._done = threading.Event()
+        self.result = False
+        self.error = None  # type: Optional[BaseException]
+
+    def finish(self, result: bool, error: Optional[BaseException] = None) -> None:
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def wait(self) -> bool:
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class AppConfigHelper(_AppConfigHelperBase):
+    """
+    AWS AppConfig Helper class.
+
+    Helps you fetch configuration from AWS AppConfig easily. Parses JSON and
+    YAML configurations into native Python dicts, and keeps plain text as
+    str. Other content types can be parsed by registering a deserializer
+    with `register_deserializer()`.
+
+    `appconfig_application`, `appconfig_environment` and `appconfig_profile`
+    are the names or IDs of the AWS AppConfig application, environment and
+    profile (configuration) respectively.
+
+    `max_config_age` is the minimum interval in seconds between attempts to
+    update the configuration. Set it low enough that your application
+    receives new configuration in good time, but not so high that you are
+    unnecessarily polling the AWS AppConfig service. A minimum of 15 seconds
+    is enforced to help avoid throttling. Note that the value can be updated
+    internally by the response from AppConfig.
+
+    If you need to override credentials or AWS Region, set `session` to a
+    preconfigured `boto3.Session` object. Alternatively set `client` to an
+    existing `appconfigdata` client, for example to share one client and its
+    connection pool between several helpers.
+
+    If `fetch_on_init` is set, attempt to fetch configuration when the
+    instance is created.
+
+    If `frozen_config` is set, JSON and YAML configurations are converted
+    once per version into read-only structures (`MappingProxyType` views and
+    tuples), so `config` can be shared between threads without copying and
+    cannot be modified by callers. `snapshot` holds the configuration and its
+    metadata together, so a request can use one consistent version
+    throughout.
+
+    If `schema` is set to a dataclass, `NamedTuple` or `TypedDict`, each
+    version of the configuration is converted once into an instance of it,
+    which `config` returns, so values can be read as attributes. A version
+    which does not match the schema is rejected with `SchemaError` before
+    it replaces the current configuration. See `compile_schema()` for the
+    field types supported. It cannot be combined with `frozen_config`.
+
+    If `retain_raw_config` is False, `raw_config` is not kept once the
+    configuration has been parsed, and YAML configuration is parsed as it
+    is read from the response, so the whole document is never held in
+    memory. The tradeoff is that its digest is only known once it has been
+    parsed, so YAML identical to the current version is parsed again before
+    being recognised and discarded, rather than skipped. It cannot be
+    combined with `cache_dir`.
+
+    If `history_size` is set, up to that many versions of the configuration
+    are kept parsed in `history`, and `rollback()` switches back to any of
+    them at once, without a request or parsing. A version AppConfig delivers
+    again is reused from the history rather than parsed. Set `history_bytes`
+    to also limit the total size of the versions kept, measured as received;
+    the oldest are dropped first.
+
+    If `metrics_sink` is set to a `MetricsSink`, request latencies, parse
+    times, payload sizes, poll results and session restarts are reported to
+    it. See `MetricsSink` for details.
+
+    If `cache_dir` is set, each configuration received is also written to a
+    file in that directory, and the last one written is loaded when the
+    instance is created. This makes the last known good configuration
+    available immediately, even if AppConfig cannot be reached. When it is
+    loaded, `fetch_on_init` is skipped and the configuration is refreshed by
+    the next update instead. Until then, its age is that of the file, so
+    `stale_if_error` and `max_staleness` apply to it as to configuration
+    received from AppConfig.
+
+    If `fetch_on_read` is set, every time the `config` property is read, the
+    configuration will be refreshed (if it has been at least `max_config_age`
+    seconds since the last refresh).
+
+    With `fetch_on_read`, the policy for serving configuration which is due
+    for refresh can be relaxed:
+
+    * `stale_while_revalidate`: return the current configuration at once and
+      refresh it on another thread, so reads never wait on AppConfig
+    * `stale_if_error`: if a refresh fails, keep returning the current
+      configuration for up to this many seconds after the first of
+      consecutive failures, rather than raising the error
+
+    `max_staleness` bounds both: once the configuration was last refreshed
+    more than `max_staleness` seconds ago, reads refresh it before returning
+    and raise any error.
+
+    After a refresh fails, no other is attempted until a backoff delay from
+    `retry_policy` has passed, longer after each consecutive failure.
+    Meanwhile reads return the current configuration, or raise the error
+    again where they would have raised it, without calling AppConfig.
+
+    Failed requests are retried according to `retry_policy`, by default a
+    `RetryPolicy()`: throttling and connection errors are retried after a
+    randomised exponential backoff, and other errors from
+    GetLatestConfiguration start a new session. These are the only retries:
+    a client the helper creates makes a single attempt at each request.
+    Create a `client` you supply with
+    `botocore.config.Config(retries={"total_max_attempts": 1})` too, or
+    botocore's own retries are made within each attempt. Set
+    `circuit_breaker` to a
+    `CircuitBreaker` to stop calling AppConfig for a while after repeated
+    failures; updates raise `CircuitOpenError` meanwhile. Set `poll_jitter`
+    to a fraction, such as 0.1, to add a random delay of up to that fraction
+    of the poll interval to each poll, so that instances started together
+    do not poll together.
+
+    Only one update runs at a time. While one is in progress, other threads
+    calling `update_config()` return False straight away and carry on with
+    the current configuration, unless they pass `wait=True`.
+
+    If `background_refresh` is set, a daemon thread keeps the configuration
+    up to date, honouring the poll interval returned by AppConfig, so reading
+    `config` never waits on the network. The thread can also be managed with
+    `start_background_refresh()` and `stop_background_refresh()`, or by using
+    the instance as a context manager. While the thread runs, reads do not
+    refresh the configuration even if `fetch_on_read` is set; if the thread
+    is stopped, they refresh it again.
+    """
+
+    def __init__(
+        self,
+        appconfig_application: str,
+        appconfig_environment: str,
+        appconfig_profile: str,
+        max_config_age: int,
+        *,
+        session: Optional["boto3.Session"] = None,
+        client: Optional[Any] = None,
+        fetch_on_init: bool = False,
+        fetch_on_read: bool = False,
+        background_refresh: bool = False,
+        cache_dir: Union[None, str, "os.PathLike[str]"] = None,
+        frozen_config: bool = False,
+        metrics_sink: Optional[metrics.MetricsSink] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        poll_jitter: float = 0.0,
+        retain_raw_config: bool = True,
+        schema: Any = None,
+        history_size: int = 0,
+        history_bytes: Optional[int] = None,
+        stale_while_revalidate: bool = False,
+        stale_if_error: float = 0.0,
+        max_staleness: Optional[float] = None,
+    ) -> None:
+        self._client = client if client is not None else _LazyClient(session)
+        super().__init__(
+            appconfig_application,
+            appconfig_environment,
+            appconfig_profile,
+            max_config_age,
+            cache_dir,
+            frozen_config,
+            metrics_sink,
+            retry_policy,
+            circuit_breaker,
+            poll_jitter,
+            retain_raw_config,
+            schema,
+            history_size,
+            history_bytes,
+        )
+        if (stale_while_revalidate or stale_if_error) and not fetch_on_read:
+            raise ValueError(
+                "stale_while_revalidate and stale_if_error require fetch_on_read"
+            )
+        if stale_if_error < 0:
+            raise ValueError("stale_if_error must not be negative")
+        if max_staleness is not None and max_staleness < max_config_age:
+            raise ValueError("max_staleness must be at least max_config_age")
+        self._fetch_on_read = fetch_on_read
+        self._stale_while_revalidate = stale_while_revalidate
+        self._stale_if_error = stale_if_error
+        self._max_staleness = max_staleness
+        self._failing_since = None  # type: Optional[float]
+        self._failures = 0
+        self._refresh_error = None  # type: Optional[Tuple[Exception, Any]]
+        self._refresh_thread = None  # type: Optional[threading.Thread]
+        # Each thread has its own event, so that a thread which is slow to
+        # stop is not revived by starting another.
+        self._refresh_stop = threading.Event()
+        self._update_lock = threading.Lock()
+        self._in_flight = None  # type: Optional[_Refresh]
+        if fetch_on_init and not self._loaded_from_cache:
+            self.update_config()
+        if background_refresh:
+            self.start_background_refresh()
+
+    def __enter__(self) -> "AppConfigHelper":
+        self.start_background_refresh()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop_background_refresh()
+
+    @property
+    def config(self) -> Union[None, Dict[Any, Any], str, bytes]:
+        """The application configuration content.
+
+        If initialsed with `fetch_on_read` = True, will attempt to update the
+        config before returning it to you, unless the background refresh
+        thread is running. Inside `pin()`, returns the pinned version."""
+        pins = _PINS.get()
+        if pins is not None and self in pins:
+            return pins[self].snapshot.config
+        self._refresh_on_read()
+        return self._config
+
+    @contextlib.contextmanager
+    def pin(self) -> Iterator[ConfigSnapshot]:
+        """Use one version of the configuration for the duration of a request.
+
+        Refreshes the configuration if it is due, as reading `config` would,
+        then pins the current version to the calling context (the thread, or
+        the asyncio task) until the block exits. Meanwhile `config`, `get()`,
+        `snapshot` and the metadata properties return the pinned version
+        without checking for updates, however often they are read. Yields the
+        pinned `ConfigSnapshot`. Pinning a helper which is already pinned in
+        this context keeps the existing pin."""
+        if self._pinned() is None:
+            self._refresh_on_read()
+        with self._pin() as snapshot:
+            yield snapshot
+
+    def _refresh_on_read(self) -> None:
+        if not self._fetch_on_read or self._refresh_thread is not None:
+            return
+        if time.time() < self._next_poll_time():
+            failed = self._refresh_error
+            if failed is not None and not self._may_serve_stale():
+                # Backing off after a failed refresh which this read would
+                # have raised; raise it again rather than calling AppConfig.
+                raise failed[0].with_traceback(failed[1])
+            return
+        expired = self._expired()
+        if self._stale_while_revalidate and not expired:
+            if self._in_flight is None and self._update_due(False):
+                threading.Thread(
+                    target=self._revalidate,
+                    name=f"appconfig-revalidate-{self._appconfig_profile}",
+                    daemon=True,
+                ).start()
+            return
+        try:
+            self.update_config(wait=expired)
+        except Exception:
+            if expired or not self._within_stale_if_error():
+                raise
+            logger.warning(
+                "Serving stale AppConfig configuration after refresh failed",
+                exc_info=True,
+            )
+
+    def _expired(self) -> bool:
+        """True if there is no configuration yet, or it is older than
+        `max_staleness` allows."""
+        if not self._last_update_time:
+            return True
+        if self._max_staleness is None:
+            return False
+        return time.time() - self._last_update_time > self._max_staleness
+
+    def _may_serve_stale(self) -> bool:
+        """True if a read may return the current configuration rather than
+        raising the error from the last refresh."""
+        if self._expired():
+            return False
+        return self._stale_while_revalidate or self._within_stale_if_error()
+
+    def _within_stale_if_error(self) -> bool:
+        failing_since = self._failing_since
+        if failing_since is None:
+            return False
+        return time.time() - failing_since <= self._stale_if_error
+
+    def _revalidate(self) -> None:
+        try:
+            self.update_config()
+        except Exception:
+            logger.exception("Revalidating AppConfig configuration failed")
+
+    @property
+    def background_refresh_running(self) -> bool:
+        """True if the background refresh thread is running."""
+        return self._refresh_thread is not None
+
+    def start_background_refresh(self) -> None:
+        """Start the background refresh thread, if it is not already running."""
+        if self._refresh_thread is not None:
+            return
+        stop = self._refresh_stop = threading.Event()
+        thread = threading.Thread(
+            target=self._background_refresh,
+            args=(stop,),
+            name=f"appconfig-refresh-{self._appconfig_profile}",
+            daemon=True,
+        )
+        self._refresh_thread = thread
+        thread.start()
+
+    def stop_background_refresh(self, timeout: Optional[float] = None) -> None:
+        """Stop the background refresh thread and wait for it to exit.
+
+        `timeout`: maximum number of seconds to wait for the thread"""
+        thread = self._refresh_thread
+        if thread is None:
+            return
+        self._refresh_stop.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self._refresh_thread = None
+
+    def _background_refresh(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                self.update_config()
+                delay = self._next_poll_time() - time.time()
+            except Exception:
+                logger.exception("Background refresh of AppConfig configuration failed")
+                delay = self._poll_interval
+            stop.wait(max(delay, 0.0))
+
+    def start_session(self) -> None:
+        """Start the config session and receive the next config token and poll interval"""
+        self._handle_session_response(self._request_session())
+
+    def update_config(self, force_update: bool = False, wait: bool = False) -> bool:
+        """Request the lastest configration.
+
+        `force_update`: set to True to request configuration event if it's not time yet
+
+        `wait`: if another thread is already updating the configuration, set
+        to True to wait for it to finish and return its result, rather than
+        returning False immediately. Errors from that update are raised.
+
+        Returns True if a new version of configuration was received. False
+        indicates that no attempt was made, or that no new version was found.
+        """
+        if not self._update_due(force_update):
+            return False
+
+        with self._update_lock:
+            refresh = self._in_flight
+            if refresh is None:
+                # Another thread may have finished an update since the check
+                if not self._update_due(force_update):
+                    return False
+                self._in_flight = owned = _Refresh()
+            else:
+                owned = None
+        if owned is None:
+            assert refresh is not None
+            return refresh.wait() if wait else False
+
+        try:
+            result = self._update()
+        except BaseException as error:
+            if self._failing_since is None:
+                self._failing_since = time.time()
+            if isinstance(error, Exception):
+                self._back_off(error)
+            owned.finish(False, error)
+            raise
+        else:
+            self._failing_since = None
+            self._failures = 0
+            self._refresh_error = None
+            self._retry_not_before = 0.0
+            owned.finish(result)
+        finally:
+            with self._update_lock:
+                self._in_flight = None
+        return result
+
+    def _back_off(self, error: Exception) -> None:
+        """Hold off refreshing for a while after a failed refresh, for a
+        delay from `retry_policy` which grows with each consecutive failure,
+        so that frequent reads do not each call AppConfig while it fails."""
+        self._refresh_error = (error, error.__traceback__)
+        self._retry_not_before = time.time() + self._retry_policy.delay(self._failures)
+        self._failures += 1
+
+    def _update(self) -> bool:
+        self._before_request()
+        attempt = 0
+        try:
+            while True:
+                starting_session = self._next_config_token is None
+                try:
+                    if starting_session:
+                        self.start_session()
+                        starting_session = False
+                    response, body = self._get_latest_configuration()
+                    break
+                except client_errors() as error:
+                    delay = self._retry_delay(error, attempt, starting_session)
+                    if delay is None:
+                        raise
+                attempt += 1
+                time.sleep(delay)
+        except BaseException:
+            self._request_failed()
+            raise
+        self._request_succeeded()
+        return self._handle_configuration_response(response, body)
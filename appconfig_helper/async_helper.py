@@ -0,0 +1,223 @@
+"""
+AppConfig Helper class for asyncio applications
+"""
+
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import time
+from concurrent.futures import Executor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from . import metrics
+from .appconfig_helper import _PINS, _AppConfigHelperBase, _LazyClient
+from .retry import CircuitBreaker, RetryPolicy, client_errors
+from .snapshot import ConfigSnapshot
+
+if TYPE_CHECKING:
+    import boto3
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncAppConfigHelper(_AppConfigHelperBase):
+    """
+    AWS AppConfig Helper class for asyncio applications.
+
+    Works like `AppConfigHelper`, but `start_session()` and `update_config()`
+    are coroutines. The blocking boto3 calls, including reading the response
+    body, and parsing, caching and `on_change()` callbacks for a new version,
+    are run in an executor so the event loop is never stalled waiting on AWS
+    AppConfig. Concurrent calls to `update_config()` share a single request,
+    and its result or error.
+
+    `appconfig_application`, `appconfig_environment`, `appconfig_profile`,
+    `max_config_age`, `session`, `client`, `cache_dir`, `frozen_config`,
+    `metrics_sink`, `retry_policy`, `circuit_breaker`, `poll_jitter`,
+    `retain_raw_config`, `schema`, `history_size` and `history_bytes` have
+    the same meaning as for `AppConfigHelper`.
+
+    `executor` is the `concurrent.futures.Executor` used for the boto3 calls.
+    By default the event loop's default executor is used.
+
+    Call `start_polling()` to have an asyncio task keep the configuration up
+    to date in the background, or use the instance as an async context
+    manager. Reading `config` never triggers a request.
+    """
+
+    def __init__(
+        self,
+        appconfig_application: str,
+        appconfig_environment: str,
+        appconfig_profile: str,
+        max_config_age: int,
+        *,
+        session: Optional["boto3.Session"] = None,
+        client: Optional[Any] = None,
+        executor: Optional[Executor] = None,
+        cache_dir: Union[None, str, "os.PathLike[str]"] = None,
+        frozen_config: bool = False,
+        metrics_sink: Optional[metrics.MetricsSink] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        poll_jitter: float = 0.0,
+        retain_raw_config: bool = True,
+        schema: Any = None,
+        history_size: int = 0,
+        history_bytes: Optional[int] = None,
+    ) -> None:
+        self._client = client if client is not None else _LazyClient(session)
+        super().__init__(
+            appconfig_application,
+            appconfig_environment,
+            appconfig_profile,
+            max_config_age,
+            cache_dir,
+            frozen_config,
+            metrics_sink,
+            retry_policy,
+            circuit_breaker,
+            poll_jitter,
+            retain_raw_config,
+            schema,
+            history_size,
+            history_bytes,
+        )
+        self._executor = executor
+        self._in_flight = None  # type: Optional[asyncio.Task[bool]]
+        self._poll_task = None  # type: Optional[asyncio.Task[None]]
+
+    async def __aenter__(self) -> "AsyncAppConfigHelper":
+        self.start_polling()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop_polling()
+
+    @property
+    def config(self) -> Union[None, Dict[Any, Any], str, bytes]:
+        """The application configuration content. Inside `pin()`, the pinned
+        version."""
+        pins = _PINS.get()
+        if pins is not None and self in pins:
+            return pins[self].snapshot.config
+        return self._config
+
+    @contextlib.asynccontextmanager
+    async def pin(self) -> AsyncIterator[ConfigSnapshot]:  # type: ignore[override]
+        """Use one version of the configuration for the duration of a request.
+
+        The same as `AppConfigHelper.pin()`, but used with `async with`:
+        awaits `update_config()` if an update is due, then pins the current
+        version to the calling task until the block exits."""
+        if self._pinned() is None:
+            await self.update_config()
+        with self._pin() as snapshot:
+            yield snapshot
+
+    @property
+    def polling(self) -> bool:
+        """True if the background polling task is running."""
+        return self._poll_task is not None and not self._poll_task.done()
+
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def start_session(self) -> None:
+        """Start the config session and receive the next config token and poll interval"""
+        self._handle_session_response(await self._run(self._request_session))
+
+    async def update_config(self, force_update: bool = False) -> bool:
+        """Request the lastest configration.
+
+        `force_update`: set to True to request configuration event if it's not time yet
+
+        Returns True if a new version of configuration was received. False
+        indicates that no attempt was made, or that no new version was found.
+        """
+        update = self._in_flight
+        if update is None:
+            if not self._update_due(force_update):
+                return False
+            update = asyncio.get_running_loop().create_task(self._update())
+            update.add_done_callback(self._update_done)
+            self._in_flight = update
+        # A caller which is cancelled does not cancel the update the others
+        # are waiting for.
+        return await asyncio.shield(update)
+
+    def _update_done(self, update: "asyncio.Task[bool]") -> None:
+        self._in_flight = None
+        if not update.cancelled():
+            # Mark the error as retrieved, in case every caller was cancelled.
+            update.exception()
+
+    async def _update(self) -> bool:
+        self._before_request()
+        attempt = 0
+        try:
+            while True:
+                starting_session = self._next_config_token is None
+                try:
+                    if starting_session:
+                        await self.start_session()
+                        starting_session = False
+                    response, body = await self._run(self._get_latest_configuration)
+                    break
+                except client_errors() as error:
+                    delay = self._retry_delay(error, attempt, starting_session)
+                    if delay is None:
+                        raise
+                attempt += 1
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._request_failed()
+            raise
+        self._request_succeeded()
+        # Parsing, writing the cache and change callbacks may all be slow.
+        return await self._run(self._handle_configuration_response, response, body)
+
+    def start_polling(self) -> "asyncio.Task[None]":
+        """Start a task on the running event loop which keeps the configuration
+        up to date, if it is not already running."""
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll())
+        return self._poll_task
+
+    async def stop_polling(self) -> None:
+        """Cancel the background polling task and wait for it to finish."""
+        task = self._poll_task
+        self._poll_task = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self.update_config()
+                delay = self._next_poll_time() - time.time()
+            except Exception:
+                logger.exception("Background refresh of AppConfig configuration failed")
+                delay = self._poll_interval
+            await asyncio.sleep(max(delay, 0.0))
@@ -0,0 +1,428 @@
+"""
+Pushing configuration to other processes over a Unix domain socket
+"""
+
+import hashlib
+import logging
+import os
+import select
+import socket
+import stat
+import struct
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from .appconfig_helper import _AppConfigHelperBase
+from .deserializers import deserialize
+from .paths import Path, PathIndex
+from .snapshot import EMPTY_SNAPSHOT, ConfigSnapshot
+
+logger = logging.getLogger(__name__)
+
+# magic, layout version, content length, content type length,
+# version label length, SHA-256 digest of the content
+_HEADER = struct.Struct("<4sIQHH32s")
+_MAGIC = b"ACFP"
+_LAYOUT_VERSION = 1
+_NO_VERSION_LABEL = 0xFFFF
+
+
+def _encode(snapshot: ConfigSnapshot) -> bytes:
+    content = snapshot.raw_config or b""
+    content_type = (snapshot.content_type or "").encode("utf-8")
+    if snapshot.version_label is None:
+        version_label = b""
+        version_label_length = _NO_VERSION_LABEL
+    else:
+        version_label = snapshot.version_label.encode("utf-8")
+        version_label_length = len(version_label)
+    header = _HEADER.pack(
+        _MAGIC,
+        _LAYOUT_VERSION,
+        len(content),
+        len(content_type),
+        version_label_length,
+        bytes.fromhex(snapshot.config_digest or hashlib.sha256(content).hexdigest()),
+    )
+    return header + content_type + version_label + content
+
+
+def _receive(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly `size` bytes, or return None if the connection closed."""
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def _require_unix_sockets(name: str) -> None:
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError(f"{name} requires Unix domain sockets")
+
+
+class ConfigPublisher:
+    """
+    Pushes each version of a helper's configuration to `ConfigSubscriber`s in
+    other processes, over a Unix domain socket at `path`.
+
+    `helper` is an `AppConfigHelper` or `AsyncAppConfigHelper`, which owns
+    the AppConfig session and is kept up to date as usual, for example with
+    `background_refresh`. Each time it receives a new version, or switches
+    version with `rollback()`, the raw configuration and its metadata are
+    sent to every connected subscriber. A subscriber which connects is sent
+    the current version straight away. A subscriber which does not accept a
+    version within `send_timeout` seconds is disconnected, and reconnects.
+    Versions are sent by the publisher's own thread, so a slow subscriber
+    never holds up the helper; if several versions arrive while it is
+    sending, only the latest is sent next.
+
+    The socket is created with permissions `mode`; the processes subscribing
+    need write access to it. Raises RuntimeError if another publisher is
+    listening at `path`, and FileExistsError if something other than a
+    socket is there. The helper must keep its raw configuration, so it
+    cannot be created with `retain_raw_config` = False.
+
+    Call `close()`, or use the instance as a context manager, to stop
+    publishing and remove the socket.
+    """
+
+    def __init__(
+        self,
+        helper: _AppConfigHelperBase,
+        path: Union[str, "os.PathLike[str]"],
+        *,
+        mode: int = 0o600,
+        send_timeout: float = 1.0,
+    ) -> None:
+        _require_unix_sockets("ConfigPublisher")
+        if not helper._retain_raw_config:
+            raise ValueError("ConfigPublisher requires retain_raw_config")
+        self._helper = helper
+        self._path = os.fspath(path)
+        self._send_timeout = send_timeout
+        # Only used by the publisher thread, until it has stopped.
+        self._subscribers: List[socket.socket] = []
+        self._pending = threading.Event()
+        self._closed = threading.Event()
+        self._server = self._listen(mode)
+        # Written to wake the publisher thread when there is a version to
+        # send, or it should stop.
+        self._wake_receiver, self._wake_sender = socket.socketpair()
+        self._wake_sender.setblocking(False)
+        helper.on_change(self._on_change)
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"appconfig-publisher-{helper.appconfig_profile}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "ConfigPublisher":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def path(self) -> str:
+        """The path of the socket."""
+        return self._path
+
+    @property
+    def subscribers(self) -> int:
+        """The number of subscribers connected."""
+        return len(self._subscribers)
+
+    def _listen(self, mode: int) -> socket.socket:
+        if os.path.exists(self._path):
+            if not stat.S_ISSOCK(os.stat(self._path).st_mode):
+                raise FileExistsError(f"{self._path} exists and is not a socket")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self._path)
+            except OSError:
+                # Left behind by a publisher which has exited.
+                os.unlink(self._path)
+            else:
+                raise RuntimeError(f"A publisher is already listening at {self._path}")
+            finally:
+                probe.close()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(self._path)
+            os.chmod(self._path, mode)
+            server.listen()
+            server.setblocking(False)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def _wake(self) -> None:
+        try:
+            self._wake_sender.send(b"\0")
+        except BlockingIOError:
+            # The thread has plenty of wake ups waiting already.
+            pass
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            readable, _, _ = select.select([self._server, self._wake_receiver], [], [])
+            if self._wake_receiver in readable:
+                self._wake_receiver.recv(4096)
+            if self._pending.is_set():
+                # Cleared first, so a version published while this one is
+                # being sent is sent next.
+                self._pending.clear()
+                self._broadcast()
+            if self._server in readable and not self._accept():
+                return
+
+    def _accept(self) -> bool:
+        """Accept a subscriber and send it the current version; returns
+        False if the server socket failed."""
+        try:
+            sock, _ = self._server.accept()
+        except BlockingIOError:
+            return True
+        except OSError:
+            if not self._closed.is_set():
+                logger.exception("Accepting AppConfig subscriber failed")
+            return False
+        sock.settimeout(self._send_timeout)
+        snapshot = self._helper._snapshot
+        if snapshot.config_digest is None or self._send(sock, _encode(snapshot)):
+            self._subscribers.append(sock)
+        return True
+
+    def _broadcast(self) -> None:
+        snapshot = self._helper._snapshot
+        if snapshot.config_digest is None:
+            return
+        frame = _encode(snapshot)
+        self._subscribers = [
+            sock for sock in self._subscribers if self._send(sock, frame)
+        ]
+
+    def _send(self, sock: socket.socket, frame: bytes) -> bool:
+        try:
+            sock.sendall(frame)
+        except OSError:
+            sock.close()
+            return False
+        return True
+
+    def _on_change(self, old: Any, new: Any, diff: Any) -> None:
+        self.publish()
+
+    def publish(self) -> None:
+        """Have the helper's current version sent to every subscriber, without
+        waiting for it to be sent. This is done automatically each time the
+        version changes."""
+        self._pending.set()
+        self._wake()
+
+    def close(self) -> None:
+        """Stop publishing, disconnect the subscribers and remove the socket."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._helper.remove_on_change(self._on_change)
+        self._wake()
+        self._thread.join()
+        self._server.close()
+        self._wake_receiver.close()
+        self._wake_sender.close()
+        subscribers, self._subscribers = self._subscribers, []
+        for sock in subscribers:
+            sock.close()
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+
+class _Current(NamedTuple):
+    snapshot: ConfigSnapshot
+    path_index: PathIndex
+
+
+class ConfigSubscriber:
+    """
+    Receives the configuration pushed by a `ConfigPublisher` listening at
+    `path`, without calling AppConfig.
+
+    A daemon thread keeps a connection to the publisher and parses each
+    version as it arrives, so reading `config` never waits. Until the first
+    version arrives, `config` is None; use `wait()` to block until it does.
+    If the publisher is not running, or goes away, the subscriber tries to
+    connect again every `reconnect_interval` seconds and keeps the last
+    version it received meanwhile.
+
+    Call `close()`, or use the instance as a context manager, to disconnect.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        *,
+        reconnect_interval: float = 1.0,
+    ) -> None:
+        _require_unix_sockets("ConfigSubscriber")
+        self._path = os.fspath(path)
+        self._reconnect_interval = reconnect_interval
+        self._current = _Current(EMPTY_SNAPSHOT, PathIndex(None))
+        self._received = threading.Event()
+        self._closed = threading.Event()
+        self._sock = None  # type: Optional[socket.socket]
+        self._thread = threading.Thread(
+            target=self._receive_loop,
+            name="appconfig-subscriber",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "ConfigSubscriber":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def connected(self) -> bool:
+        """True while connected to the publisher."""
+        return self._sock is not None
+
+    @property
+    def config(self) -> Union[None, Dict[Any, Any], str, bytes]:
+        """The application configuration content."""
+        return self._current.snapshot.config  # type: ignore[no-any-return]
+
+    @property
+    def raw_config(self) -> Union[None, bytes]:
+        """The application configuration content retrieved from AppConfig."""
+        return self._current.snapshot.raw_config
+
+    @property
+    def config_digest(self) -> Optional[str]:
+        """The SHA-256 hex digest of `raw_config`."""
+        return self._current.snapshot.config_digest
+
+    @property
+    def content_type(self) -> Union[None, str]:
+        """The content type of the configuration retrieved from AppConfig."""
+        return self._current.snapshot.content_type
+
+    @property
+    def version_label(self) -> Optional[str]:
+        """The version label of the configuration retrieved from AppConfig."""
+        return self._current.snapshot.version_label
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """The current configuration and its metadata."""
+        return self._current.snapshot
+
+    def get(self, path: Path, default: Any = None) -> Any:
+        """Return a single value from the configuration, as
+        `AppConfigHelper.get()` does."""
+        return self._current.path_index.get(path, default)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the first version of the configuration to arrive.
+
+        Returns False if it did not arrive within `timeout` seconds."""
+        return self._received.wait(timeout)
+
+    def close(self) -> None:
+        """Disconnect from the publisher and stop the receiving thread."""
+        self._closed.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join()
+
+    def _receive_loop(self) -> None:
+        while not self._closed.is_set():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self._path)
+            except OSError:
+                sock.close()
+                self._closed.wait(self._reconnect_interval)
+                continue
+            self._sock = sock
+            if self._closed.is_set():
+                # close() was called before it could see the connection.
+                self._sock = None
+                sock.close()
+                return
+            try:
+                while self._receive(sock):
+                    pass
+            except OSError:
+                if not self._closed.is_set():
+                    logger.warning(
+                        "Lost connection to AppConfig publisher", exc_info=True
+                    )
+            except (RuntimeError, ValueError):
+                logger.exception("Invalid configuration from AppConfig publisher")
+            finally:
+                self._sock = None
+                sock.close()
+            self._closed.wait(self._reconnect_interval)
+
+    def _receive(self, sock: socket.socket) -> bool:
+        """Receive and apply one version; returns False once disconnected."""
+        header = _receive(sock, _HEADER.size)
+        if header is None:
+            return False
+        (
+            magic,
+            layout_version,
+            content_length,
+            content_type_length,
+            version_label_length,
+            digest,
+        ) = _HEADER.unpack(header)
+        if magic != _MAGIC or layout_version != _LAYOUT_VERSION:
+            raise ValueError("Unsupported message from AppConfig publisher")
+        has_version_label = version_label_length != _NO_VERSION_LABEL
+        if not has_version_label:
+            version_label_length = 0
+        data = _receive(
+            sock, content_type_length + version_label_length + content_length
+        )
+        if data is None:
+            return False
+        content_type = data[:content_type_length].decode("utf-8")
+        content_start = content_type_length + version_label_length
+        version_label = (
+            data[content_type_length:content_start].decode("utf-8")
+            if has_version_label
+            else None
+        )
+        content = data[content_start:]
+        config_digest = digest.hex()
+        current = self._current.snapshot
+        unchanged = (config_digest, content_type) == (
+            current.config_digest,
+            current.content_type,
+        )
+        if unchanged:
+            # Sent again on reconnecting; only the label can differ.
+            config = current.config
+        else:
+            config = deserialize(content, content_type)
+        snapshot = ConfigSnapshot(
+            config, content, content_type, version_label, config_digest
+        )
+        self._current = _Current(snapshot, PathIndex(config))
+        self._received.set()
+        return True
@@ -0,0 +1,99 @@
+"""
+On-disk cache of the last configuration received from AppConfig
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import NamedTuple, Optional, Union
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    """A configuration as stored in the cache."""
+
+    content: bytes
+    content_type: str
+    version_label: Optional[str]
+    timestamp: float
+
+
+class FileCache:
+    """
+    Stores the last known good configuration for each profile in `directory`.
+
+    Each profile has its own file, holding a one line JSON header followed by
+    the raw configuration content. Files are written to a temporary file and
+    renamed into place, so readers never see a partially written entry, and
+    the content digest is checked when loading.
+    """
+
+    def __init__(self, directory: Union[str, "os.PathLike[str]"]) -> None:
+        self._directory = os.fspath(directory)
+
+    @property
+    def directory(self) -> str:
+        """The directory holding the cache files."""
+        return self._directory
+
+    def path(self, application: str, environment: str, profile: str) -> str:
+        """The path of the cache file for a profile."""
+        name = "_".join(
+            quote(part, safe="") for part in (application, environment, profile)
+        )
+        return os.path.join(self._directory, f"{name}.appconfig")
+
+    def load(
+        self, application: str, environment: str, profile: str
+    ) -> Optional[CacheEntry]:
+        """Return the cached configuration for a profile.
+
+        Returns None if there is no cache file, or it cannot be read."""
+        path = self.path(application, environment, profile)
+        try:
+            with open(path, "rb") as cache_file:
+                header = json.loads(cache_file.readline())
+                content = cache_file.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning(
+                "Unable to read AppConfig cache file %s", path, exc_info=True
+            )
+            return None
+        if header.get("digest") != hashlib.sha256(content).hexdigest():
+            logger.warning("Ignoring corrupt AppConfig cache file %s", path)
+            return None
+        return CacheEntry(
+            content,
+            header["content_type"],
+            header["version_label"],
+            header["timestamp"],
+        )
+
+    def store(
+        self, application: str, environment: str, profile: str, entry: CacheEntry
+    ) -> None:
+        """Atomically replace the cached configuration for a profile."""
+        header = {
+            "content_type": entry.content_type,
+            "version_label": entry.version_label,
+            "timestamp": entry.timestamp,
+            "digest": hashlib.sha256(entry.content).hexdigest(),
+        }
+        os.makedirs(self._directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as cache_file:
+                cache_file.write(json.dumps(header).encode("utf-8") + b"\n")
+                cache_file.write(entry.content)
+                cache_file.flush()
+                os.fsync(cache_file.fileno())
+            os.replace(temp_path, self.path(application, environment, profile))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
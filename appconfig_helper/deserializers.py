@@ -0,0 +1,154 @@
+"""
+Deserializers for configuration content types
+"""
+
+import importlib.util
+import json
+from typing import Any, Callable, Dict, Optional
+
+Deserializer = Callable[[bytes], Any]
+
+# PyYAML takes some time to import, so it is only imported when YAML is
+# first parsed.
+yaml_available = importlib.util.find_spec("yaml") is not None
+_yaml = None  # type: Any
+_YamlLoader = None  # type: Any
+
+
+def _load_yaml() -> None:
+    global _yaml, _YamlLoader
+    import yaml
+
+    # The libyaml based loader is many times faster than the pure Python one.
+    _YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    _yaml = yaml
+
+
+def __getattr__(name: str) -> Any:
+    if name == "yaml_backend":
+        if not yaml_available:
+            return None
+        if _yaml is None:
+            _load_yaml()
+        return "libyaml" if _YamlLoader is not _yaml.SafeLoader else "pyyaml"
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_json_loads = json.loads  # type: Callable[[bytes], Any]
+json_backend = "json"
+
+
+def use_fast_json(enabled: bool = True) -> str:
+    """Parse JSON with orjson or ujson, whichever is installed, rather than
+    the standard library, or with `enabled` = False, go back to the
+    standard library. Returns the name of the backend now in use.
+
+    Both are much faster on large configurations, but they do not read all
+    JSON the same way: orjson reads integers too large for 64 bits as
+    floats, for example. Content they reject, such as NaN, is still parsed
+    with the standard library."""
+    global _json_loads, json_backend
+    _json_loads, json_backend = json.loads, "json"
+    if enabled:
+        try:
+            import orjson
+
+            _json_loads, json_backend = orjson.loads, "orjson"
+        except ImportError:
+            try:
+                import ujson
+
+                _json_loads, json_backend = ujson.loads, "ujson"
+            except ImportError:
+                pass
+    return json_backend
+
+
+def deserialize_yaml(content: bytes) -> Any:
+    """Parse YAML content, using libyaml if it is available.
+
+    `content` may also be a binary file-like object, which is read in
+    blocks as parsing proceeds."""
+    if not yaml_available:
+        raise RuntimeError(
+            "Configuration in YAML format received and missing "
+            "yaml library; pip install pyyaml?"
+        )
+    if _yaml is None:
+        _load_yaml()
+    try:
+        return _yaml.load(content, Loader=_YamlLoader)
+    except _yaml.YAMLError as error:
+        message = "Unable to parse YAML configuration data"
+        if hasattr(error, "problem_mark"):
+            message = (
+                f"{message} at line {error.problem_mark.line + 1} "
+                f"column {error.problem_mark.column + 1}"
+            )
+        raise ValueError(message) from error
+
+
+def streamable(deserializer: Deserializer) -> bool:
+    """True if `deserializer` also accepts a binary file-like object, which
+    it reads as it parses, rather than bytes."""
+    return deserializer is deserialize_yaml
+
+
+def deserialize_json(content: bytes) -> Any:
+    """Parse JSON content, with orjson or ujson after `use_fast_json()`."""
+    try:
+        return _json_loads(content)
+    except ValueError as error:
+        if _json_loads is json.loads:
+            raise ValueError(getattr(error, "msg", str(error))) from error
+    try:
+        return json.loads(content)
+    except ValueError as error:
+        raise ValueError(getattr(error, "msg", str(error))) from error
+
+
+def deserialize_text(content: bytes) -> str:
+    """Decode plain text content."""
+    return content.decode("utf-8")
+
+
+_deserializers: Dict[str, Deserializer] = {
+    "application/x-yaml": deserialize_yaml,
+    "application/json": deserialize_json,
+    "text/plain": deserialize_text,
+}
+
+
+def register_deserializer(content_type: str, deserializer: Deserializer) -> None:
+    """Use `deserializer` to parse configuration of `content_type`.
+
+    `deserializer` is called with the configuration content as bytes, and
+    should raise ValueError if it cannot be parsed. Registering a content type
+    which already has a deserializer replaces it."""
+    _deserializers[content_type] = deserializer
+
+
+def unregister_deserializer(content_type: str) -> None:
+    """Stop parsing configuration of `content_type`; it will be returned as
+    bytes."""
+    _deserializers.pop(content_type, None)
+
+
+def get_deserializer(content_type: str) -> Optional[Deserializer]:
+    """Return the deserializer for `content_type`, or None if there isn't one.
+
+    If there is no deserializer for the full content type, any parameters
+    (such as `; charset=utf-8`) are ignored."""
+    deserializer = _deserializers.get(content_type)
+    if deserializer is None and ";" in content_type:
+        deserializer = _deserializers.get(content_type.split(";", 1)[0].strip())
+    return deserializer
+
+
+def deserialize(content: bytes, content_type: str) -> Any:
+    """Parse configuration content with the deserializer registered for its
+    content type. Content with no registered deserializer is returned as is."""
+    deserializer = get_deserializer(content_type)
+    if deserializer is None:
+        return content
+    return deserializer(content)
@@ -0,0 +1,70 @@
+"""
+Structural differences between configuration versions
+"""
+
+from typing import Any, FrozenSet, List, Mapping, NamedTuple, Tuple
+
+KeyPath = Tuple[Any, ...]
+
+
+class ConfigDiff(NamedTuple):
+    """The key paths which differ between two versions of a configuration.
+
+    Each path is a tuple of the keys leading from the top of the document to
+    the value. Lists are compared as single values. If either version is not
+    a mapping, the whole configuration is reported as changed at path ()."""
+
+    added: FrozenSet[KeyPath]
+    removed: FrozenSet[KeyPath]
+    changed: FrozenSet[KeyPath]
+
+    @property
+    def paths(self) -> FrozenSet[KeyPath]:
+        """Every path which was added, removed or changed."""
+        return self.added | self.removed | self.changed
+
+    def affects(self, *keys: Any) -> bool:
+        """True if the value at the path made of `keys`, or anything inside
+        or above it, differs."""
+        for path in self.paths:
+            common = min(len(path), len(keys))
+            if path[:common] == keys[:common]:
+                return True
+        return False
+
+
+def diff_config(old: Any, new: Any) -> ConfigDiff:
+    """Compare two versions of a configuration."""
+    added = []  # type: List[KeyPath]
+    removed = []  # type: List[KeyPath]
+    changed = []  # type: List[KeyPath]
+    if isinstance(old, Mapping) and isinstance(new, Mapping):
+        _diff_mappings(old, new, (), added, removed, changed)
+    elif old is not new and old != new:
+        changed.append(())
+    return ConfigDiff(frozenset(added), frozenset(removed), frozenset(changed))
+
+
+def _diff_mappings(
+    old: Mapping[Any, Any],
+    new: Mapping[Any, Any],
+    prefix: KeyPath,
+    added: List[KeyPath],
+    removed: List[KeyPath],
+    changed: List[KeyPath],
+) -> None:
+    for key, old_value in old.items():
+        path = prefix + (key,)
+        if key not in new:
+            removed.append(path)
+            continue
+        new_value = new[key]
+        if old_value is new_value:
+            continue
+        if isinstance(old_value, Mapping) and isinstance(new_value, Mapping):
+            _diff_mappings(old_value, new_value, path, added, removed, changed)
+        elif type(old_value) is not type(new_value) or old_value != new_value:
+            changed.append(path)
+    for key in new:
+        if key not in old:
+            added.append(prefix + (key,))
@@ -0,0 +1,518 @@
+"""
+Local emulator of the AppConfig Data API, for tests and load simulation
+
+Run `python -m appconfig_helper.emulator --help` to start one from the
+command line.
+"""
+
+import argparse
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+from urllib.parse import parse_qs, unquote, urlparse
+
+import botocore.config
+import botocore.session
+
+START_SESSION = "StartConfigurationSession"
+GET_CONFIGURATION = "GetLatestConfiguration"
+AGENT_CONFIGURATION = "AgentConfiguration"
+
+_ERROR_STATUS = {
+    "BadRequestException": 400,
+    "ResourceNotFoundException": 404,
+    "ThrottlingException": 429,
+    "InternalServerException": 500,
+}
+
+ProfileKey = Tuple[str, str, str]
+
+
+class _Version(NamedTuple):
+    number: int
+    content: bytes
+    content_type: str
+    version_label: Optional[str]
+
+
+class _Session:
+    __slots__ = ("profile", "interval", "version", "not_before", "expires")
+
+    def __init__(self, profile: ProfileKey, interval: int, expires: float) -> None:
+        self.profile = profile
+        self.interval = interval
+        self.version = 0
+        self.not_before = 0.0
+        self.expires = expires
+
+
+class _Fault:
+    __slots__ = ("code", "message", "operation", "remaining")
+
+    def __init__(
+        self, code: str, message: str, operation: Optional[str], remaining: int
+    ) -> None:
+        self.code = code
+        self.message = message
+        self.operation = operation
+        self.remaining = remaining
+
+
+class EmulatorError(Exception):
+    """An error response from the emulator, in the AppConfig Data format."""
+
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.status = _ERROR_STATUS.get(code, 400)
+
+
+class AppConfigDataEmulator:
+    """
+    Serves StartConfigurationSession and GetLatestConfiguration on a local
+    port, with the same semantics as AppConfig Data. It also serves the
+    latest version of each profile at the AppConfig Agent's
+    `/applications/{application}/environments/{environment}/configurations/
+    {profile}` path, for testing `AgentClient`.
+
+    Configuration is made available with `deploy()`, immediately or after a
+    delay. Each session receives the deployed version on its first poll, and
+    then an empty body until a new version is deployed. Every poll returns a
+    new token and invalidates the one it used; a token which is reused,
+    unknown or older than `token_ttl` seconds is rejected with
+    BadRequestException. The poll interval is the session's
+    `RequiredMinimumPollIntervalInSeconds`, or `poll_interval` if it did not
+    set one, and if `enforce_poll_interval` is True polling sooner than that
+    is rejected with BadRequestException, as AppConfig does.
+
+    For load simulation, `latency` seconds are added to every response, and
+    requests beyond `max_requests_per_second` are rejected with
+    ThrottlingException. `inject_fault()` queues further errors.
+
+    `clock` is the function used for poll intervals, token expiry and
+    delayed deployments; tests can replace it to move time forward. The
+    server runs on background threads between `start()` and `stop()`, or
+    when used as a context manager.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        poll_interval: int = 60,
+        enforce_poll_interval: bool = True,
+        token_ttl: float = 24 * 60 * 60,
+        latency: float = 0.0,
+        max_requests_per_second: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.enforce_poll_interval = enforce_poll_interval
+        self.token_ttl = token_ttl
+        self.latency = latency
+        self.max_requests_per_second = max_requests_per_second
+        self.clock = clock
+        self.requests = Counter()  # type: Counter[str]
+        self.errors = Counter()  # type: Counter[str]
+        self._lock = threading.Lock()
+        self._versions = {}  # type: Dict[ProfileKey, _Version]
+        self._scheduled = []  # type: List[Tuple[float, ProfileKey, _Version]]
+        self._sessions = {}  # type: Dict[str, _Session]
+        self._session_count = 0
+        self._faults = []  # type: List[_Fault]
+        self._allowance = max(1.0, max_requests_per_second or 0.0)
+        self._allowance_time = clock()
+        handler = type("Handler", (_Handler,), {"emulator": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def __enter__(self) -> "AppConfigDataEmulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Start serving requests on a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            args=(0.05,),
+            name="appconfig-emulator",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        """Serve requests on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """Stop serving requests and close the port."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = cast(Tuple[str, int], self._server.server_address[:2])
+        return f"http://{host}:{port}"
+
+    @property
+    def sessions(self) -> int:
+        """Number of sessions started."""
+        return self._session_count
+
+    def client(
+        self,
+        max_pool_connections: Optional[int] = None,
+        max_attempts: int = 1,
+    ) -> Any:
+        """Create an appconfigdata client which talks to this emulator.
+
+        `max_attempts` sets the number of attempts botocore itself makes at
+        each request. Like the clients the helpers create, it makes one by
+        default, leaving retries to the helper's `retry_policy`."""
+        options: Dict[str, Any] = {"retries": {"total_max_attempts": max_attempts}}
+        if max_pool_connections:
+            options["max_pool_connections"] = max_pool_connections
+        return botocore.session.get_session().create_client(
+            "appconfigdata",
+            region_name="us-east-1",
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id="emulator",
+            aws_secret_access_key="emulator",
+            config=botocore.config.Config(**options),
+        )
+
+    def deploy(
+        self,
+        application: str,
+        environment: str,
+        profile: str,
+        content: Union[bytes, str],
+        content_type: str = "application/json",
+        version_label: Optional[str] = None,
+        delay: float = 0.0,
+    ) -> int:
+        """Deploy `content` as a new version of a configuration profile.
+
+        The version is seen by sessions from their next poll, or once `delay`
+        seconds have passed on `clock`. Returns the new version number."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        key = (application, environment, profile)
+        with self._lock:
+            self._apply_scheduled()
+            number = self._latest_number(key) + 1
+            version = _Version(number, content, content_type, version_label)
+            if delay > 0:
+                self._scheduled.append((self.clock() + delay, key, version))
+            else:
+                self._versions[key] = version
+        return number
+
+    def inject_fault(
+        self,
+        code: str,
+        count: int = 1,
+        operation: Optional[str] = None,
+        message: str = "Injected fault",
+    ) -> None:
+        """Fail the next `count` requests with the error `code`, such as
+        "ThrottlingException" or "InternalServerException".
+
+        If `operation` is START_SESSION, GET_CONFIGURATION or
+        AGENT_CONFIGURATION, only requests
+        for that operation fail."""
+        if code not in _ERROR_STATUS:
+            raise ValueError(f"Unknown error code {code!r}")
+        with self._lock:
+            self._faults.append(_Fault(code, message, operation, count))
+
+    def expire_sessions(self) -> None:
+        """Invalidate every token, as if all the sessions had expired."""
+        with self._lock:
+            self._sessions.clear()
+
+    def _latest_number(self, key: ProfileKey) -> int:
+        numbers = [version.number for due, k, version in self._scheduled if k == key]
+        if key in self._versions:
+            numbers.append(self._versions[key].number)
+        return max(numbers, default=0)
+
+    def _apply_scheduled(self) -> None:
+        if not self._scheduled:
+            return
+        now = self.clock()
+        pending = []
+        for due, key, version in sorted(self._scheduled, key=lambda item: item[0]):
+            if due > now:
+                pending.append((due, key, version))
+            elif key not in self._versions or (
+                self._versions[key].number < version.number
+            ):
+                self._versions[key] = version
+        self._scheduled = pending
+
+    def _check_faults(self, operation: str) -> None:
+        """Raise the next injected or rate limit error for `operation`."""
+        for fault in self._faults:
+            if fault.operation in (None, operation):
+                fault.remaining -= 1
+                if fault.remaining <= 0:
+                    self._faults.remove(fault)
+                raise EmulatorError(fault.code, fault.message)
+        rate = self.max_requests_per_second
+        if rate is not None:
+            now = self.clock()
+            refill = (now - self._allowance_time) * rate
+            self._allowance = min(max(1.0, rate), self._allowance + refill)
+            self._allowance_time = now
+            if self._allowance < 1.0:
+                raise EmulatorError("ThrottlingException", "Rate exceeded")
+            self._allowance -= 1.0
+
+    def _new_token(self, session: _Session) -> str:
+        token = secrets.token_urlsafe(24)
+        self._sessions[token] = session
+        return token
+
+    def start_configuration_session(self, parameters: Mapping[str, Any]) -> str:
+        """Handle StartConfigurationSession, returning the initial token."""
+        with self._lock:
+            self.requests[START_SESSION] += 1
+            self._check_faults(START_SESSION)
+            self._apply_scheduled()
+            try:
+                key = (
+                    parameters["ApplicationIdentifier"],
+                    parameters["EnvironmentIdentifier"],
+                    parameters["ConfigurationProfileIdentifier"],
+                )
+            except KeyError as error:
+                raise EmulatorError(
+                    "BadRequestException", f"Missing {error.args[0]}"
+                ) from None
+            if key not in self._versions:
+                raise EmulatorError(
+                    "ResourceNotFoundException", "Configuration profile not found"
+                )
+            interval = parameters.get("RequiredMinimumPollIntervalInSeconds")
+            if interval is None:
+                interval = self.poll_interval
+            elif not 15 <= interval <= 86400:
+                raise EmulatorError(
+                    "BadRequestException",
+                    "RequiredMinimumPollIntervalInSeconds must be 15 to 86400",
+                )
+            self._session_count += 1
+            expires = self.clock() + self.token_ttl
+            return self._new_token(_Session(key, interval, expires))
+
+    def get_latest_configuration(self, token: str) -> Tuple[bytes, Dict[str, str]]:
+        """Handle GetLatestConfiguration, returning the body and headers."""
+        with self._lock:
+            self.requests[GET_CONFIGURATION] += 1
+            self._check_faults(GET_CONFIGURATION)
+            self._apply_scheduled()
+            now = self.clock()
+            session = self._sessions.get(token)
+            if session is None or now >= session.expires:
+                self._sessions.pop(token, None)
+                raise EmulatorError("BadRequestException", "Invalid or expired token")
+            if self.enforce_poll_interval and now < session.not_before:
+                raise EmulatorError("BadRequestException", "Request too early")
+            del self._sessions[token]
+            session.not_before = now + session.interval
+            version = self._versions[session.profile]
+            headers = {
+                "Content-Type": version.content_type,
+                "Next-Poll-Configuration-Token": self._new_token(session),
+                "Next-Poll-Interval-In-Seconds": str(session.interval),
+            }
+            if version.number == session.version:
+                return b"", headers
+            session.version = version.number
+            if version.version_label is not None:
+                headers["Version-Label"] = version.version_label
+            return version.content, headers
+
+    def agent_configuration(self, key: ProfileKey) -> Tuple[bytes, Dict[str, str]]:
+        """Handle a request to the agent endpoint, returning the body and
+        headers of the latest version."""
+        with self._lock:
+            self.requests[AGENT_CONFIGURATION] += 1
+            self._check_faults(AGENT_CONFIGURATION)
+            self._apply_scheduled()
+            version = self._versions.get(key)
+            if version is None:
+                raise EmulatorError(
+                    "ResourceNotFoundException", "Configuration profile not found"
+                )
+            headers = {
+                "Content-Type": version.content_type,
+                "Configuration-Version": str(version.number),
+            }
+            if version.version_label is not None:
+                headers["Version-Label"] = version.version_label
+            return version.content, headers
+
+
+_AGENT_PATH = re.compile(
+    "/applications/([^/]+)/environments/([^/]+)/configurations/([^/]+)"
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    emulator: AppConfigDataEmulator
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, error: EmulatorError) -> None:
+        body = json.dumps({"Message": str(error)}).encode("utf-8")
+        self._send(
+            error.status,
+            body,
+            {"Content-Type": "application/json", "x-amzn-ErrorType": error.code},
+        )
+
+    def _delay(self) -> None:
+        if self.emulator.latency > 0:
+            time.sleep(self.emulator.latency)
+
+    def do_POST(self) -> None:
+        content = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._delay()
+        if urlparse(self.path).path != "/configurationsessions":
+            self._send_error(EmulatorError("ResourceNotFoundException", "Not found"))
+            return
+        try:
+            parameters = json.loads(content or b"{}")
+            token = self.emulator.start_configuration_session(parameters)
+        except ValueError:
+            self._send_error(EmulatorError("BadRequestException", "Invalid request"))
+            return
+        except EmulatorError as error:
+            self.emulator.errors[error.code] += 1
+            self._send_error(error)
+            return
+        body = json.dumps({"InitialConfigurationToken": token}).encode("utf-8")
+        self._send(201, body, {"Content-Type": "application/json"})
+
+    def do_GET(self) -> None:
+        self._delay()
+        url = urlparse(self.path)
+        agent_path = _AGENT_PATH.fullmatch(url.path)
+        try:
+            if agent_path is not None:
+                key = cast(ProfileKey, tuple(map(unquote, agent_path.groups())))
+                body, headers = self.emulator.agent_configuration(key)
+            elif url.path == "/configuration":
+                token = parse_qs(url.query).get("configuration_token", [""])[0]
+                body, headers = self.emulator.get_latest_configuration(token)
+            else:
+                raise EmulatorError("ResourceNotFoundException", "Not found")
+        except EmulatorError as error:
+            self.emulator.errors[error.code] += 1
+            self._send_error(error)
+            return
+        self._send(200, body, headers)
+
+
+_CONTENT_TYPES = {
+    ".json": "application/json",
+    ".yaml": "application/x-yaml",
+    ".yml": "application/x-yaml",
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m appconfig_helper.emulator",
+        description="Run a local AppConfig Data emulator.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2772)
+    parser.add_argument(
+        "--deploy",
+        action="append",
+        default=[],
+        metavar="APP/ENV/PROFILE=FILE",
+        help="deploy the content of FILE; may be given more than once",
+    )
+    parser.add_argument("--poll-interval", type=int, default=60)
+    parser.add_argument(
+        "--no-enforce-poll-interval",
+        dest="enforce_poll_interval",
+        action="store_false",
+        help="allow polling more often than the poll interval",
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--max-requests-per-second", type=float)
+    args = parser.parse_args(argv)
+
+    emulator = AppConfigDataEmulator(
+        args.host,
+        args.port,
+        poll_interval=args.poll_interval,
+        enforce_poll_interval=args.enforce_poll_interval,
+        latency=args.latency,
+        max_requests_per_second=args.max_requests_per_second,
+    )
+    for deployment in args.deploy:
+        name, _, path = deployment.partition("=")
+        parts = name.split("/")
+        if len(parts) != 3 or not path:
+            parser.error(f"--deploy {deployment!r} is not APP/ENV/PROFILE=FILE")
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, "rb") as file:
+            emulator.deploy(
+                parts[0],
+                parts[1],
+                parts[2],
+                file.read(),
+                _CONTENT_TYPES.get(extension, "text/plain"),
+            )
+    print(f"AppConfig Data emulator listening on {emulator.endpoint_url}")
+    emulator.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
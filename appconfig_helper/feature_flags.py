@@ -0,0 +1,90 @@
+"""
+Feature flag evaluation for AppConfig feature flag profiles
+"""
+
+import logging
+import sys
+from typing import Any, Dict, Mapping, Optional
+
+from .appconfig_helper import _AppConfigHelperBase
+from .diff import ConfigDiff
+
+logger = logging.getLogger(__name__)
+
+VARIANT_KEY = "_variant"
+
+
+class _FlagIndex:
+    """Flags of one configuration version, flattened for lookup."""
+
+    __slots__ = ("enabled", "variants", "attributes")
+
+    def __init__(self, config: Any) -> None:
+        self.enabled: Dict[str, bool] = {}
+        self.variants: Dict[str, str] = {}
+        self.attributes: Dict[str, Dict[str, Any]] = {}
+        if not isinstance(config, Mapping):
+            if config is not None:
+                logger.warning("AppConfig feature flag configuration is not a mapping")
+            return
+        for name, flag in config.items():
+            if not isinstance(name, str) or not isinstance(flag, Mapping):
+                continue
+            name = sys.intern(name)
+            self.enabled[name] = bool(flag.get("enabled", False))
+            attributes = {}
+            for key, value in flag.items():
+                if key == VARIANT_KEY:
+                    self.variants[name] = value
+                elif key != "enabled" and isinstance(key, str):
+                    attributes[sys.intern(key)] = value
+            self.attributes[name] = attributes
+
+
+class FeatureFlags:
+    """
+    Evaluates the flags in an AppConfig feature flag configuration profile.
+
+    Each version of the configuration received by `helper` is compiled once
+    into flat dictionaries of flag state, attributes and variants, so that
+    checks are single dictionary lookups. Reading flags does not trigger an
+    update of the configuration; keep `helper` up to date in any of the
+    usual ways.
+
+    Multi-variant flags are evaluated against their rules by AWS AppConfig,
+    for example by the AppConfig Agent given a context; `get_variant()`
+    returns the variant chosen there.
+    """
+
+    def __init__(self, helper: _AppConfigHelperBase) -> None:
+        self._helper = helper
+        self._index = _FlagIndex(helper._config)
+        helper.on_change(self._recompile)
+
+    def _recompile(self, old: Any, new: Any, diff: ConfigDiff) -> None:
+        self._index = _FlagIndex(new)
+
+    def close(self) -> None:
+        """Stop following new versions of the configuration."""
+        self._helper.remove_on_change(self._recompile)
+
+    def __contains__(self, flag: str) -> bool:
+        return flag in self._index.enabled
+
+    def is_enabled(self, flag: str, default: bool = False) -> bool:
+        """True if `flag` is enabled; `default` if there is no such flag."""
+        return self._index.enabled.get(flag, default)
+
+    def get_attribute(self, flag: str, attribute: str, default: Any = None) -> Any:
+        """The value of an attribute of `flag`, or `default` if either is
+        missing. Attributes are available whether or not the flag is
+        enabled."""
+        attributes = self._index.attributes.get(flag)
+        if attributes is None:
+            return default
+        return attributes.get(attribute, default)
+
+    def get_variant(self, flag: str, default: Optional[str] = None) -> Optional[str]:
+        """The name of the variant of `flag` served by AppConfig, or
+        `default` if it is not a multi-variant flag."""
+        return self._index.variants.get(flag, default)
@@ -0,0 +1,94 @@
+"""
+Bounded history of configuration versions
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .snapshot import ConfigSnapshot
+
+
+class ConfigHistory:
+    """
+    The most recently received versions of a configuration, parsed and ready
+    to use again.
+
+    Versions are kept in the order they were received, identified by their
+    digest. Once there are more than `max_versions`, or their total size is
+    more than `max_bytes`, the oldest are forgotten. Size is measured as
+    the size of the configuration as received.
+    """
+
+    def __init__(self, max_versions: int, max_bytes: Optional[int] = None) -> None:
+        if max_versions < 1:
+            raise ValueError("max_versions must be at least 1")
+        self.max_versions = max_versions
+        self.max_bytes = max_bytes
+        # digest: (snapshot, size), oldest first
+        self._entries: "OrderedDict[str, Tuple[ConfigSnapshot, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        """The total size of the versions held."""
+        return self._bytes
+
+    def add(self, snapshot: ConfigSnapshot, size: int) -> None:
+        """Record `snapshot` as the most recently received version."""
+        digest = snapshot.config_digest
+        assert digest is not None
+        with self._lock:
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[digest] = (snapshot, size)
+            self._bytes += size
+            while len(self._entries) > self.max_versions or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+
+    def get(self, digest: str) -> Optional[ConfigSnapshot]:
+        """The version with `digest`, or None if it is not held."""
+        entry = self._entries.get(digest)
+        return None if entry is None else entry[0]
+
+    def snapshots(self) -> Tuple[ConfigSnapshot, ...]:
+        """The versions held, most recently received first."""
+        with self._lock:
+            return tuple(snapshot for snapshot, _ in reversed(self._entries.values()))
+
+    def find(
+        self,
+        version_label: Optional[str] = None,
+        digest: Optional[str] = None,
+        before: Optional[str] = None,
+    ) -> ConfigSnapshot:
+        """Return the most recently received version with `version_label`
+        and/or `digest`, or with neither, the version received before the one
+        with digest `before`.
+
+        Raises KeyError if there is no such version."""
+        snapshots = self.snapshots()
+        if version_label is None and digest is None:
+            digests = [snapshot.config_digest for snapshot in snapshots]
+            if before in digests:
+                start = digests.index(before) + 1
+                snapshots = snapshots[start:]
+            elif before is not None:
+                snapshots = ()
+            if not snapshots:
+                raise KeyError("no earlier configuration version is held")
+            return snapshots[0]
+        for snapshot in snapshots:
+            if version_label is not None and snapshot.version_label != version_label:
+                continue
+            if digest is not None and snapshot.config_digest != digest:
+                continue
+            return snapshot
+        raise KeyError(f"configuration version {version_label or digest} is not held")
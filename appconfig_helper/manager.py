@@ -0,0 +1,332 @@
+"""
+AppConfig Manager class
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .appconfig_helper import AppConfigHelper, _LazyClient
+from .metrics import MetricsSink
+from .retry import CircuitBreaker, RetryPolicy
+
+if TYPE_CHECKING:
+    import boto3
+
+logger = logging.getLogger(__name__)
+
+ProfileKey = Tuple[str, str, str]
+
+
+class WarmUpResult(NamedTuple):
+    """The outcome of the first fetch of one profile by `warm_up()`.
+
+    `ready` is True if the fetch succeeded, in which case `seconds` is how
+    long it took. Otherwise `error` is the exception raised, or a
+    `TimeoutError` if the fetch did not finish in time."""
+
+    helper: AppConfigHelper
+    ready: bool
+    seconds: Optional[float]
+    error: Optional[BaseException]
+
+
+class AppConfigManager:
+    """
+    Keeps many AWS AppConfig configuration profiles up to date.
+
+    Each registered (application, environment, profile) is served by an
+    `AppConfigHelper`, but all of them share a single `appconfigdata` client
+    and its connection pool. Once started, one scheduler thread keeps a heap
+    of the time each profile is next due to be polled, and due polls are run
+    in parallel on a bounded pool of `max_workers` threads.
+
+    `max_config_age` is the default minimum interval in seconds between
+    updates for registered profiles; it can be overridden per profile.
+
+    Set `session` to a preconfigured `boto3.Session` to override credentials
+    or AWS Region, or `client` to supply the `appconfigdata` client yourself.
+    A client created by the manager has a connection pool sized to match
+    `max_workers`.
+
+    `metrics_sink`, `retry_policy`, `circuit_breaker` and `poll_jitter` are
+    passed on to each helper. A circuit breaker is shared by all of them, so
+    that when AppConfig throttles the manager backs off every profile.
+
+    Call `start()` and `stop()` to control background polling, or use the
+    instance as a context manager.
+    """
+
+    def __init__(
+        self,
+        max_config_age: int,
+        *,
+        session: Optional["boto3.Session"] = None,
+        client: Optional[Any] = None,
+        max_workers: int = 8,
+        metrics_sink: Optional[MetricsSink] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        poll_jitter: float = 0.0,
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if client is None:
+            client = _LazyClient(session, max_workers)
+        self._client = client
+        self._max_config_age = max_config_age
+        self._max_workers = max_workers
+        self._metrics_sink = metrics_sink
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._poll_jitter = poll_jitter
+        self._helpers = {}  # type: Dict[ProfileKey, AppConfigHelper]
+        self._schedule: List[Tuple[float, int, ProfileKey]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = None  # type: Optional[ThreadPoolExecutor]
+        self._scheduler = None  # type: Optional[threading.Thread]
+        self._stopping = False
+
+    def __enter__(self) -> "AppConfigManager":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    @property
+    def client(self) -> Any:
+        """The `appconfigdata` client shared by all registered profiles."""
+        return self._client
+
+    @property
+    def helpers(self) -> Dict[ProfileKey, AppConfigHelper]:
+        """The registered helpers, keyed by (application, environment, profile)."""
+        return dict(self._helpers)
+
+    @property
+    def running(self) -> bool:
+        """True if background polling is running."""
+        return self._scheduler is not None
+
+    def register(
+        self,
+        appconfig_application: str,
+        appconfig_environment: str,
+        appconfig_profile: str,
+        max_config_age: Optional[int] = None,
+    ) -> AppConfigHelper:
+        """Register a configuration profile and return its helper.
+
+        Registering a profile which is already registered returns the existing
+        helper. If the manager is running, the new profile is polled straight
+        away."""
+        key = (appconfig_application, appconfig_environment, appconfig_profile)
+        with self._condition:
+            helper = self._helpers.get(key)
+            if helper is not None:
+                return helper
+            helper = AppConfigHelper(
+                appconfig_application,
+                appconfig_environment,
+                appconfig_profile,
+                max_config_age or self._max_config_age,
+                client=self._client,
+                metrics_sink=self._metrics_sink,
+                retry_policy=self._retry_policy,
+                circuit_breaker=self._circuit_breaker,
+                poll_jitter=self._poll_jitter,
+            )
+            self._helpers[key] = helper
+            if self._scheduler is not None:
+                self._schedule_poll(key, _due_in(helper))
+        return helper
+
+    def get(
+        self,
+        appconfig_application: str,
+        appconfig_environment: str,
+        appconfig_profile: str,
+    ) -> AppConfigHelper:
+        """Return the helper for a registered profile.
+
+        Raises KeyError if the profile has not been registered."""
+        return self._helpers[
+            (appconfig_application, appconfig_environment, appconfig_profile)
+        ]
+
+    def refresh_all(self, force_update: bool = False) -> Dict[ProfileKey, bool]:
+        """Update every registered profile, in parallel, and wait for them.
+
+        Returns a dict of the result of `update_config()` for each profile.
+        Failures are logged and reported as False."""
+        helpers = self.helpers
+        with ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="appconfig-manager"
+        ) as executor:
+            futures = {
+                key: executor.submit(helper.update_config, force_update)
+                for key, helper in helpers.items()
+            }
+            wait(futures.values())
+        results = {}
+        for key, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                logger.error(
+                    "Failed to update AppConfig configuration %s",
+                    "/".join(key),
+                    exc_info=error,
+                )
+            results[key] = error is None and future.result()
+        return results
+
+    def warm_up(
+        self, profiles: Iterable[Tuple[Any, ...]], timeout: Optional[float] = None
+    ) -> Dict[ProfileKey, WarmUpResult]:
+        """Register profiles and fetch their configuration, in parallel.
+
+        `profiles` holds (application, environment, profile) tuples, with an
+        optional fourth item for the profile's `max_config_age`. Sessions
+        are started and first fetches made on up to `max_workers` threads at
+        once, so start up takes about as long as the slowest profile rather
+        than all of them together.
+
+        `timeout` is the number of seconds to wait for all of them. Fetches
+        which have not finished by then, including those still waiting for a
+        thread, are reported as timed out, but carry on in the background and
+        update their helper when they complete.
+
+        Returns a `WarmUpResult` for each profile. Failures are logged."""
+        start = time.monotonic()
+        helpers = {}  # type: Dict[ProfileKey, AppConfigHelper]
+        for profile in profiles:
+            key = (profile[0], profile[1], profile[2])
+            helpers[key] = self.register(*profile)
+        if not helpers:
+            return {}
+        executor = ThreadPoolExecutor(
+            max_workers=min(self._max_workers, len(helpers)),
+            thread_name_prefix="appconfig-warm-up",
+        )
+        try:
+            futures = {
+                key: executor.submit(_timed_update, helper)
+                for key, helper in helpers.items()
+            }
+            remaining = (
+                None if timeout is None else timeout - (time.monotonic() - start)
+            )
+            wait(futures.values(), remaining)
+        finally:
+            executor.shutdown(wait=False)
+
+        results = {}
+        for key, future in futures.items():
+            helper = helpers[key]
+            if future.done():
+                error = future.exception()
+            else:
+                # Left running, as are fetches still queued for a worker.
+                error = TimeoutError(
+                    f"AppConfig configuration {'/'.join(key)} was not fetched "
+                    f"within {timeout} seconds"
+                )
+            if error is not None:
+                logger.error(
+                    "Failed to fetch AppConfig configuration %s",
+                    "/".join(key),
+                    exc_info=error,
+                )
+                results[key] = WarmUpResult(helper, False, None, error)
+            else:
+                results[key] = WarmUpResult(helper, True, future.result(), None)
+        return results
+
+    def start(self) -> None:
+        """Start polling all registered profiles in the background, each when
+        it is next due, so that profiles just fetched, for example by
+        `warm_up()`, are not polled again straight away."""
+        with self._condition:
+            if self._scheduler is not None:
+                return
+            self._stopping = False
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="appconfig-manager"
+            )
+            self._schedule = []
+            for key, helper in self._helpers.items():
+                self._schedule_poll(key, _due_in(helper))
+            self._scheduler = threading.Thread(
+                target=self._run_scheduler, name="appconfig-scheduler", daemon=True
+            )
+            self._scheduler.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop background polling, waiting for in-flight requests to finish.
+
+        `timeout`: maximum number of seconds to wait for the scheduler thread"""
+        with self._condition:
+            scheduler, executor = self._scheduler, self._executor
+            if scheduler is None:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        scheduler.join(timeout)
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._condition:
+            self._scheduler = None
+            self._executor = None
+
+    def _schedule_poll(self, key: ProfileKey, delay: float) -> None:
+        # Must be called with self._condition held.
+        heapq.heappush(
+            self._schedule, (time.monotonic() + delay, next(self._sequence), key)
+        )
+        self._condition.notify()
+
+    def _run_scheduler(self) -> None:
+        with self._condition:
+            while not self._stopping:
+                if not self._schedule:
+                    self._condition.wait()
+                    continue
+                delay = self._schedule[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                _, _, key = heapq.heappop(self._schedule)
+                assert self._executor is not None
+                self._executor.submit(self._poll, key)
+
+    def _poll(self, key: ProfileKey) -> None:
+        helper = self._helpers[key]
+        try:
+            # Waits for an update another thread already has in flight,
+            # rather than polling again as soon as it is rescheduled.
+            helper.update_config(wait=True)
+        except Exception:
+            logger.exception(
+                "Failed to update AppConfig configuration %s", "/".join(key)
+            )
+        with self._condition:
+            if not self._stopping:
+                # After a failure, the helper's next poll time is backed off.
+                self._schedule_poll(key, _due_in(helper))
+
+
+def _due_in(helper: AppConfigHelper) -> float:
+    """Seconds until `helper` is next due to poll AppConfig."""
+    return max(0.0, helper._next_poll_time() - time.time())
+
+
+def _timed_update(helper: AppConfigHelper) -> float:
+    start = time.perf_counter()
+    helper.update_config()
+    return time.perf_counter() - start
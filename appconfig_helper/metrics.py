@@ -0,0 +1,190 @@
+"""
+Metrics for AppConfig Helper
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+Labels = Mapping[str, str]
+
+# Names of the metrics recorded by the helpers.
+SESSION_START_SECONDS = "appconfig_session_start_seconds"
+SESSION_RESTARTS = "appconfig_session_restarts_total"
+GET_CONFIGURATION_SECONDS = "appconfig_get_latest_configuration_seconds"
+POLLS = "appconfig_polls_total"
+PARSE_SECONDS = "appconfig_parse_seconds"
+PAYLOAD_BYTES = "appconfig_payload_bytes"
+LAST_UPDATE_TIMESTAMP = "appconfig_last_update_timestamp_seconds"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PAYLOAD_BUCKETS = (1024.0, 16384.0, 65536.0, 262144.0, 1048576.0, 2097152.0)
+
+
+class MetricsSink:
+    """
+    Receives measurements from the helpers.
+
+    Subclass this to forward measurements to your metrics system, overriding
+    the methods you need; the defaults do nothing. Every measurement carries
+    `application`, `environment` and `profile` labels, and some carry more:
+
+    * `appconfig_session_start_seconds` (observe): StartConfigurationSession
+      latency
+    * `appconfig_session_restarts_total` (increment): sessions restarted after
+      an error from GetLatestConfiguration
+    * `appconfig_get_latest_configuration_seconds` (observe):
+      GetLatestConfiguration latency, including reading the body
+    * `appconfig_polls_total` (increment): polls, labelled with `result` of
+      `new`, `unchanged` (same content as before) or `empty`
+    * `appconfig_parse_seconds` (observe): parse time, labelled with
+      `content_type`; for configuration parsed as it is read, this includes
+      reading the response
+    * `appconfig_payload_bytes` (observe): size of configuration received
+    * `appconfig_last_update_timestamp_seconds` (gauge): time of the last
+      successful poll; subtract it from the current time for the age of the
+      configuration being served
+
+    Methods are called on whichever thread is updating the configuration, so
+    must be thread safe.
+    """
+
+    def increment(self, name: str, value: float, labels: Labels) -> None:
+        """Add `value` to a counter."""
+
+    def observe(self, name: str, value: float, labels: Labels) -> None:
+        """Record a value in a histogram."""
+
+    def gauge(self, name: str, value: float, labels: Labels) -> None:
+        """Set a gauge."""
+
+
+class CallbackMetricsSink(MetricsSink):
+    """Passes every measurement to `callback`, which is called with the kind
+    of measurement ("increment", "observe" or "gauge"), the metric name, the
+    value and the labels."""
+
+    def __init__(self, callback: Callable[[str, str, float, Labels], None]) -> None:
+        self._callback = callback
+
+    def increment(self, name: str, value: float, labels: Labels) -> None:
+        self._callback("increment", name, value, labels)
+
+    def observe(self, name: str, value: float, labels: Labels) -> None:
+        self._callback("observe", name, value, labels)
+
+    def gauge(self, name: str, value: float, labels: Labels) -> None:
+        self._callback("gauge", name, value, labels)
+
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+
+class PrometheusMetricsSink(MetricsSink):
+    """
+    Keeps measurements in memory and renders them in the Prometheus text
+    exposition format, which is also accepted by OpenMetrics scrapers.
+
+    Serve the output of `render()` from your metrics endpoint. `buckets`
+    maps metric names to histogram bucket boundaries, overriding the
+    defaults.
+    """
+
+    def __init__(self, buckets: Optional[Mapping[str, Sequence[float]]] = None) -> None:
+        self._buckets: Dict[str, Sequence[float]] = {PAYLOAD_BYTES: PAYLOAD_BUCKETS}
+        self._buckets.update(buckets or {})
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        self._gauges: Dict[_Key, float] = {}
+        self._histograms: Dict[_Key, _Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Labels) -> _Key:
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name: str, value: float, labels: Labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+                histogram = self._histograms[key] = _Histogram(buckets)
+            index = bisect.bisect_left(histogram.buckets, value)
+            if index < len(histogram.counts):
+                histogram.counts[index] += 1
+            histogram.count += 1
+            histogram.total += value
+
+    def gauge(self, name: str, value: float, labels: Labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def render(self) -> str:
+        """Return all measurements in the Prometheus text format."""
+        lines: List[str] = []
+        with self._lock:
+            self._render_simple(lines, "counter", self._counters)
+            self._render_simple(lines, "gauge", self._gauges)
+            typed = set()
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    bucket_labels = labels + (("le", _format_value(bound)),)
+                    lines.append(
+                        f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+                    )
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} "
+                    f"{histogram.count}"
+                )
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+                lines.append(
+                    f"{name}_sum{_format_labels(labels)} "
+                    f"{_format_value(histogram.total)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_simple(
+        lines: List[str], metric_type: str, values: Dict[_Key, float]
+    ) -> None:
+        typed = set()
+        for (name, labels), value in sorted(values.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} {metric_type}")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
@@ -0,0 +1,88 @@
+"""
+WSGI and ASGI middleware pinning one configuration version per request
+"""
+
+import contextlib
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from .appconfig_helper import _AppConfigHelperBase
+
+
+class _PinnedResponse:
+    """WSGI response body which keeps the configuration pinned until the
+    server has finished with it."""
+
+    def __init__(self, body: Iterable[bytes], stack: contextlib.ExitStack) -> None:
+        self._body = body
+        self._stack: Optional[contextlib.ExitStack] = stack
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._body)
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            if self._stack is not None:
+                self._stack.close()
+                self._stack = None
+
+
+class AppConfigWSGIMiddleware:
+    """
+    Pins the configuration of each of `helpers` for every request to the
+    WSGI application `app`, including while the response body is sent.
+
+    Within a request, `config`, `get()` and the other properties of each
+    helper return the same version however often they are read, and updates
+    are checked for at most once, when the request starts.
+    """
+
+    def __init__(self, app: Callable[..., Any], *helpers: _AppConfigHelperBase):
+        self._app = app
+        self._helpers = helpers
+
+    def __call__(
+        self, environ: Any, start_response: Callable[..., Any]
+    ) -> Iterable[bytes]:
+        stack = contextlib.ExitStack()
+        try:
+            for helper in self._helpers:
+                stack.enter_context(helper.pin())  # type: ignore[attr-defined]
+            body = self._app(environ, start_response)
+        except BaseException:
+            stack.close()
+            raise
+        return _PinnedResponse(body, stack)
+
+
+class AppConfigASGIMiddleware:
+    """
+    Pins the configuration of each of `helpers` for every HTTP and WebSocket
+    connection to the ASGI application `app`.
+
+    `AsyncAppConfigHelper` updates are awaited when a request starts if they
+    are due. An `AppConfigHelper` checks for updates by making the request on
+    the event loop thread, so use one which is refreshed in the background
+    (`background_refresh`, or `stale_while_revalidate`) to avoid blocking
+    the loop.
+    """
+
+    def __init__(self, app: Callable[..., Any], *helpers: _AppConfigHelperBase):
+        self._app = app
+        self._helpers = helpers
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self._app(scope, receive, send)
+            return
+        async with contextlib.AsyncExitStack() as stack:
+            for helper in self._helpers:
+                pin = helper.pin()  # type: ignore[attr-defined]
+                if hasattr(pin, "__aenter__"):
+                    await stack.enter_async_context(pin)
+                else:
+                    stack.enter_context(pin)
+            await self._app(scope, receive, send)
@@ -0,0 +1,82 @@
+"""
+Path based access to configuration values
+"""
+
+import functools
+from typing import Any, Dict, FrozenSet, Mapping, Sequence, Tuple, Union, cast
+
+CompiledPath = Tuple[Union[str, int], ...]
+Path = Union[str, CompiledPath]
+
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_path(path: Path) -> CompiledPath:
+    """Split a dotted path such as "limits.default.0" into its keys.
+
+    A tuple of keys can be given instead, for keys which contain dots."""
+    if isinstance(path, str):
+        return tuple(path.split("."))
+    return tuple(path)
+
+
+@functools.lru_cache(maxsize=None)
+def _field_names(cls: type) -> FrozenSet[str]:
+    """The fields of a dataclass or named tuple, which paths can name."""
+    fields = getattr(cls, "__dataclass_fields__", None)
+    if fields is None:
+        fields = getattr(cls, "_fields", ()) if issubclass(cls, tuple) else ()
+    return frozenset(fields)
+
+
+def resolve(config: Any, keys: CompiledPath, default: Any = None) -> Any:
+    """Follow `keys` through nested mappings and lists in `config`, and the
+    fields of dataclasses and named tuples.
+
+    Keys made of digits also match integer mapping keys and list indexes.
+    Returns `default` if any key is missing."""
+    node = config
+    for key in keys:
+        if isinstance(node, Mapping):
+            if key in node:
+                node = node[key]
+            elif isinstance(key, str) and key.isdigit() and int(key) in node:
+                node = node[int(key)]
+            else:
+                return default
+        elif key in _field_names(cast(type, type(node))):
+            node = getattr(node, cast(str, key))
+        elif isinstance(node, Sequence) and not isinstance(node, (str, bytes)):
+            try:
+                node = node[int(key)]
+            except (IndexError, ValueError):
+                return default
+        else:
+            return default
+    return node
+
+
+class PathIndex:
+    """
+    Resolves paths in one version of a configuration, remembering each result.
+
+    Only the paths which are actually read are indexed, so the cost scales
+    with the number of keys used rather than the size of the document. A new
+    index is built for each version of the configuration.
+    """
+
+    __slots__ = ("_config", "_resolved")
+
+    def __init__(self, config: Any) -> None:
+        self._config = config
+        self._resolved: Dict[Path, Any] = {}
+
+    def get(self, path: Path, default: Any = None) -> Any:
+        """Return the value at `path`, or `default` if it does not exist."""
+        try:
+            value = self._resolved[path]
+        except KeyError:
+            value = resolve(self._config, compile_path(path), _MISSING)
+            self._resolved[path] = value
+        return default if value is _MISSING else value
@@ -0,0 +1,21 @@
+"""
+pytest fixture running a local AppConfig Data emulator
+
+Enable it with `pytest_plugins = ["appconfig_helper.pytest_plugin"]` in
+your top level conftest.py.
+"""
+
+from typing import Iterator
+
+import pytest
+
+from .emulator import AppConfigDataEmulator
+
+
+@pytest.fixture
+def appconfig_emulator() -> Iterator[AppConfigDataEmulator]:
+    """An `AppConfigDataEmulator` serving on a free local port for the
+    duration of the test. Deploy configuration to it with `deploy()`, and
+    create a client for it with `client()`."""
+    with AppConfigDataEmulator() as emulator:
+        yield emulator
@@ -0,0 +1,144 @@
+"""
+Retry and circuit breaker policies for requests to AppConfig
+"""
+
+import random
+import threading
+import time
+from typing import Tuple, Type
+
+THROTTLING_ERROR_CODES = frozenset(
+    (
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "TooManyRequestsException",
+        "RequestLimitExceeded",
+    )
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling AppConfig while a circuit breaker is open."""
+
+
+def client_errors() -> Tuple[Type[Exception], ...]:
+    """The exceptions raised by botocore for a failed request.
+
+    botocore is only imported when this is called, so that it can be used in
+    an `except` clause without importing botocore up front."""
+    import botocore.exceptions
+
+    return (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError)
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """True if `error` is AppConfig asking the caller to slow down."""
+    import botocore.exceptions
+
+    if not isinstance(error, botocore.exceptions.ClientError):
+        return False
+    response = error.response
+    if response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+        return True
+    return response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 429
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """True if `error` is a failure to reach AppConfig, or a timeout."""
+    import botocore.exceptions
+
+    return isinstance(
+        error,
+        (botocore.exceptions.ConnectionError, botocore.exceptions.HTTPClientError),
+    )
+
+
+class RetryPolicy:
+    """
+    How failed requests to AppConfig are retried.
+
+    A request is tried at most `max_attempts` times. Throttling and
+    connection errors are retried with the same session token after a delay
+    chosen at random between zero and `base_delay * 2 ** retry`, capped at
+    `max_delay` ("full jitter"), so that many clients throttled at once do
+    not retry in step. Other errors from GetLatestConfiguration, such as an
+    expired token, start a new session, immediately the first time.
+    """
+
+    def __init__(
+        self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 20.0
+    ) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if base_delay < 0 or max_delay < 0:
+            raise ValueError("delays must not be negative")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before retry number `retry`, counting from 0."""
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+class CircuitBreaker:
+    """
+    Stops requests to AppConfig while it is failing.
+
+    After `failure_threshold` consecutive failed updates (once retries are
+    exhausted) the circuit opens, and updates raise `CircuitOpenError`
+    without calling AppConfig. After `reset_timeout` seconds one update is
+    let through: if it succeeds the circuit closes, otherwise it opens again.
+
+    One breaker can be shared between several helpers, so that they back off
+    together. It is thread safe.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        """One of `CLOSED`, `OPEN` or `HALF_OPEN`."""
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return self.CLOSED
+            if self._trial or self._reset_due():
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def _reset_due(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def before_call(self) -> None:
+        """Raise `CircuitOpenError` if a request should not be made now."""
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return
+            if self._trial or not self._reset_due():
+                raise CircuitOpenError("AppConfig circuit breaker is open")
+            self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
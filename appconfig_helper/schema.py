@@ -0,0 +1,236 @@
+"""
+Binding parsed configuration to typed objects
+"""
+
+import collections.abc
+import dataclasses
+import enum
+import functools
+import sys
+import typing
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+Converter = Callable[[Any, str], Any]
+
+_NONE_TYPE = type(None)
+
+
+class SchemaError(ValueError):
+    """Configuration does not match the schema it is bound to.
+
+    `path` is the dotted path of the value which does not match."""
+
+    def __init__(self, path: str, message: str) -> None:
+        super().__init__(f"{path or 'configuration'}: {message}")
+        self.path = path
+
+
+def _join(path: str, key: Any) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+
+def _describe(value: Any) -> str:
+    return type(value).__name__
+
+
+def _is_typed_dict(schema: Any) -> bool:
+    if not isinstance(schema, type) or not issubclass(schema, dict):
+        return False
+    return hasattr(schema, "__total__")
+
+
+def _is_named_tuple(schema: Any) -> bool:
+    if not isinstance(schema, type) or not issubclass(schema, tuple):
+        return False
+    return all(hasattr(schema, name) for name in ("_fields", "__annotations__"))
+
+
+def _scalar(schema: Type[Any]) -> Converter:
+    def convert(value: Any, path: str) -> Any:
+        # bool is a subclass of int, but true is not a number in a config
+        if type(value) is schema:
+            return value
+        if isinstance(value, schema) and not isinstance(value, bool):
+            return value
+        raise SchemaError(path, f"expected {schema.__name__}, got {_describe(value)}")
+
+    return convert
+
+
+def _float(value: Any, path: str) -> Any:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    raise SchemaError(path, f"expected float, got {_describe(value)}")
+
+
+def _any(value: Any, path: str) -> Any:
+    return value
+
+
+def _enum(schema: Type[enum.Enum]) -> Converter:
+    def convert(value: Any, path: str) -> Any:
+        try:
+            return schema(value)
+        except ValueError:
+            message = f"{value!r} is not a valid {schema.__name__}"
+            raise SchemaError(path, message) from None
+
+    return convert
+
+
+def _union(options: Tuple[Any, ...]) -> Converter:
+    optional = _NONE_TYPE in options
+    converters = [_compile(option) for option in options if option is not _NONE_TYPE]
+    names = " or ".join(getattr(option, "__name__", str(option)) for option in options)
+
+    def convert(value: Any, path: str) -> Any:
+        if value is None and optional:
+            return None
+        for converter in converters:
+            try:
+                return converter(value, path)
+            except SchemaError:
+                pass
+        raise SchemaError(path, f"expected {names}, got {_describe(value)}")
+
+    return convert
+
+
+def _sequence(item: Any, result: Callable[[Any], Any]) -> Converter:
+    convert_item = _compile(item)
+
+    def convert(value: Any, path: str) -> Any:
+        if not isinstance(value, (list, tuple)):
+            raise SchemaError(path, f"expected a list, got {_describe(value)}")
+        return result(
+            convert_item(element, _join(path, index))
+            for index, element in enumerate(value)
+        )
+
+    return convert
+
+
+def _mapping(key: Any, item: Any) -> Converter:
+    convert_key = _compile(key)
+    convert_item = _compile(item)
+
+    def convert(value: Any, path: str) -> Any:
+        if not isinstance(value, collections.abc.Mapping):
+            raise SchemaError(path, f"expected a mapping, got {_describe(value)}")
+        return {
+            convert_key(name, path): convert_item(element, _join(path, name))
+            for name, element in value.items()
+        }
+
+    return convert
+
+
+def _fields(hints: Dict[str, Any], required: Any) -> List[Tuple[str, Converter, bool]]:
+    return [
+        (sys.intern(name), _compile(hint), name in required)
+        for name, hint in hints.items()
+    ]
+
+
+def _object(
+    schema: Callable[..., Any], fields: List[Tuple[str, Converter, bool]]
+) -> Converter:
+    def convert(value: Any, path: str) -> Any:
+        if not isinstance(value, collections.abc.Mapping):
+            raise SchemaError(path, f"expected a mapping, got {_describe(value)}")
+        arguments = {}
+        for name, converter, required in fields:
+            if name in value:
+                arguments[name] = converter(value[name], _join(path, name))
+            elif required:
+                raise SchemaError(_join(path, name), "missing")
+        return schema(**arguments)
+
+    return convert
+
+
+def _dataclass(schema: Any) -> Converter:
+    hints = typing.get_type_hints(schema)
+    missing = dataclasses.MISSING
+    required = {
+        field.name
+        for field in dataclasses.fields(schema)
+        if field.default is missing and field.default_factory is missing
+    }
+    init_fields = {field.name for field in dataclasses.fields(schema) if field.init}
+    return _object(
+        schema,
+        _fields({name: hints[name] for name in hints if name in init_fields}, required),
+    )
+
+
+def _named_tuple(schema: Any) -> Converter:
+    hints = typing.get_type_hints(schema)
+    required = set(schema._fields) - set(getattr(schema, "_field_defaults", {}))
+    return _object(schema, _fields(hints, required))
+
+
+def _typed_dict(schema: Any) -> Converter:
+    hints = typing.get_type_hints(schema)
+    required = getattr(
+        schema, "__required_keys__", set(hints) if schema.__total__ else set()
+    )
+    return _object(dict, _fields(hints, required))
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(schema: Any) -> Converter:
+    """Build the function which converts data to `schema`."""
+    if schema is Any or schema is object:
+        return _any
+    if schema is float:
+        return _float
+    if schema in (str, int, bool, bytes):
+        return _scalar(schema)
+    if schema is None or schema is _NONE_TYPE:
+        return _scalar(_NONE_TYPE)
+    if isinstance(schema, type) and issubclass(schema, enum.Enum):
+        return _enum(schema)
+    if dataclasses.is_dataclass(schema) and isinstance(schema, type):
+        return _dataclass(schema)
+    if _is_named_tuple(schema):
+        return _named_tuple(schema)
+    if _is_typed_dict(schema):
+        return _typed_dict(schema)
+
+    if schema in (list, set, frozenset):
+        return _sequence(Any, schema)
+    if schema is dict:
+        return _mapping(Any, Any)
+
+    origin = getattr(schema, "__origin__", None)
+    arguments = getattr(schema, "__args__", None) or (Any, Any)
+    if origin is typing.Union:
+        return _union(arguments)
+    if origin in (list, collections.abc.Sequence, collections.abc.Iterable):
+        return _sequence(arguments[0], list)
+    if origin in (set, collections.abc.Set):
+        return _sequence(arguments[0], set)
+    if origin is frozenset:
+        return _sequence(arguments[0], frozenset)
+    if origin is tuple and len(arguments) == 2 and arguments[1] is Ellipsis:
+        return _sequence(arguments[0], tuple)
+    if origin in (dict, collections.abc.Mapping):
+        return _mapping(arguments[0], arguments[1])
+    raise TypeError(f"Unsupported schema type {schema!r}")
+
+
+def compile_schema(schema: Any) -> Callable[[Any], Any]:
+    """Return a function which converts parsed configuration to `schema`.
+
+    `schema` is a dataclass, a `NamedTuple` or a `TypedDict`, whose fields
+    may be `str`, `int`, `float`, `bool`, an `Enum`, `Any`, `Optional` and
+    `Union` of these, lists, tuples, sets and dicts of them, or further
+    dataclasses, named tuples and typed dicts. Mappings become instances of
+    the classes, and typed dicts plain dicts; keys which are not fields are
+    ignored. The function raises `SchemaError` if the data does not match.
+    Raises TypeError if `schema` contains a type which is not supported.
+
+    The conversion for each schema is built once and reused."""
+    converter = _compile(schema)
+    return lambda data: converter(data, "")
@@ -0,0 +1,477 @@
+"""
+AppConfig configuration shared between processes on a host
+"""
+
+import functools
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .appconfig_helper import AppConfigHelper
+from .deserializers import deserialize
+from .snapshot import ConfigSnapshot
+
+if TYPE_CHECKING:
+    import boto3
+
+try:
+    import fcntl
+
+    fcntl_available = True
+except ImportError:
+    fcntl_available = False
+
+logger = logging.getLogger(__name__)
+
+# magic, layout version, generation, content length, content type length,
+# version label length, timestamp
+_HEADER = struct.Struct("<4sIQQHHd")
+_MAGIC = b"ACFG"
+_LAYOUT_VERSION = 1
+_GENERATION_OFFSET = 8
+_NO_VERSION_LABEL = 0xFFFF
+
+DEFAULT_CAPACITY = 4 * 1024 * 1024
+
+
+class SharedEntry(NamedTuple):
+    """A configuration as stored in a shared segment."""
+
+    content: bytes
+    content_type: str
+    version_label: Optional[str]
+    timestamp: float
+
+
+class SharedSegment:
+    """
+    A memory-mapped file holding one configuration, shared between processes.
+
+    Writes are protected by a sequence lock: the generation counter is odd
+    while a write is in progress, and readers retry if it changed while they
+    were reading. Only one process may write to a segment at a time.
+
+    `capacity` is the maximum size of the configuration content plus its
+    content type and version label, and only applies when the file is created.
+    """
+
+    def __init__(
+        self, path: Union[str, "os.PathLike[str]"], capacity: int = DEFAULT_CAPACITY
+    ) -> None:
+        self._path = os.fspath(path)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            size = os.fstat(fd).st_size
+            if size < _HEADER.size:
+                size = _HEADER.size + capacity
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        if self._mmap[:4] != _MAGIC:
+            _HEADER.pack_into(self._mmap, 0, _MAGIC, _LAYOUT_VERSION, 0, 0, 0, 0, 0.0)
+        elif _HEADER.unpack_from(self._mmap)[1] != _LAYOUT_VERSION:
+            raise ValueError(f"{self._path} has an unsupported layout version")
+
+    @property
+    def path(self) -> str:
+        """The path of the memory-mapped file."""
+        return self._path
+
+    @property
+    def capacity(self) -> int:
+        """The space available for configuration data, in bytes."""
+        return len(self._mmap) - _HEADER.size
+
+    @property
+    def generation(self) -> int:
+        """Incremented by two each time a configuration is written."""
+        return int(struct.unpack_from("<Q", self._mmap, _GENERATION_OFFSET)[0])
+
+    def close(self) -> None:
+        """Unmap the segment."""
+        self._mmap.close()
+
+    def write(self, entry: SharedEntry) -> int:
+        """Store a configuration, returning the new generation."""
+        content_type = entry.content_type.encode("utf-8")
+        if entry.version_label is None:
+            version_label = b""
+            version_label_length = _NO_VERSION_LABEL
+        else:
+            version_label = entry.version_label.encode("utf-8")
+            version_label_length = len(version_label)
+        data = content_type + version_label + entry.content
+        if len(data) > self.capacity:
+            raise ValueError(
+                f"Configuration of {len(data)} bytes exceeds the shared segment "
+                f"capacity of {self.capacity} bytes"
+            )
+        generation = self.generation
+        if generation % 2:
+            # A previous writer died part way through a write.
+            generation += 1
+        struct.pack_into("<Q", self._mmap, _GENERATION_OFFSET, generation + 1)
+        start, end = _HEADER.size, _HEADER.size + len(data)
+        self._mmap[start:end] = data
+        _HEADER.pack_into(
+            self._mmap,
+            0,
+            _MAGIC,
+            _LAYOUT_VERSION,
+            generation + 1,
+            len(entry.content),
+            len(content_type),
+            version_label_length,
+            entry.timestamp,
+        )
+        struct.pack_into("<Q", self._mmap, _GENERATION_OFFSET, generation + 2)
+        return generation + 2
+
+    def read(self, retries: int = 100) -> Tuple[int, Optional[SharedEntry]]:
+        """Return the current generation and configuration.
+
+        The configuration is None if nothing has been written yet. Raises
+        RuntimeError if a consistent copy could not be read."""
+        for _ in range(retries):
+            header = _HEADER.unpack_from(self._mmap)
+            generation = header[2]
+            if generation % 2:
+                time.sleep(0.0001)
+                continue
+            if generation == 0:
+                return 0, None
+            content_length, content_type_length, version_label_length = header[3:6]
+            timestamp = header[6]
+            has_version_label = version_label_length != _NO_VERSION_LABEL
+            if not has_version_label:
+                version_label_length = 0
+            start = _HEADER.size
+            end = start + content_type_length + version_label_length + content_length
+            data = self._mmap[start:end]
+            if self.generation != generation:
+                continue
+            content_type = data[:content_type_length].decode("utf-8")
+            version_label = (
+                data[content_type_length:][:version_label_length].decode("utf-8")
+                if has_version_label
+                else None
+            )
+            content_start = content_type_length + version_label_length
+            content = data[content_start:]
+            return generation, SharedEntry(
+                content, content_type, version_label, timestamp
+            )
+        raise RuntimeError(f"Unable to read a consistent copy of {self._path}")
+
+
+class _LeaderHelper(AppConfigHelper):
+    """The `AppConfigHelper` of the process calling AppConfig. `on_poll` is
+    called after each successful poll which did not bring a new version."""
+
+    def __init__(self, on_poll: Callable[[], None], *args: Any, **kwargs: Any):
+        self._on_poll = on_poll
+        super().__init__(*args, **kwargs)
+
+    def _handle_configuration_response(
+        self, response: Mapping[str, Any], body: Any
+    ) -> bool:
+        received = super()._handle_configuration_response(response, body)
+        if not received:
+            self._on_poll()
+        return received
+
+
+class SharedAppConfigHelper:
+    """
+    AWS AppConfig Helper which shares configuration between processes.
+
+    Useful for pre-fork servers such as gunicorn, where every worker process
+    needs the same configuration. All processes on the host using the same
+    `path` share a memory-mapped segment. One of them holds an exclusive
+    lock on `path` + ".lock" and is the only one which calls AppConfig; it
+    polls on a background thread, whether or not it reads `config` itself,
+    and writes each configuration to the segment after each poll, with the
+    time of the poll. The others only check the segment's generation counter
+    when `config` is read, and parse the configuration again only when it
+    has changed. If the process holding the lock exits, another one takes
+    over within `max_config_age` seconds. A process forked from the one
+    holding the lock does not inherit the role; it reads the segment like
+    the others and takes part in later elections.
+
+    If the configuration in the segment has not been written for more than
+    `max_config_age` plus `STALE_MARGIN` seconds, the process holding the
+    lock is taken to have stopped polling. Another process takes the lock if
+    it can; if not, each process reading `config` polls AppConfig itself
+    until the segment is written again.
+
+    `appconfig_application`, `appconfig_environment`, `appconfig_profile`,
+    `max_config_age`, `session` and `client` have the same meaning as for
+    `AppConfigHelper`. A client is only created by a process which calls
+    AppConfig.
+
+    `capacity` is the maximum size of configuration the segment can hold.
+
+    Requires a platform with `fcntl` (Linux, macOS and other Unix systems).
+    """
+
+    STALE_MARGIN = 15.0
+
+    def __init__(
+        self,
+        appconfig_application: str,
+        appconfig_environment: str,
+        appconfig_profile: str,
+        max_config_age: int,
+        *,
+        path: Union[str, "os.PathLike[str]"],
+        session: Optional["boto3.Session"] = None,
+        client: Optional[Any] = None,
+        capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        if not fcntl_available:
+            raise RuntimeError("SharedAppConfigHelper requires fcntl")
+        if max_config_age < 15:
+            raise ValueError("max_config_age must be at least 15 seconds")
+        self._appconfig_application = appconfig_application
+        self._appconfig_environment = appconfig_environment
+        self._appconfig_profile = appconfig_profile
+        self._max_config_age = max_config_age
+        self._session = session
+        self._client = client
+        self._segment = SharedSegment(path, capacity)
+        self._lock_path = self._segment.path + ".lock"
+        self._lock_fd = None  # type: Optional[int]
+        # The helper polling AppConfig, which is the leader's if this process
+        # holds the lock, or this process's own while the leader has stopped.
+        self._helper = None  # type: Optional[AppConfigHelper]
+        # The process which created the helper, as the helper, lock and client
+        # are all inherited by processes forked from it.
+        self._helper_pid = None  # type: Optional[int]
+        # The generation the leader last wrote, and the snapshot written, so
+        # that it need not parse its own configuration again.
+        self._written: Optional[Tuple[int, ConfigSnapshot]] = None
+        self._next_election = 0.0
+        self._generation = 0
+        self._timestamp = 0.0
+        self._config = None  # type: Union[None, Dict[Any, Any], str, bytes]
+        self._raw_config = None  # type: Union[None, bytes]
+        self._content_type = None  # type: Union[None, str]
+        self._version_label = None  # type: Optional[str]
+
+    def __enter__(self) -> "SharedAppConfigHelper":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def appconfig_profile(self) -> str:
+        """The profile in use."""
+        return self._appconfig_profile
+
+    @property
+    def appconfig_environment(self) -> str:
+        """The environment in use."""
+        return self._appconfig_environment
+
+    @property
+    def appconfig_application(self) -> str:
+        """The application in use."""
+        return self._appconfig_application
+
+    @property
+    def is_leader(self) -> bool:
+        """True if this process is the one calling AppConfig for the host."""
+        return self._lock_fd is not None and self._helper_pid == os.getpid()
+
+    @property
+    def generation(self) -> int:
+        """The generation of the shared segment the configuration came from."""
+        return self._generation
+
+    @property
+    def config(self) -> Union[None, Dict[Any, Any], str, bytes]:
+        """The application configuration content.
+
+        Updates the configuration from the shared segment first, if it has
+        changed."""
+        self.update_config()
+        return self._config
+
+    @property
+    def raw_config(self) -> Union[None, bytes]:
+        """The application configuration content retrieved from AppConfig.
+
+        Accessing this property does not trigger an update."""
+        return self._raw_config
+
+    @property
+    def content_type(self) -> Union[None, str]:
+        """The content type of the configuration retrieved from AppConfig."""
+        return self._content_type
+
+    @property
+    def version_label(self) -> Optional[str]:
+        """The version label of the configuration retrieved from AppConfig."""
+        return self._version_label
+
+    def update_config(self) -> bool:
+        """Bring the configuration up to date.
+
+        Reads the configuration from the shared segment if it has changed,
+        taking over calling AppConfig if no other process is doing so. The
+        leader waits for its first configuration from AppConfig; after that
+        it polls on its background thread.
+
+        Returns True if a new version of configuration was received."""
+        if self._helper is not None and self._helper_pid != os.getpid():
+            # Forked from the process which created the helper.
+            self._resign()
+            self._next_election = 0.0
+        if self.is_leader:
+            helper = self._helper
+            assert helper is not None
+            if helper.config_age is None:
+                helper.update_config(wait=True)
+            return self._read_segment()
+        changed = self._read_segment()
+        stalled = self._stalled()
+        if self._helper is not None and not stalled:
+            # The segment is being written again.
+            self._resign()
+        if time.time() >= self._next_election or (stalled and self._helper is None):
+            self._try_lead()
+            if self.is_leader:
+                return self.update_config() or changed
+        if stalled and self._helper is None:
+            logger.warning(
+                "AppConfig configuration in %s was last written %.0f seconds ago; "
+                "fetching it directly",
+                self._segment.path,
+                time.time() - self._timestamp,
+            )
+            self._helper = self._create_helper(AppConfigHelper)
+            self._helper_pid = os.getpid()
+        if self._helper is not None and self._helper.update_config():
+            snapshot = self._helper.snapshot
+            self._raw_config = snapshot.raw_config
+            self._content_type = snapshot.content_type
+            self._version_label = snapshot.version_label
+            self._config = snapshot.config
+            return True
+        return changed
+
+    def close(self) -> None:
+        """Release the shared segment, and leadership if this process holds it."""
+        self._resign()
+        self._segment.close()
+
+    def _stalled(self) -> bool:
+        """True if configuration has been written to the segment, but not
+        for long enough that the leader has stopped polling."""
+        if not self._timestamp:
+            return False
+        age = time.time() - self._timestamp
+        return age > self._max_config_age + self.STALE_MARGIN
+
+    def _read_segment(self) -> bool:
+        """Take the configuration from the segment, if it has been written
+        since it was last read. Returns True if it is a new version."""
+        if self._segment.generation == self._generation:
+            return False
+        generation, entry = self._segment.read()
+        if entry is None or generation == self._generation:
+            return False
+        self._generation = generation
+        self._timestamp = entry.timestamp
+        self._version_label = entry.version_label
+        received = (entry.content, entry.content_type)
+        if received == (self._raw_config, self._content_type):
+            # Written again after a poll which found no new version.
+            return False
+        written = self._written
+        if written is not None and written[0] == generation:
+            config = written[1].config
+        else:
+            config = deserialize(entry.content, entry.content_type)
+        self._raw_config = entry.content
+        self._content_type = entry.content_type
+        self._config = config
+        return True
+
+    def _resign(self) -> None:
+        # The lock is only released once every process sharing the file
+        # descriptor has closed it, so closing it in a forked child leaves
+        # the parent leading. The child has none of the parent's threads, so
+        # the helper's refresh thread is only stopped in the parent.
+        helper = self._helper
+        if helper is not None and self._helper_pid == os.getpid():
+            helper.stop_background_refresh()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self._helper = None
+        self._helper_pid = None
+
+    def _try_lead(self) -> None:
+        self._next_election = time.time() + self._max_config_age
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return
+        logger.debug("Process %d is now fetching AppConfig configuration", os.getpid())
+        self._resign()
+        self._lock_fd = fd
+        self._helper_pid = os.getpid()
+        helper = self._create_helper(functools.partial(_LeaderHelper, self._write))
+        helper.on_change(self._on_change)
+        self._helper = helper
+        helper.start_background_refresh()
+
+    def _create_helper(
+        self, factory: Callable[..., AppConfigHelper]
+    ) -> AppConfigHelper:
+        return factory(
+            self._appconfig_application,
+            self._appconfig_environment,
+            self._appconfig_profile,
+            self._max_config_age,
+            session=self._session,
+            client=self._client,
+        )
+
+    def _on_change(self, old: Any, new: Any, diff: Any) -> None:
+        self._write()
+
+    def _write(self) -> None:
+        """Write the leader's configuration to the segment; called by the
+        thread which polled AppConfig."""
+        helper = self._helper
+        if helper is None:
+            return
+        snapshot = helper.snapshot
+        generation = self._segment.write(
+            SharedEntry(
+                snapshot.raw_config or b"",
+                snapshot.content_type or "",
+                snapshot.version_label,
+                time.time(),
+            )
+        )
+        self._written = (generation, snapshot)
@@ -0,0 +1,56 @@
+"""
+Read-only configuration snapshots
+"""
+
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple, Optional
+
+
+class ConfigSnapshot(NamedTuple):
+    """One version of a configuration and its metadata.
+
+    Hold on to a snapshot to see a consistent configuration for the duration
+    of a request, even if a new version is received in the meantime."""
+
+    config: Any
+    raw_config: Optional[bytes]
+    content_type: Optional[str]
+    version_label: Optional[str]
+    config_digest: Optional[str]
+
+
+EMPTY_SNAPSHOT = ConfigSnapshot(None, None, None, None, None)
+
+
+def freeze(value: Any, previous: Any = None) -> Any:
+    """Return a read-only copy of parsed configuration data.
+
+    Mappings become `MappingProxyType` views of new dicts, lists become
+    tuples and sets become frozensets. Parts which are equal to the
+    corresponding part of `previous`, an earlier frozen version, are shared
+    with it rather than copied."""
+    if isinstance(value, Mapping):
+        previous_mapping = previous if isinstance(previous, MappingProxyType) else {}
+        frozen = {
+            key: freeze(item, previous_mapping.get(key)) for key, item in value.items()
+        }
+        if previous_mapping is previous and frozen.keys() == previous.keys():
+            if all(previous[key] is item for key, item in frozen.items()):
+                return previous
+        return MappingProxyType(frozen)
+    if isinstance(value, (list, tuple)):
+        previous_items = previous if isinstance(previous, tuple) else ()
+        items = tuple(
+            freeze(item, previous_items[index] if index < len(previous_items) else None)
+            for index, item in enumerate(value)
+        )
+        if previous_items is previous and len(items) == len(previous):
+            if all(item is old for item, old in zip(items, previous)):
+                return previous
+        return items
+    if isinstance(value, (set, frozenset)):
+        frozen_set = frozenset(value)
+        return previous if frozen_set == previous else frozen_set
+    if type(value) is type(previous) and value == previous:
+        return previous
+    return value
@@ -0,0 +1,100 @@
+"""
+Compare configuration parse time for each available deserializer backend.
+
+Run with `python benchmarks/deserializers.py`. Backends which are not
+installed (orjson, ujson, libyaml) are skipped.
+"""
+
+import argparse
+import json
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+import yaml
+
+
+def build_config(size: int) -> Dict[str, Any]:
+    """Build a nested configuration document of roughly `size` bytes of JSON."""
+    config = {}  # type: Dict[str, Any]
+    index = 0
+    # The length of json.dumps(config), kept up to date entry by entry
+    # rather than dumping the whole document again after each one.
+    length = len("{}")
+    while length < size:
+        key = f"tenant-{index}"
+        value = {
+            "enabled": index % 3 == 0,
+            "limits": {"requests": index * 10, "burst": index, "ratio": index / 7},
+            "regions": ["us-east-1", "eu-west-1", f"ap-south-{index % 3}"],
+            "description": f"Configuration for tenant number {index}",
+        }
+        if config:
+            length += len(", ")
+        length += len(json.dumps(key)) + len(": ") + len(json.dumps(value))
+        config[key] = value
+        index += 1
+    return config
+
+
+def json_backends() -> List[Tuple[str, Callable[[bytes], Any]]]:
+    backends = [("json", json.loads)]  # type: List[Tuple[str, Callable[[bytes], Any]]]
+    try:
+        import orjson
+
+        backends.append(("orjson", orjson.loads))
+    except ImportError:
+        pass
+    try:
+        import ujson
+
+        backends.append(("ujson", ujson.loads))
+    except ImportError:
+        pass
+    return backends
+
+
+def yaml_backends() -> List[Tuple[str, Callable[[bytes], Any]]]:
+    backends = [
+        ("pyyaml", lambda content: yaml.load(content, Loader=yaml.SafeLoader))
+    ]  # type: List[Tuple[str, Callable[[bytes], Any]]]
+    if hasattr(yaml, "CSafeLoader"):
+        backends.append(
+            ("libyaml", lambda content: yaml.load(content, Loader=yaml.CSafeLoader))
+        )
+    return backends
+
+
+def measure(parse: Callable[[bytes], Any], content: bytes, repeat: int) -> float:
+    """Return the best time in milliseconds to parse `content`."""
+    timer = timeit.Timer(lambda: parse(content))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="approximate document sizes in bytes",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'format':8} {'backend':8} {'size':>10} {'ms/parse':>10}")
+    for size in args.sizes:
+        config = build_config(size)
+        documents = [
+            ("json", json.dumps(config).encode("utf-8"), json_backends()),
+            ("yaml", yaml.safe_dump(config).encode("utf-8"), yaml_backends()),
+        ]
+        for name, content, backends in documents:
+            for backend, parse in backends:
+                elapsed = measure(parse, content, args.repeat)
+                print(f"{name:8} {backend:8} {len(content):>10} {elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Startup benchmarks: importing the package, creating a helper, and its first
+fetch, each measured in a new Python process.
+
+Run with `python benchmarks/startup.py`, or as part of `suite.py`. The first
+fetch creates its boto3 client from the environment, pointed at the local
+stand-in for the AppConfig Data API with `AWS_ENDPOINT_URL`, which needs
+botocore 1.31 or later.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict
+
+from stub_server import StubAppConfigData
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+NAMES = ("startup.import", "startup.construct", "startup.first_fetch")
+
+# Run in the child process; prints the time of each step in microseconds.
+SCRIPT = """
+import json, time
+start = time.perf_counter()
+from appconfig_helper import AppConfigHelper
+imported = time.perf_counter()
+helper = AppConfigHelper("Benchmark", "Benchmark", "Benchmark", 15)
+constructed = time.perf_counter()
+helper.update_config()
+fetched = time.perf_counter()
+assert helper.config == {"feature": {"enabled": True}}
+print(json.dumps({
+    "startup.import": (imported - start) * 1e6,
+    "startup.construct": (constructed - imported) * 1e6,
+    "startup.first_fetch": (fetched - constructed) * 1e6,
+}))
+"""
+
+
+def measure(stub: StubAppConfigData) -> Dict[str, float]:
+    """Run the startup steps once in a new process."""
+    env = dict(
+        os.environ,
+        AWS_ENDPOINT_URL=stub.endpoint_url,
+        AWS_ACCESS_KEY_ID="benchmark",
+        AWS_SECRET_ACCESS_KEY="benchmark",
+        AWS_DEFAULT_REGION="us-east-1",
+        PYTHONPATH=ROOT,
+    )
+    env.pop("AWS_PROFILE", None)
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    return json.loads(output)
+
+
+def run(stub: StubAppConfigData, pattern: str, rounds: int) -> Dict[str, float]:
+    """Return the best time of each startup step matching `pattern` over
+    `rounds` processes. No processes are started if none match."""
+    if not any(pattern in name for name in NAMES):
+        return {}
+    stub.bodies = [b'{"feature": {"enabled": true}}']
+    results = {}  # type: Dict[str, float]
+    for _ in range(rounds):
+        for name, value in measure(stub).items():
+            results[name] = min(value, results.get(name, value))
+    return {name: value for name, value in results.items() if pattern in name}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    with StubAppConfigData() as stub:
+        for name, value in run(stub, "", args.rounds).items():
+            print(f"{name:40} {value:>14.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Local stand-in for the AppConfig Data API, used by the benchmarks.
+"""
+
+import os
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from appconfig_helper.emulator import (  # noqa: E402
+    GET_CONFIGURATION,
+    AppConfigDataEmulator,
+)
+
+PROFILE = ("Benchmark", "Benchmark", "Benchmark")
+
+
+class StubAppConfigData(AppConfigDataEmulator):
+    """
+    An `AppConfigDataEmulator` serving the Benchmark/Benchmark/Benchmark
+    profile, which does not enforce poll intervals.
+
+    Each GetLatestConfiguration call deploys the next of `bodies` in turn,
+    cycling back to the start, before it is answered. An empty body deploys
+    nothing, so set a single empty body to simulate "no new version", or
+    several different bodies for a new version every poll.
+    """
+
+    def __init__(self, content_type: str = "application/json") -> None:
+        super().__init__(enforce_poll_interval=False)
+        self.content_type = content_type
+        self.bodies: List[bytes] = [b""]
+        self.deploy(*PROFILE, b"", content_type)
+
+    def __enter__(self) -> "StubAppConfigData":
+        self.start()
+        return self
+
+    def get_latest_configuration(self, token: str) -> Tuple[bytes, Dict[str, str]]:
+        with self._lock:
+            body = self.bodies[self.requests[GET_CONFIGURATION] % len(self.bodies)]
+        if body:
+            self.deploy(*PROFILE, body, self.content_type, version_label="v1")
+        return super().get_latest_configuration(token)
@@ -0,0 +1,213 @@
+"""
+Benchmarks for the helper's poll, parse and read paths.
+
+Requests are made over HTTP to a local stand-in for the AppConfig Data API,
+so results do not depend on the network. Run with:
+
+    python benchmarks/suite.py                      # print results
+    python benchmarks/suite.py --save base.json     # store a baseline
+    python benchmarks/suite.py --compare base.json  # fail on regressions
+
+Results are the best of several rounds, in microseconds per operation.
+Startup benchmarks run each round in a new process; see `startup.py`.
+Baselines are only comparable on the same machine, so to check a change,
+save a baseline from the unchanged code first. `baseline.json` holds the
+results of one full run of commit 2d8754e, as a reference.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import startup
+import yaml
+from deserializers import build_config
+from stub_server import StubAppConfigData
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from appconfig_helper import AppConfigHelper, FeatureFlags  # noqa: E402
+from appconfig_helper.deserializers import deserialize  # noqa: E402
+
+PAYLOAD_SIZES = [
+    ("1KB", 1024),
+    ("64KB", 64 * 1024),
+    ("512KB", 512 * 1024),
+    ("2MB", 2 * 1024 * 1024),
+]
+THREADS = 16
+
+Benchmark = Callable[[], Callable[[], Any]]
+
+
+def timed(operation: Callable[[], Any], rounds: int, min_time: float) -> float:
+    """Return the best time per call of `operation`, in microseconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    best = elapsed / number
+    gc.disable()
+    try:
+        for _ in range(rounds - 1):
+            start = time.perf_counter()
+            for _ in range(number):
+                operation()
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    return best * 1e6
+
+
+def _helper(stub: StubAppConfigData, **kwargs: Any) -> AppConfigHelper:
+    helper = AppConfigHelper(
+        "Benchmark", "Benchmark", "Benchmark", 15, client=stub.client(), **kwargs
+    )
+    stub.bodies = [b'{"feature": {"enabled": true}}']
+    helper.update_config(force_update=True)
+    return helper
+
+
+def benchmarks(stub: StubAppConfigData) -> Iterator[Tuple[str, Benchmark]]:
+    def read() -> Callable[[], Any]:
+        helper = _helper(stub)
+        return lambda: helper.config
+
+    def read_fetch_on_read() -> Callable[[], Any]:
+        helper = _helper(stub, fetch_on_read=True)
+        return lambda: helper.config
+
+    def read_get() -> Callable[[], Any]:
+        helper = _helper(stub)
+        return lambda: helper.get("feature.enabled")
+
+    def read_flag() -> Callable[[], Any]:
+        flags = FeatureFlags(_helper(stub))
+        return lambda: flags.is_enabled("feature")
+
+    def update_empty() -> Callable[[], Any]:
+        helper = _helper(stub)
+        stub.bodies = [b""]
+        return lambda: helper.update_config(force_update=True)
+
+    def update_changed() -> Callable[[], Any]:
+        helper = _helper(stub)
+        stub.bodies = [b'{"version": 1}', b'{"version": 2}']
+        return lambda: helper.update_config(force_update=True)
+
+    yield "read.config", read
+    yield "read.config_fetch_on_read", read_fetch_on_read
+    yield "read.get", read_get
+    yield "read.feature_flag", read_flag
+    yield "update.empty", update_empty
+    yield "update.changed", update_changed
+
+    formats = [
+        ("json", json.dumps, "application/json"),
+        ("yaml", yaml.safe_dump, "application/x-yaml"),
+    ]  # type: List[Tuple[str, Callable[[Any], Any], str]]
+    for label, size in PAYLOAD_SIZES:
+        for name, dump, content_type in formats:
+
+            def parse(
+                size: int = size,
+                dump: Callable[[Any], Any] = dump,
+                content_type: str = content_type,
+            ) -> Callable[[], Any]:
+                content = dump(build_config(size)).encode("utf-8")
+                return lambda: deserialize(content, content_type)
+
+            yield f"parse.{name}.{label}", parse
+
+    def threaded_read() -> Callable[[], Any]:
+        helper = _helper(stub, fetch_on_read=True)
+        reads = 10_000
+
+        def hammer() -> None:
+            for _ in range(reads):
+                helper.config
+
+        def run() -> None:
+            threads = [threading.Thread(target=hammer) for _ in range(THREADS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        return run
+
+    yield f"threads.read_fetch_on_read.{THREADS}x10000", threaded_read
+
+
+def run(pattern: str, rounds: int, min_time: float) -> Dict[str, float]:
+    results = {}
+    with StubAppConfigData() as stub:
+        for name, setup in benchmarks(stub):
+            if pattern not in name:
+                continue
+            results[name] = timed(setup(), rounds, min_time)
+            print(f"{name:40} {results[name]:>14.3f} us", flush=True)
+        for name, value in startup.run(stub, pattern, rounds).items():
+            results[name] = value
+            print(f"{name:40} {value:>14.3f} us", flush=True)
+    return results
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    """Return a description of each result slower than the baseline by more
+    than `threshold` times."""
+    regressions = []
+    for name, value in sorted(results.items()):
+        if name in baseline and value > baseline[name] * threshold:
+            regressions.append(
+                f"{name}: {value:.3f} us vs {baseline[name]:.3f} us "
+                f"({value / baseline[name]:.2f}x)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-k", dest="pattern", default="", help="only run matching")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--save", metavar="FILE", help="write results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare with FILE")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="slowdown factor treated as a regression (default 1.25)",
+    )
+    args = parser.parse_args()
+
+    results = run(args.pattern, args.rounds, args.min_time)
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+            output.write("\n")
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# type: ignore
+
+import io
+import json
+import threading
+import time
+
+import pytest
+
+pytest_plugins = ["appconfig_helper.pytest_plugin"]
+
+
+class FakeAppConfigClient:
+    """Thread safe stand-in for an appconfigdata client.
+
+    `bodies` are served in turn, one per poll, and the last one again once
+    they run out. A single callable instead is called with the number of the
+    poll, from 1, for each body. A body is bytes, a str, None for an empty
+    body, an exception to raise instead of responding, or anything else to
+    be served as JSON.
+
+    Polls wait for `release`, which is set to begin with, and raise `error`
+    if it is set; `entered` is set once a poll has started. Starting a
+    session raises the exceptions in `session_errors` in turn.
+
+    `sessions` records the arguments of each session started, `tokens` the
+    token of each poll, `polls` the number of polls, `profiles` the profile
+    of each poll which did not fail with `error`, and `streams` the response
+    bodies served. Override
+    `content()` to serve different content for each profile."""
+
+    def __init__(
+        self,
+        *bodies,
+        content_type="application/json",
+        poll=15,
+        version_label=lambda number: f"v{number}",
+        stream=io.BytesIO,
+        session_errors=(),
+        delay=0.0,
+    ):
+        if len(bodies) == 1 and callable(bodies[0]):
+            self.body = bodies[0]
+        else:
+            self.bodies = list(bodies) or [b"{}"]
+            self.body = lambda number: self.bodies[min(number, len(self.bodies)) - 1]
+        self.content_type = content_type
+        self.poll = poll
+        self.version_label = version_label
+        self.stream = stream
+        self.session_errors = list(session_errors)
+        self.delay = delay
+        self.error = None
+        self.release = threading.Event()
+        self.release.set()
+        self.entered = threading.Event()
+        self.lock = threading.Lock()
+        self.sessions = []
+        self.tokens = []
+        self.polls = 0
+        self.profiles = []
+        self.streams = []
+        self._token_profiles = {}
+
+    def start_configuration_session(self, **kwargs):
+        with self.lock:
+            self.sessions.append(kwargs)
+            if self.session_errors:
+                raise self.session_errors.pop(0)
+            token = f"session{len(self.sessions)}"
+            self._token_profiles[token] = kwargs["ConfigurationProfileIdentifier"]
+            return {"InitialConfigurationToken": token}
+
+    def get_latest_configuration(self, ConfigurationToken):
+        with self.lock:
+            self.tokens.append(ConfigurationToken)
+            self.polls += 1
+            token = f"token{self.polls}"
+            profile = self._token_profiles.get(ConfigurationToken)
+            self._token_profiles[token] = profile
+        self.entered.set()
+        self.release.wait(5)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        with self.lock:
+            self.profiles.append(profile)
+            number = self.profiles.count(profile)
+        body = self.content(profile, number)
+        if isinstance(body, Exception):
+            raise body
+        stream = self.stream(body)
+        with self.lock:
+            self.streams.append(stream)
+        return {
+            "Configuration": stream,
+            "ContentType": self.content_type,
+            "NextPollConfigurationToken": token,
+            "NextPollIntervalInSeconds": self.poll,
+            "VersionLabel": self.version_label(number),
+        }
+
+    def content(self, profile, number):
+        """The content of the `number`th poll of `profile`."""
+        body = self.body(number)
+        if body is None:
+            return b""
+        if isinstance(body, str):
+            return body.encode("utf-8")
+        if isinstance(body, (bytes, Exception)):
+            return body
+        return json.dumps(body).encode("utf-8")
+
+
+@pytest.fixture
+def fake_client():
+    """Creates a `FakeAppConfigClient`; call it with the same arguments."""
+    return FakeAppConfigClient
+
+
+@pytest.fixture
+def versioned_client():
+    """Creates a `FakeAppConfigClient` serving a new version, {"version": n},
+    on the nth poll. Keyword arguments are passed on."""
+
+    def create(**kwargs):
+        return FakeAppConfigClient(lambda number: {"version": number}, **kwargs)
+
+    return create
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for condition")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def wait_for():
+    """Waits until a callable returns true, failing the test after
+    `timeout` seconds."""
+    return _wait_for
@@ -0,0 +1,96 @@
+# type: ignore
+
+import json
+import threading
+
+import botocore.exceptions
+import pytest
+
+from appconfig_helper import (
+    AgentClient,
+    AppConfigHelper,
+    AppConfigManager,
+    RetryPolicy,
+)
+from appconfig_helper.emulator import AGENT_CONFIGURATION, AppConfigDataEmulator
+
+
+@pytest.fixture
+def emulator():
+    with AppConfigDataEmulator() as emulator:
+        yield emulator
+
+
+def test_helper_reads_from_agent(emulator):
+    emulator.deploy(
+        "My App", "Env", "Profile", json.dumps({"a": 1}), version_label="v1"
+    )
+    client = AgentClient(emulator.endpoint_url)
+    helper = AppConfigHelper("My App", "Env", "Profile", 15, client=client)
+    assert helper.update_config()
+    assert helper.config == {"a": 1}
+    assert helper.content_type == "application/json"
+    assert helper.version_label == "v1"
+
+    assert not helper.update_config(force_update=True)
+    emulator.deploy("My App", "Env", "Profile", "a: 2\n", "application/x-yaml")
+    assert helper.update_config(force_update=True)
+    assert helper.config == {"a": 2}
+    assert helper.version_label == "2"
+    assert emulator.requests[AGENT_CONFIGURATION] == 3
+    assert emulator.sessions == 0
+    # One connection was kept alive and reused for every request
+    assert len(client._pool) == 1
+
+
+def test_errors(emulator):
+    client = AgentClient(emulator.endpoint_url)
+    helper = AppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=client,
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0),
+    )
+    with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+        helper.update_config()
+    assert excinfo.value.response["Error"]["Code"] == "ResourceNotFoundException"
+
+    emulator.deploy("App", "Env", "Profile", b"{}")
+    emulator.inject_fault("ThrottlingException")
+    assert helper.update_config()
+    assert emulator.errors["ThrottlingException"] == 1
+
+
+def test_agent_unreachable():
+    emulator = AppConfigDataEmulator()
+    url = emulator.endpoint_url
+    emulator.stop()
+    client = AgentClient(url)
+    token = client.start_configuration_session(
+        ApplicationIdentifier="App",
+        EnvironmentIdentifier="Env",
+        ConfigurationProfileIdentifier="Profile",
+    )["InitialConfigurationToken"]
+    with pytest.raises(botocore.exceptions.EndpointConnectionError):
+        client.get_latest_configuration(ConfigurationToken=token)
+
+
+def test_default_url(monkeypatch):
+    monkeypatch.setenv("AWS_APPCONFIG_EXTENSION_HTTP_PORT", "2999")
+    assert AgentClient().url == "http://localhost:2999"
+    with pytest.raises(ValueError):
+        AgentClient("https://localhost:2772")
+
+
+def test_shared_between_threads(emulator):
+    emulator.deploy("App", "Env", "Profile", b'{"a": 1}')
+    manager = AppConfigManager(15, client=AgentClient(emulator.endpoint_url))
+    helpers = [manager.register("App", "Env", "Profile") for _ in range(20)]
+    threads = [threading.Thread(target=helper.update_config) for helper in helpers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(helper.config == {"a": 1} for helper in helpers)
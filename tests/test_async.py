@@ -0,0 +1,166 @@
+# type: ignore
+
+import asyncio
+import json
+import threading
+
+import boto3
+import botocore.exceptions
+import pytest
+
+from appconfig_helper import AsyncAppConfigHelper, RetryPolicy
+from appconfig_helper.emulator import GET_CONFIGURATION, START_SESSION
+
+
+@pytest.fixture
+def emulator(appconfig_emulator, mocker):
+    mocker.patch.object(boto3, "client", return_value=appconfig_emulator.client())
+    return appconfig_emulator
+
+
+def _deploy(emulator, content, version_label="v1"):
+    emulator.deploy(
+        "AppConfig-App",
+        "AppConfig-Env",
+        "AppConfig-Profile",
+        json.dumps(content),
+        version_label=version_label,
+    )
+
+
+def _helper():
+    return AsyncAppConfigHelper(
+        "AppConfig-App", "AppConfig-Env", "AppConfig-Profile", 15
+    )
+
+
+def test_async_update(emulator):
+    _deploy(emulator, {"hello": "world"})
+
+    async def main():
+        a = _helper()
+        assert await a.update_config()
+        assert not await a.update_config()
+        return a
+
+    a = asyncio.run(main())
+    assert a.config == {"hello": "world"}
+    assert a.content_type == "application/json"
+    assert a.version_label == "v1"
+    assert a._next_config_token is not None
+    assert a._poll_interval == 15
+    assert emulator.requests == {START_SESSION: 1, GET_CONFIGURATION: 1}
+
+
+def test_async_update_empty(emulator):
+    emulator.enforce_poll_interval = False
+    _deploy(emulator, {"hello": "world"})
+
+    async def main():
+        a = _helper()
+        assert await a.update_config()
+        assert not await a.update_config(force_update=True)
+        return a
+
+    a = asyncio.run(main())
+    assert a.config == {"hello": "world"}
+    assert emulator.requests == {START_SESSION: 1, GET_CONFIGURATION: 2}
+
+
+def test_async_update_bad_token_restarts_session(emulator):
+    _deploy(emulator, {"hello": "world"})
+
+    async def main():
+        a = _helper()
+        a._next_config_token = "expired"
+        assert await a.update_config()
+        return a
+
+    a = asyncio.run(main())
+    assert a.config == {"hello": "world"}
+    assert emulator.errors == {"BadRequestException": 1}
+    assert emulator.requests == {START_SESSION: 1, GET_CONFIGURATION: 2}
+
+
+def test_async_concurrent_updates_share_request(emulator):
+    _deploy(emulator, {"hello": "world"})
+
+    async def main():
+        a = _helper()
+        return a, await asyncio.gather(*(a.update_config() for _ in range(10)))
+
+    a, results = asyncio.run(main())
+    assert results == [True] * 10
+    assert emulator.requests == {START_SESSION: 1, GET_CONFIGURATION: 1}
+
+
+def test_async_concurrent_updates_share_error(appconfig_emulator):
+    appconfig_emulator.deploy("App", "Env", "Profile", b"{}")
+    appconfig_emulator.inject_fault("InternalServerException", count=20)
+    client = appconfig_emulator.client()
+
+    async def main():
+        a = AsyncAppConfigHelper(
+            "App",
+            "Env",
+            "Profile",
+            15,
+            client=client,
+            retry_policy=RetryPolicy(max_attempts=1),
+        )
+        return await asyncio.gather(
+            *(a.update_config() for _ in range(20)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(
+        isinstance(result, botocore.exceptions.ClientError) for result in results
+    )
+    assert appconfig_emulator.requests[GET_CONFIGURATION] == 0
+    assert sum(appconfig_emulator.requests.values()) == 1
+
+
+def test_async_parses_off_the_event_loop(emulator):
+    _deploy(emulator, {"hello": "world"})
+    threads = []
+
+    async def main():
+        a = _helper()
+        a.on_change(lambda old, new, diff: threads.append(threading.current_thread()))
+        await a.update_config()
+        return a
+
+    a = asyncio.run(main())
+    assert a.config == {"hello": "world"}
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_async_polling(emulator, mocker):
+    # Poll continuously rather than at the interval AppConfig Data returns
+    emulator.enforce_poll_interval = False
+    set_poll_interval = AsyncAppConfigHelper._set_poll_interval
+    mocker.patch.object(
+        AsyncAppConfigHelper,
+        "_set_poll_interval",
+        lambda self, interval: set_poll_interval(self, 0),
+    )
+    _deploy(emulator, {"hello": "world"})
+
+    async def wait_for(helper, config):
+        for _ in range(500):
+            if helper.config == config:
+                break
+            await asyncio.sleep(0.01)
+
+    async def main():
+        async with _helper() as a:
+            assert a.polling
+            await wait_for(a, {"hello": "world"})
+            _deploy(emulator, {"hello": "again"}, "v2")
+            await wait_for(a, {"hello": "again"})
+        assert not a.polling
+        return a
+
+    a = asyncio.run(main())
+    assert a.config == {"hello": "again"}
+    assert a.version_label == "v2"
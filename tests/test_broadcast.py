@@ -0,0 +1,125 @@
+# type: ignore
+
+import os
+import socket
+import time
+
+import pytest
+
+from appconfig_helper import AppConfigHelper, ConfigPublisher, ConfigSubscriber
+
+
+@pytest.fixture
+def make_helper(fake_client):
+    def create(*bodies, **kwargs):
+        return AppConfigHelper(
+            "App", "Env", "Profile", 15, client=fake_client(*bodies), **kwargs
+        )
+
+    return create
+
+
+def test_subscriber_receives_versions(tmp_path, wait_for, make_helper):
+    path = tmp_path / "config.sock"
+    helper = make_helper(b'{"a": {"b": 1}}', b'{"a": {"b": 2}}')
+    helper.update_config()
+    with ConfigPublisher(helper, path) as publisher:
+        assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+        with ConfigSubscriber(path) as subscriber:
+            assert subscriber.wait(5)
+            assert subscriber.config == {"a": {"b": 1}}
+            assert subscriber.get("a.b") == 1
+            assert subscriber.version_label == "v1"
+            assert subscriber.content_type == "application/json"
+            assert subscriber.config_digest == helper.config_digest
+            assert subscriber.raw_config == helper.raw_config
+            assert subscriber.connected
+            wait_for(lambda: publisher.subscribers == 1)
+
+            start = time.monotonic()
+            helper.update_config(force_update=True)
+            wait_for(lambda: subscriber.version_label == "v2")
+            assert time.monotonic() - start < 1.0
+            assert subscriber.get("a.b") == 2
+            assert subscriber.snapshot.config == {"a": {"b": 2}}
+    assert not path.exists()
+
+
+def test_subscriber_waits_for_first_version(tmp_path, make_helper):
+    path = tmp_path / "config.sock"
+    helper = make_helper(b'{"a": 1}')
+    with ConfigPublisher(helper, path):
+        with ConfigSubscriber(path) as subscriber:
+            assert not subscriber.wait(0.05)
+            assert subscriber.config is None
+            helper.update_config()
+            assert subscriber.wait(5)
+            assert subscriber.config == {"a": 1}
+
+
+def test_subscriber_reconnects(tmp_path, wait_for, make_helper):
+    path = tmp_path / "config.sock"
+    helper = make_helper(b'{"a": 1}', b'{"a": 2}')
+    helper.update_config()
+    with ConfigSubscriber(path, reconnect_interval=0.01) as subscriber:
+        assert not subscriber.wait(0.05)
+        with ConfigPublisher(helper, path):
+            assert subscriber.wait(5)
+        # Keeps the last version while the publisher is away
+        wait_for(lambda: not subscriber.connected)
+        assert subscriber.config == {"a": 1}
+        helper.update_config(force_update=True)
+        with ConfigPublisher(helper, path):
+            wait_for(lambda: subscriber.config == {"a": 2})
+
+
+def test_rollback_is_published(tmp_path, wait_for, make_helper):
+    path = tmp_path / "config.sock"
+    helper = make_helper(b'{"a": 1}', b'{"a": 2}', history_size=2)
+    helper.update_config()
+    helper.update_config(force_update=True)
+    with ConfigPublisher(helper, path), ConfigSubscriber(path) as subscriber:
+        wait_for(lambda: subscriber.config == {"a": 2})
+        helper.rollback()
+        wait_for(lambda: subscriber.config == {"a": 1})
+
+
+def test_publisher_refuses_live_socket(tmp_path, make_helper):
+    path = tmp_path / "config.sock"
+    helper = make_helper(b"{}")
+    with ConfigPublisher(helper, path):
+        with pytest.raises(RuntimeError):
+            ConfigPublisher(helper, path)
+    # A socket left behind is replaced
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+    ConfigPublisher(helper, path).close()
+    # Anything else is left alone
+    path.touch()
+    with pytest.raises(FileExistsError):
+        ConfigPublisher(helper, path)
+    assert path.exists()
+    path.unlink()
+    with pytest.raises(ValueError):
+        ConfigPublisher(make_helper(b"{}", retain_raw_config=False), path)
+
+
+def test_publish_does_not_wait_for_subscribers(tmp_path, wait_for, make_helper):
+    path = tmp_path / "config.sock"
+    large = b'{"a": "%s"}' % (b"x" * 1_000_000)
+    helper = make_helper(b'{"a": ""}', large, large.replace(b"x", b"y"))
+    helper.update_config()
+    with ConfigPublisher(helper, path, send_timeout=0.5) as publisher:
+        # A subscriber which never reads what it is sent
+        stuck = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stuck.connect(str(path))
+        try:
+            wait_for(lambda: publisher.subscribers == 1)
+            start = time.monotonic()
+            helper.update_config(force_update=True)
+            helper.update_config(force_update=True)
+            assert time.monotonic() - start < 0.25
+            wait_for(lambda: publisher.subscribers == 0)
+        finally:
+            stuck.close()
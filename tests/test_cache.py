@@ -0,0 +1,91 @@
+# type: ignore
+
+import os
+import time
+
+import pytest
+
+from appconfig_helper import AppConfigHelper
+from appconfig_helper.cache import CacheEntry, FileCache
+
+
+def _helper(client, cache_dir, **kwargs):
+    return AppConfigHelper(
+        "App", "Env", "Profile/1", 15, client=client, cache_dir=cache_dir, **kwargs
+    )
+
+
+def test_file_cache_round_trip(tmp_path):
+    cache = FileCache(tmp_path / "cache")
+    assert cache.load("App", "Env", "Profile") is None
+    entry = CacheEntry(b"hello", "text/plain", "v1", 1234.5)
+    cache.store("App", "Env", "Profile", entry)
+    assert cache.load("App", "Env", "Profile") == entry
+    assert os.listdir(tmp_path / "cache") == ["App_Env_Profile.appconfig"]
+
+
+def test_file_cache_ignores_corrupt_file(tmp_path):
+    cache = FileCache(tmp_path)
+    cache.store("App", "Env", "Profile", CacheEntry(b"hello", "text/plain", None, 1))
+    path = cache.path("App", "Env", "Profile")
+    with open(path, "ab") as cache_file:
+        cache_file.write(b"garbage")
+    assert cache.load("App", "Env", "Profile") is None
+    with open(path, "wb") as cache_file:
+        cache_file.write(b"not a header\n")
+    assert cache.load("App", "Env", "Profile") is None
+
+
+def test_helper_loads_cache_without_fetching(tmp_path, fake_client):
+    first = _helper(fake_client(b'{"hello": "world"}'), tmp_path, fetch_on_init=True)
+    assert first.config == {"hello": "world"}
+    assert not first.loaded_from_cache
+
+    client = fake_client(session_errors=[RuntimeError("AppConfig unreachable")])
+    second = _helper(client, tmp_path, fetch_on_init=True)
+    assert not client.sessions and not client.polls
+    assert second.loaded_from_cache
+    assert second.config == {"hello": "world"}
+    assert second.raw_config == b'{"hello": "world"}'
+    assert second.content_type == "application/json"
+    assert second.version_label == "v1"
+    assert second.config_digest == first.config_digest
+
+
+def test_helper_refreshes_after_cache_load(tmp_path, fake_client):
+    _helper(fake_client(b'{"hello": "world"}'), tmp_path, fetch_on_init=True)
+
+    same = _helper(fake_client(b'{"hello": "world"}'), tmp_path)
+    config = same.config
+    assert not same.update_config()
+    assert same.config is config
+    assert not same.loaded_from_cache
+
+    changed = _helper(fake_client(b'{"hello": "again"}'), tmp_path)
+    assert changed.update_config()
+    assert changed.config == {"hello": "again"}
+    assert FileCache(tmp_path).load("App", "Env", "Profile/1").content == (
+        b'{"hello": "again"}'
+    )
+
+
+def test_cached_config_served_through_outage(tmp_path, fake_client):
+    _helper(fake_client(b'{"hello": "world"}'), tmp_path, fetch_on_init=True)
+
+    client = fake_client(session_errors=[RuntimeError("AppConfig down")] * 5)
+    helper = _helper(client, tmp_path, fetch_on_read=True, stale_if_error=300)
+    assert helper.config_age < 5
+    assert helper.config == {"hello": "world"}
+    assert len(client.sessions) == 1
+    assert helper.loaded_from_cache
+
+    # Too old for max_staleness, so reads raise
+    cache = FileCache(tmp_path)
+    entry = cache.load("App", "Env", "Profile/1")
+    cache.store("App", "Env", "Profile/1", entry._replace(timestamp=time.time() - 60))
+    stale = _helper(
+        client, tmp_path, fetch_on_read=True, stale_if_error=300, max_staleness=30
+    )
+    assert stale.config_age >= 60
+    with pytest.raises(RuntimeError):
+        stale.config
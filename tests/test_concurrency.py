@@ -0,0 +1,130 @@
+# type: ignore
+
+import threading
+import time
+
+import pytest
+
+from appconfig_helper import AppConfigHelper
+
+THREADS = 32
+
+
+@pytest.fixture
+def make_blocking_client(versioned_client):
+    """Creates a client whose GetLatestConfiguration blocks until released,
+    so that many threads pile up behind one update."""
+
+    def create():
+        client = versioned_client()
+        client.release.clear()
+        return client
+
+    return create
+
+
+def _run_threads(target, count=THREADS):
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target()
+        except Exception as error:
+            results[index] = error
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_single_flight_readers_do_not_wait(make_blocking_client):
+    client = make_blocking_client()
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+
+    leader = threading.Thread(target=helper.update_config)
+    leader.start()
+    assert client.entered.wait(5)
+
+    threads, results = _run_threads(helper.update_config)
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive()
+    assert results == [False] * THREADS
+
+    client.release.set()
+    leader.join(5)
+    assert len(client.sessions) == 1
+    assert client.polls == 1
+    assert helper.config == {"version": 1}
+
+
+def test_single_flight_one_call_per_interval(make_blocking_client):
+    client = make_blocking_client()
+    client.release.set()
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, fetch_on_read=True
+    )
+    barrier = threading.Barrier(THREADS)
+
+    def read():
+        barrier.wait()
+        return helper.config
+
+    for interval in range(1, 6):
+        threads, results = _run_threads(read)
+        for thread in threads:
+            thread.join(5)
+        assert client.polls == interval
+        assert helper.config == {"version": interval}
+        helper._last_update_time -= 15
+    assert len(client.sessions) == 1
+
+
+def test_single_flight_wait_returns_result(make_blocking_client):
+    client = make_blocking_client()
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+
+    leader = threading.Thread(target=helper.update_config)
+    leader.start()
+    assert client.entered.wait(5)
+    threads, results = _run_threads(lambda: helper.update_config(wait=True))
+    time.sleep(0.2)
+    assert results == [None] * THREADS
+
+    client.release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+    assert results == [True] * THREADS
+    assert client.polls == 1
+
+
+def test_single_flight_wait_raises_error(make_blocking_client):
+    client = make_blocking_client()
+    client.error = RuntimeError("boom")
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+
+    leader_error = []
+
+    def lead():
+        with pytest.raises(RuntimeError):
+            helper.update_config()
+        leader_error.append(True)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert client.entered.wait(5)
+    threads, results = _run_threads(lambda: helper.update_config(wait=True), 4)
+    time.sleep(0.2)
+
+    client.release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+    assert leader_error == [True]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert client.polls == 1
+
+    client.error = None
+    helper._retry_not_before -= 60
+    assert helper.update_config()
+    assert client.polls == 2
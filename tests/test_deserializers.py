@@ -0,0 +1,93 @@
+# type: ignore
+
+import json
+
+import pytest
+
+from appconfig_helper import (
+    AppConfigHelper,
+    deserializers,
+    register_deserializer,
+    unregister_deserializer,
+)
+
+
+@pytest.fixture
+def custom_deserializer():
+    register_deserializer("application/octet-stream", lambda content: content[::-1])
+    yield
+    unregister_deserializer("application/octet-stream")
+
+
+def test_builtin_deserializers():
+    assert deserializers.deserialize(b'{"a": [1, 2]}', "application/json") == {
+        "a": [1, 2]
+    }
+    assert deserializers.deserialize(b"a:\n  - 1\n", "application/x-yaml") == {"a": [1]}
+    assert deserializers.deserialize(b"hello", "text/plain") == "hello"
+    assert deserializers.deserialize(b"hello", "image/jpeg") == b"hello"
+
+
+def test_content_type_parameters_ignored():
+    assert deserializers.deserialize(
+        b'{"a": 1}', "application/json; charset=utf-8"
+    ) == {"a": 1}
+
+
+@pytest.fixture
+def fast_json():
+    yield deserializers.use_fast_json()
+    deserializers.use_fast_json(False)
+
+
+def test_stdlib_json_by_default():
+    assert deserializers.json_backend == "json"
+    assert deserializers.deserialize_json(b'{"a": 1}') == {"a": 1}
+    with pytest.raises(ValueError) as error:
+        deserializers.deserialize_json(b'{"a": 1,}')
+    assert isinstance(error.value.__context__, json.JSONDecodeError)
+
+
+def test_fast_json(fast_json):
+    assert deserializers.json_backend == fast_json
+    assert deserializers.deserialize_json(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    # Content the fast backend rejects is parsed with the standard library
+    config = deserializers.deserialize_json(b'{"a": NaN, "b": -Infinity}')
+    assert repr(config) == "{'a': nan, 'b': -inf}"
+    with pytest.raises(ValueError) as error:
+        deserializers.deserialize_json(b'{"a": 1,}')
+    assert isinstance(error.value.__context__, json.JSONDecodeError)
+    assert deserializers.use_fast_json(False) == "json"
+    assert deserializers.deserialize_json(b"123456789012345678901234567890") == (
+        123456789012345678901234567890
+    )
+
+
+def test_bad_yaml():
+    with pytest.raises(ValueError, match="line 3 column 4"):
+        deserializers.deserialize_yaml(b"a:\n- b\n  c: d\n")
+
+
+def test_missing_yaml(mocker):
+    mocker.patch.object(deserializers, "yaml_available", False)
+    with pytest.raises(RuntimeError):
+        deserializers.deserialize_yaml(b"a: b")
+
+
+def test_custom_deserializer(custom_deserializer, fake_client):
+    a = AppConfigHelper(
+        "AppConfig-App",
+        "AppConfig-Env",
+        "AppConfig-Profile",
+        15,
+        client=fake_client(b"olleh", content_type="application/octet-stream"),
+    )
+    assert a.update_config()
+    assert a.config == b"hello"
+    assert a.raw_config == b"olleh"
+
+
+def test_unregister_deserializer(custom_deserializer):
+    unregister_deserializer("application/octet-stream")
+    assert deserializers.get_deserializer("application/octet-stream") is None
+    assert deserializers.deserialize(b"olleh", "application/octet-stream") == (b"olleh")
@@ -0,0 +1,104 @@
+# type: ignore
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from appconfig_helper import AppConfigHelper
+from appconfig_helper.diff import ConfigDiff, diff_config
+from appconfig_helper.snapshot import freeze
+
+
+def test_diff_config():
+    old = {"a": {"b": 1, "c": [1, 2]}, "d": True, "e": 1}
+    new = {"a": {"b": 2, "c": [1, 2], "f": None}, "d": 1, "g": {}}
+    diff = diff_config(old, new)
+    assert diff == ConfigDiff(
+        added=frozenset({("a", "f"), ("g",)}),
+        removed=frozenset({("e",)}),
+        changed=frozenset({("a", "b"), ("d",)}),
+    )
+    assert diff.affects("a")
+    assert diff.affects("a", "b", "deeper")
+    assert not diff.affects("a", "c")
+    assert not diff.affects("h")
+
+
+def test_diff_non_mapping():
+    assert diff_config(None, {"a": 1}).changed == frozenset({()})
+    assert diff_config("x", "x") == ConfigDiff(frozenset(), frozenset(), frozenset())
+
+
+def test_diff_frozen():
+    old = freeze({"a": {"b": [1]}, "c": 1})
+    new = freeze({"a": {"b": [2]}, "c": 1}, old)
+    assert diff_config(old, new).paths == frozenset({("a", "b")})
+
+
+def test_on_change(fake_client):
+    a = AppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=fake_client(b'{"a": 1}', b'{"a": 1}', b'{"a": 2}'),
+    )
+    calls = []
+
+    @a.on_change
+    def record(old, new, diff):
+        calls.append((old, new, diff.paths))
+
+    @a.on_change
+    def fail(old, new, diff):
+        raise RuntimeError("listener failed")
+
+    assert a.update_config()
+    assert not a.update_config(force_update=True)
+    assert a.update_config(force_update=True)
+    assert calls == [
+        (None, {"a": 1}, frozenset({()})),
+        ({"a": 1}, {"a": 2}, frozenset({("a",)})),
+    ]
+
+    a.remove_on_change(record)
+    a.remove_on_change(fail)
+    assert a._change_listeners == ()
+
+
+def test_on_change_executor(fake_client):
+    a = AppConfigHelper("App", "Env", "Profile", 15, client=fake_client(b"{}"))
+    calls = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        a.on_change(lambda old, new, diff: calls.append(new), executor)
+        a.update_config()
+    assert calls == [{}]
+
+
+def test_on_change_executor_diffs_and_logs_there(mocker, caplog, fake_client):
+    a = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=fake_client({"a": 1}, {"a": 2})
+    )
+    threads = []
+
+    def diff(old, new):
+        threads.append(threading.current_thread())
+        return diff_config(old, new)
+
+    mocker.patch("appconfig_helper.appconfig_helper.diff_config", diff)
+
+    def fail(old, new, diff):
+        raise RuntimeError("callback failed")
+
+    calls = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        a.on_change(fail, executor)
+        a.on_change(lambda old, new, diff: calls.append(diff), executor)
+        with caplog.at_level(logging.ERROR):
+            a.update_config()
+            a.update_config(force_update=True)
+    assert [diff.changed for diff in calls] == [frozenset({()}), frozenset({("a",)})]
+    assert len(threads) == 2
+    assert threading.current_thread() not in threads
+    errors = [str(record.exc_info[1]) for record in caplog.records]
+    assert errors == ["callback failed"] * 2
@@ -0,0 +1,208 @@
+# type: ignore
+
+import json
+import threading
+
+import botocore.exceptions
+import pytest
+
+from appconfig_helper import AppConfigHelper, RetryPolicy
+from appconfig_helper.emulator import (
+    GET_CONFIGURATION,
+    START_SESSION,
+    AppConfigDataEmulator,
+    main,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+@pytest.fixture
+def emulator(clock):
+    with AppConfigDataEmulator(clock=clock) as emulator:
+        yield emulator
+
+
+def _start(client, interval=15):
+    return client.start_configuration_session(
+        ApplicationIdentifier="App",
+        EnvironmentIdentifier="Env",
+        ConfigurationProfileIdentifier="Profile",
+        RequiredMinimumPollIntervalInSeconds=interval,
+    )["InitialConfigurationToken"]
+
+
+def _error_code(excinfo):
+    return excinfo.value.response["Error"]["Code"]
+
+
+def test_versions_and_token_rotation(emulator, clock):
+    emulator.deploy("App", "Env", "Profile", b'{"a": 1}', version_label="v1")
+    client = emulator.client()
+    token = _start(client)
+
+    response = client.get_latest_configuration(ConfigurationToken=token)
+    assert response["Configuration"].read() == b'{"a": 1}'
+    assert response["ContentType"] == "application/json"
+    assert response["VersionLabel"] == "v1"
+    assert response["NextPollIntervalInSeconds"] == 15
+    next_token = response["NextPollConfigurationToken"]
+    assert next_token != token
+
+    with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+        client.get_latest_configuration(ConfigurationToken=token)
+    assert _error_code(excinfo) == "BadRequestException"
+
+    clock.now += 15
+    response = client.get_latest_configuration(ConfigurationToken=next_token)
+    assert response["Configuration"].read() == b""
+    next_token = response["NextPollConfigurationToken"]
+
+    emulator.deploy("App", "Env", "Profile", "a: 2\n", "application/x-yaml")
+    clock.now += 15
+    response = client.get_latest_configuration(ConfigurationToken=next_token)
+    assert response["Configuration"].read() == b"a: 2\n"
+    assert response["ContentType"] == "application/x-yaml"
+    assert emulator.sessions == 1
+    assert emulator.requests[GET_CONFIGURATION] == 4
+
+
+def test_poll_interval_enforced(emulator, clock):
+    emulator.deploy("App", "Env", "Profile", b"{}")
+    client = emulator.client()
+    token = _start(client, interval=30)
+    token = client.get_latest_configuration(ConfigurationToken=token)[
+        "NextPollConfigurationToken"
+    ]
+    clock.now += 29
+    with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+        client.get_latest_configuration(ConfigurationToken=token)
+    assert _error_code(excinfo) == "BadRequestException"
+    clock.now += 1
+    client.get_latest_configuration(ConfigurationToken=token)
+
+
+def test_delayed_deployment(emulator, clock):
+    emulator.deploy("App", "Env", "Profile", b"1")
+    assert emulator.deploy("App", "Env", "Profile", b"2", delay=60) == 2
+    client = emulator.client()
+    token = _start(client)
+    response = client.get_latest_configuration(ConfigurationToken=token)
+    assert response["Configuration"].read() == b"1"
+    clock.now += 60
+    response = client.get_latest_configuration(
+        ConfigurationToken=response["NextPollConfigurationToken"]
+    )
+    assert response["Configuration"].read() == b"2"
+
+
+def test_unknown_profile(emulator):
+    with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+        _start(emulator.client())
+    assert _error_code(excinfo) == "ResourceNotFoundException"
+
+
+def test_expired_sessions(emulator, clock):
+    emulator.deploy("App", "Env", "Profile", b"{}")
+    client = emulator.client()
+    token = _start(client)
+    emulator.expire_sessions()
+    with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+        client.get_latest_configuration(ConfigurationToken=token)
+    assert _error_code(excinfo) == "BadRequestException"
+
+    token = _start(client)
+    clock.now += emulator.token_ttl
+    with pytest.raises(botocore.exceptions.ClientError):
+        client.get_latest_configuration(ConfigurationToken=token)
+
+
+def test_injected_faults(emulator):
+    emulator.deploy("App", "Env", "Profile", b"{}")
+    emulator.inject_fault("InternalServerException", count=2, operation=START_SESSION)
+    client = emulator.client()
+    for _ in range(2):
+        with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+            _start(client)
+        assert _error_code(excinfo) == "InternalServerException"
+    token = _start(client)
+    assert emulator.errors["InternalServerException"] == 2
+    assert emulator.requests[START_SESSION] == 3
+
+    emulator.inject_fault("ResourceNotFoundException", operation=GET_CONFIGURATION)
+    with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+        client.get_latest_configuration(ConfigurationToken=token)
+    assert _error_code(excinfo) == "ResourceNotFoundException"
+    # The token was not used by the failed request
+    client.get_latest_configuration(ConfigurationToken=token)
+
+    with pytest.raises(ValueError):
+        emulator.inject_fault("NoSuchError")
+
+
+def test_rate_limit(clock):
+    with AppConfigDataEmulator(clock=clock, max_requests_per_second=2) as emulator:
+        emulator.deploy("App", "Env", "Profile", b"{}")
+        client = emulator.client()
+        _start(client)
+        _start(client)
+        with pytest.raises(botocore.exceptions.ClientError) as excinfo:
+            _start(client)
+        assert _error_code(excinfo) == "ThrottlingException"
+        clock.now += 1
+        _start(client)
+
+
+def test_helper_against_emulator(appconfig_emulator):
+    appconfig_emulator.enforce_poll_interval = False
+    appconfig_emulator.deploy("App", "Env", "Profile", json.dumps({"a": 1}))
+    helper = AppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=appconfig_emulator.client(),
+        retry_policy=RetryPolicy(base_delay=0),
+    )
+    assert helper.update_config()
+    assert helper.config == {"a": 1}
+    assert not helper.update_config(force_update=True)
+
+    appconfig_emulator.deploy("App", "Env", "Profile", json.dumps({"a": 2}))
+    assert helper.update_config(force_update=True)
+    assert helper.config == {"a": 2}
+
+    appconfig_emulator.expire_sessions()
+    assert not helper.update_config(force_update=True)
+    assert appconfig_emulator.sessions == 2
+
+
+def test_many_concurrent_sessions(appconfig_emulator):
+    appconfig_emulator.deploy("App", "Env", "Profile", b'{"a": 1}')
+    client = appconfig_emulator.client(max_pool_connections=20)
+    helpers = [
+        AppConfigHelper("App", "Env", "Profile", 15, client=client) for _ in range(100)
+    ]
+    threads = [threading.Thread(target=helper.update_config) for helper in helpers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(helper.config == {"a": 1} for helper in helpers)
+    assert appconfig_emulator.sessions == 100
+
+
+def test_cli_rejects_bad_deployment():
+    with pytest.raises(SystemExit):
+        main(["--port", "0", "--deploy", "App/Profile=config.json"])
@@ -0,0 +1,69 @@
+# type: ignore
+
+
+from appconfig_helper import AppConfigHelper, FeatureFlags
+
+FLAGS = {
+    "dark_mode": {"enabled": True, "theme": "midnight", "opacity": 0.8},
+    "checkout": {"enabled": False, "limit": 5},
+    "banner": {"enabled": True, "_variant": "blue", "colour": "#00f"},
+}
+
+
+def test_feature_flags(fake_client):
+    helper = AppConfigHelper("App", "Env", "Flags", 15, client=fake_client(FLAGS))
+    flags = FeatureFlags(helper)
+    assert not flags.is_enabled("dark_mode")
+    assert "dark_mode" not in flags
+
+    helper.update_config()
+    assert flags.is_enabled("dark_mode")
+    assert not flags.is_enabled("checkout")
+    assert not flags.is_enabled("missing")
+    assert flags.is_enabled("missing", default=True)
+    assert "checkout" in flags
+
+    assert flags.get_attribute("dark_mode", "theme") == "midnight"
+    assert flags.get_attribute("checkout", "limit") == 5
+    assert flags.get_attribute("checkout", "enabled") is None
+    assert flags.get_attribute("missing", "limit", 10) == 10
+    assert flags.get_attribute("banner", "_variant") is None
+
+    assert flags.get_variant("banner") == "blue"
+    assert flags.get_variant("dark_mode") is None
+    assert flags.get_variant("dark_mode", "default") == "default"
+
+
+def test_feature_flags_recompiled_on_new_version(fake_client):
+    updated = dict(FLAGS, checkout={"enabled": True, "limit": 10})
+    client = fake_client(FLAGS, None, FLAGS, updated)
+    helper = AppConfigHelper("App", "Env", "Flags", 15, client=client)
+    flags = FeatureFlags(helper)
+    helper.update_config()
+    index = flags._index
+
+    assert not helper.update_config(force_update=True)
+    assert not helper.update_config(force_update=True)
+    assert flags._index is index
+
+    assert helper.update_config(force_update=True)
+    assert flags._index is not index
+    assert flags.is_enabled("checkout")
+    assert flags.get_attribute("checkout", "limit") == 10
+
+    flags.close()
+    assert helper._change_listeners == ()
+
+
+def test_feature_flags_frozen_and_invalid_config(fake_client):
+    client = fake_client(FLAGS, ["not", "flags"])
+    helper = AppConfigHelper(
+        "App", "Env", "Flags", 15, client=client, frozen_config=True
+    )
+    helper.update_config()
+    flags = FeatureFlags(helper)
+    assert flags.is_enabled("banner")
+    assert flags.get_variant("banner") == "blue"
+
+    helper.update_config(force_update=True)
+    assert not flags.is_enabled("banner")
@@ -0,0 +1,148 @@
+# type: ignore
+
+import asyncio
+
+import pytest
+
+from appconfig_helper import AppConfigHelper, AsyncAppConfigHelper
+from appconfig_helper.history import ConfigHistory
+from appconfig_helper.snapshot import ConfigSnapshot
+
+
+def _snapshot(digest, label=None):
+    return ConfigSnapshot({}, b"", "application/json", label, digest)
+
+
+def _helper(client, **kwargs):
+    return AppConfigHelper("App", "Env", "Profile", 15, client=client, **kwargs)
+
+
+def test_history_evicts_oldest_by_count_and_bytes():
+    history = ConfigHistory(3, max_bytes=100)
+    for digest in "abc":
+        history.add(_snapshot(digest), 10)
+    history.add(_snapshot("d"), 10)
+    assert [s.config_digest for s in history.snapshots()] == ["d", "c", "b"]
+    history.add(_snapshot("e"), 85)
+    assert [s.config_digest for s in history.snapshots()] == ["e", "d"]
+    assert history.bytes == 95
+    # Receiving a version again makes it the most recent
+    history.add(_snapshot("d"), 10)
+    assert [s.config_digest for s in history.snapshots()] == ["d", "e"]
+    assert history.bytes == 95
+    history.add(_snapshot("f"), 101)
+    assert len(history) == 0 and history.bytes == 0
+
+
+def test_history_find():
+    history = ConfigHistory(5)
+    history.add(_snapshot("a", "v1"), 1)
+    history.add(_snapshot("b", "v2"), 1)
+    history.add(_snapshot("c", "v2"), 1)
+    assert history.find("v2").config_digest == "c"
+    assert history.find(digest="b").version_label == "v2"
+    assert history.find(before="c").config_digest == "b"
+    with pytest.raises(KeyError):
+        history.find(before="a")
+    with pytest.raises(KeyError):
+        history.find("v3")
+    with pytest.raises(ValueError):
+        ConfigHistory(0)
+
+
+def test_rollback_reuses_parsed_version(mocker, fake_client):
+    client = fake_client(b'{"a": 1}', b'{"a": 2}', b'{"a": 2}', b'{"a": 3}')
+    helper = _helper(client, history_size=5)
+    changes = []
+    helper.on_change(lambda old, new, diff: changes.append((old, new)))
+    helper.update_config(force_update=True)
+    first = helper.config
+    helper.update_config(force_update=True)
+    assert [s.version_label for s in helper.history] == ["v2", "v1"]
+
+    parse = mocker.spy(helper, "_parse")
+    snapshot = helper.rollback()
+    assert snapshot.version_label == "v1"
+    assert helper.config is first
+    assert helper.get("a") == 1
+    assert changes[-1] == ({"a": 2}, {"a": 1})
+    with pytest.raises(KeyError):
+        helper.rollback()
+
+    # The version rolled back from is not used again
+    assert not helper.update_config(force_update=True)
+    assert helper.config == {"a": 1}
+    # but a different one is
+    assert helper.update_config(force_update=True)
+    assert helper.config == {"a": 3}
+    assert parse.call_count == 1
+
+    # Received again as v3 and relabelled
+    helper.rollback("v3")
+    assert helper.config == {"a": 2}
+    assert helper.release()
+    assert helper.config == {"a": 3}
+    assert not helper.release()
+
+
+def test_rollback_hold(fake_client):
+    client = fake_client(b'{"a": 1}', b'{"a": 2}', b'{"a": 3}')
+    helper = _helper(client, history_size=5)
+    helper.update_config(force_update=True)
+    helper.update_config(force_update=True)
+    helper.rollback(hold=True)
+    assert helper.held
+    assert not helper.update_config(force_update=True)
+    assert helper.config == {"a": 1}
+    assert helper.history[0].config == {"a": 3}
+    assert helper.release()
+    assert not helper.held
+    assert helper.config == {"a": 3}
+
+
+def test_version_received_again_is_not_parsed(mocker, fake_client):
+    client = fake_client(b'{"a": 1}', b'{"a": 2}', b'{"a": 1}')
+    helper = _helper(client, history_size=2)
+    helper.update_config(force_update=True)
+    first = helper.config
+    helper.update_config(force_update=True)
+    parse = mocker.spy(helper, "_parse")
+    assert helper.update_config(force_update=True)
+    assert helper.config is first
+    assert helper.version_label == "v3"
+    assert parse.call_count == 0
+
+
+def test_rollback_requires_history(fake_client):
+    helper = _helper(fake_client(b"{}"))
+    assert helper.history == ()
+    with pytest.raises(RuntimeError):
+        helper.rollback()
+    with pytest.raises(ValueError):
+        _helper(fake_client(b"{}"), history_bytes=1000)
+    with pytest.raises(ValueError):
+        _helper(fake_client(b"{}"), history_size=-1)
+
+
+def test_history_bytes_bounds_retained_versions(fake_client):
+    bodies = [b'{"a": %d, "padding": "%s"}' % (n, b"x" * 100) for n in range(5)]
+    helper = _helper(fake_client(*bodies), history_size=10, history_bytes=300)
+    for _ in bodies:
+        helper.update_config(force_update=True)
+    assert len(helper.history) == 2
+    assert helper.config["a"] == 4
+
+
+def test_async_rollback(fake_client):
+    client = fake_client(b'{"a": 1}', b'{"a": 2}')
+    helper = AsyncAppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, history_size=2
+    )
+
+    async def run():
+        await helper.update_config(force_update=True)
+        await helper.update_config(force_update=True)
+
+    asyncio.run(run())
+    assert helper.rollback().config == {"a": 1}
+    assert helper.config == {"a": 1}
@@ -1,8 +1,12 @@
 # type: ignore
 
 import datetime
+import hashlib
 import io
 import json
+import subprocess
+import sys
+import threading
 import time
 
 import boto3
@@ -15,7 +19,7 @@ from botocore.response import StreamingBody
 from botocore.stub import Stubber
 from freezegun import freeze_time
 
-from appconfig_helper import AppConfigHelper
+from appconfig_helper import AppConfigHelper, RetryPolicy
 
 
 @pytest.fixture(autouse=True)
@@ -488,3 +492,198 @@ def test_version_label(appconfig_stub, mocker):
     a = AppConfigHelper("AppConfig-App", "AppConfig-Env", "AppConfig-Profile", 15)
     a.update_config()
     assert a.version_label == "v1"
+
+
+def test_appconfig_background_refresh(appconfig_stub, mocker, wait_for):
+    client, stub, _ = appconfig_stub
+    _add_start_stub(stub)
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response("hello", "text/plain", poll=0),
+        _build_request(),
+    )
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response("world", "text/plain", next_token="token9012", poll=60),
+        _build_request(next_token="token5678"),
+    )
+    mocker.patch.object(boto3, "client", return_value=client)
+    a = AppConfigHelper(
+        "AppConfig-App",
+        "AppConfig-Env",
+        "AppConfig-Profile",
+        15,
+        background_refresh=True,
+    )
+    try:
+        assert a.background_refresh_running
+        wait_for(lambda: a.config == "world")
+        assert a._next_config_token == "token9012"
+    finally:
+        a.stop_background_refresh()
+    assert not a.background_refresh_running
+
+
+def test_appconfig_background_refresh_context_manager(appconfig_stub, mocker, wait_for):
+    client, stub, _ = appconfig_stub
+    _add_start_stub(stub)
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response("hello", "text/plain"),
+        _build_request(),
+    )
+    mocker.patch.object(boto3, "client", return_value=client)
+    with AppConfigHelper(
+        "AppConfig-App", "AppConfig-Env", "AppConfig-Profile", 15, fetch_on_read=True
+    ) as a:
+        assert a.background_refresh_running
+        wait_for(lambda: a.config == "hello")
+    assert not a.background_refresh_running
+
+
+def test_appconfig_background_refresh_survives_errors(appconfig_stub, mocker, wait_for):
+    client, stub, _ = appconfig_stub
+    stub.add_client_error("get_latest_configuration")
+    stub.add_client_error("get_latest_configuration")
+    mocker.patch.object(boto3, "client", return_value=client)
+    a = AppConfigHelper(
+        "AppConfig-App",
+        "AppConfig-Env",
+        "AppConfig-Profile",
+        15,
+        retry_policy=RetryPolicy(max_attempts=2),
+    )
+    mocker.patch.object(
+        a,
+        "start_session",
+        side_effect=lambda: setattr(a, "_next_config_token", "token1234"),
+    )
+    a._next_config_token = "token1234"
+    a.start_background_refresh()
+    wait_for(lambda: a.start_session.called)
+    assert a.background_refresh_running
+    a.stop_background_refresh()
+    assert a.config is None
+
+
+def test_appconfig_background_refresh_restart_after_timeout(mocker, wait_for):
+    a = AppConfigHelper(
+        "AppConfig-App", "AppConfig-Env", "AppConfig-Profile", 15, client=object()
+    )
+    release = threading.Event()
+    threads = set()
+
+    def update_config():
+        threads.add(threading.current_thread())
+        release.wait()
+        return False
+
+    mocker.patch.object(a, "update_config", side_effect=update_config)
+    mocker.patch.object(a, "_next_poll_time", return_value=0.0)
+    a.start_background_refresh()
+    wait_for(lambda: len(threads) == 1)
+    (old,) = threads
+    a.stop_background_refresh(timeout=0.01)
+    assert old.is_alive()
+    a.start_background_refresh()
+    wait_for(lambda: len(threads) == 2)
+    release.set()
+    # The old thread stops; only the new one carries on
+    old.join(5)
+    assert not old.is_alive()
+    assert a.background_refresh_running
+    a.stop_background_refresh()
+
+
+def test_appconfig_background_refresh_with_fetch_on_read(
+    appconfig_stub, mocker, wait_for
+):
+    client, stub, _ = appconfig_stub
+    _add_start_stub(stub)
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response("hello", "text/plain"),
+        _build_request(),
+    )
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response("world", "text/plain", poll=15),
+        _build_request(next_token="token5678"),
+    )
+    mocker.patch.object(boto3, "client", return_value=client)
+    a = AppConfigHelper(
+        "AppConfig-App",
+        "AppConfig-Env",
+        "AppConfig-Profile",
+        15,
+        fetch_on_read=True,
+        background_refresh=True,
+    )
+    wait_for(lambda: a.raw_config == b"hello")
+    # Reads leave refreshing to the thread while it runs
+    a._last_update_time -= 60
+    assert a.config == "hello"
+    a.stop_background_refresh()
+    assert a.config == "world"
+
+
+def test_appconfig_unchanged_content_not_parsed(appconfig_stub, mocker):
+    client, stub, _ = appconfig_stub
+    _add_start_stub(stub)
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response({"hello": "world"}, "application/json"),
+        _build_request(),
+    )
+    stub.add_client_error(
+        "get_latest_configuration",
+        service_error_code="BadRequestException",
+    )
+    _add_start_stub(stub)
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response({"hello": "world"}, "application/json", version_label="v2"),
+        _build_request(),
+    )
+    mocker.patch.object(boto3, "client", return_value=client)
+    a = AppConfigHelper("AppConfig-App", "AppConfig-Env", "AppConfig-Profile", 15)
+    assert a.config_digest is None
+    assert a.update_config()
+    config = a.config
+    digest = a.config_digest
+    assert digest == hashlib.sha256(b'{"hello": "world"}').hexdigest()
+
+    parse = mocker.patch("appconfig_helper.appconfig_helper.deserialize")
+    assert not a.update_config(force_update=True)
+    parse.assert_not_called()
+    assert a.config is config
+    assert a.config_digest == digest
+    assert a.version_label == "v2"
+
+
+def test_lazy_imports():
+    script = (
+        "import sys\n"
+        "from appconfig_helper import AppConfigHelper\n"
+        "AppConfigHelper('App', 'Env', 'Profile', 15)\n"
+        "print(sorted({'boto3', 'botocore', 'yaml'} & set(sys.modules)))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, stdout=subprocess.PIPE
+    ).stdout
+    assert output.strip() == b"[]"
+
+
+def test_client_created_on_first_fetch(appconfig_stub, mocker):
+    client, stub, _ = appconfig_stub
+    _add_start_stub(stub)
+    stub.add_response(
+        "get_latest_configuration",
+        _build_response({"hello": "world"}, "application/json"),
+        _build_request(),
+    )
+    create_client = mocker.patch.object(boto3, "client", return_value=client)
+    a = AppConfigHelper("AppConfig-App", "AppConfig-Env", "AppConfig-Profile", 15)
+    create_client.assert_not_called()
+    assert a.update_config()
+    create_client.assert_called_once()
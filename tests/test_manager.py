@@ -0,0 +1,187 @@
+# type: ignore
+
+import time
+
+import boto3
+import pytest
+
+from appconfig_helper import (
+    AppConfigHelper,
+    AppConfigManager,
+    RetryPolicy,
+    WarmUpResult,
+)
+
+
+@pytest.fixture
+def profile_client(fake_client):
+    class ProfileClient(fake_client):
+        """Serves the profile name as a plain text configuration, with a
+        version number which increases every poll. Polls of the profiles in
+        `delays` take that much longer."""
+
+        def __init__(self, poll=30, delay=0.0):
+            super().__init__(
+                content_type="text/plain", poll=poll, version_label=str, delay=delay
+            )
+            self.delays = {}
+
+        def content(self, profile, number):
+            time.sleep(self.delays.get(profile, 0.0))
+            return f"{profile}#{number}".encode("utf-8")
+
+    return ProfileClient
+
+
+class _FixedDelay(RetryPolicy):
+    def delay(self, retry):
+        return 60.0
+
+
+def test_manager_shares_client(mocker):
+    create_client = mocker.patch.object(boto3, "client")
+    manager = AppConfigManager(15, max_workers=4)
+    first = manager.register("App", "Env", "Profile1")
+    second = manager.register("App", "Env", "Profile2", 30)
+
+    # The client is only created when it is first used
+    assert create_client.call_count == 0
+    manager.client.start_configuration_session
+    assert create_client.call_count == 1
+    config = create_client.call_args[1]["config"]
+    assert config.max_pool_connections == 4
+    assert config.retries == {"total_max_attempts": 1}
+    assert isinstance(first, AppConfigHelper)
+    assert first._client is second._client is manager.client
+    assert second._max_config_age == 30
+    assert manager.register("App", "Env", "Profile1") is first
+    assert manager.get("App", "Env", "Profile2") is second
+    with pytest.raises(KeyError):
+        manager.get("App", "Env", "Profile3")
+
+
+def test_manager_refresh_all_parallel(profile_client):
+    client = profile_client(delay=0.2)
+    manager = AppConfigManager(15, client=client, max_workers=10)
+    for index in range(10):
+        manager.register("App", "Env", f"Profile{index}")
+
+    start = time.monotonic()
+    results = manager.refresh_all()
+    elapsed = time.monotonic() - start
+
+    assert all(results.values())
+    assert len(results) == 10
+    assert elapsed < 1.0
+    for index in range(10):
+        assert manager.get("App", "Env", f"Profile{index}").config == (
+            f"Profile{index}#1"
+        )
+
+
+def test_manager_refresh_all_reports_failures(profile_client):
+    client = profile_client()
+    manager = AppConfigManager(15, client=client)
+    manager.register("App", "Env", "Profile1")
+    manager.register("App", "Env", "Profile2")
+    manager.get("App", "Env", "Profile2").start_session = None
+
+    results = manager.refresh_all()
+    assert results == {
+        ("App", "Env", "Profile1"): True,
+        ("App", "Env", "Profile2"): False,
+    }
+
+
+def test_manager_warm_up(profile_client):
+    client = profile_client(delay=0.2)
+    manager = AppConfigManager(15, client=client, max_workers=8)
+    profiles = [("App", "Env", f"Profile{index}") for index in range(8)]
+    profiles.append(("App", "Env", "Profile8", 30))
+
+    start = time.monotonic()
+    results = manager.warm_up(profiles, timeout=5)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.0
+    assert len(results) == 9
+    for (app, env, profile), result in results.items():
+        assert isinstance(result, WarmUpResult)
+        assert result.ready
+        assert result.error is None
+        assert 0.2 <= result.seconds < 1.0
+        assert result.helper is manager.get(app, env, profile)
+        assert result.helper.config == f"{profile}#1"
+    assert manager.get("App", "Env", "Profile8")._max_config_age == 30
+    assert manager.warm_up([]) == {}
+
+
+def test_manager_warm_up_deadline_and_failures(wait_for, profile_client):
+    client = profile_client()
+    client.delays["Slow"] = 0.5
+    manager = AppConfigManager(15, client=client)
+    manager.register("App", "Env", "Broken").start_session = None
+
+    start = time.monotonic()
+    results = manager.warm_up(
+        [("App", "Env", "Fast"), ("App", "Env", "Slow"), ("App", "Env", "Broken")],
+        timeout=0.2,
+    )
+    assert time.monotonic() - start < 0.4
+
+    assert results[("App", "Env", "Fast")].ready
+    slow = results[("App", "Env", "Slow")]
+    assert not slow.ready
+    assert slow.seconds is None
+    assert isinstance(slow.error, TimeoutError)
+    broken = results[("App", "Env", "Broken")]
+    assert not broken.ready
+    assert isinstance(broken.error, TypeError)
+
+    # The slow fetch carries on in the background
+    wait_for(lambda: slow.helper.config == "Slow#1")
+
+
+def test_manager_warm_up_queued_fetches_carry_on(wait_for, profile_client):
+    client = profile_client(delay=0.2)
+    manager = AppConfigManager(15, client=client, max_workers=1)
+    profiles = [("App", "Env", f"Profile{index}") for index in range(3)]
+    results = manager.warm_up(profiles, timeout=0.05)
+    assert not any(result.ready for result in results.values())
+
+    # Including those which had not started by the deadline
+    for (_, _, profile), result in results.items():
+        wait_for(lambda: result.helper.config == f"{profile}#1")
+
+
+def test_manager_start_polls_when_due(wait_for, profile_client):
+    client = profile_client()
+    manager = AppConfigManager(15, client=client, retry_policy=_FixedDelay())
+    manager.warm_up([("App", "Env", "Profile1"), ("App", "Env", "Profile2")])
+    broken = manager.register("App", "Env", "Broken")
+    broken.start_session = None
+    with manager:
+        wait_for(lambda: broken._failures == 1)
+        time.sleep(0.05)
+    # Profiles just fetched are not polled again, and a failing one waits
+    # for its backoff delay
+    assert client.polls == 2
+    assert len(client.sessions) == 2
+    assert broken._failures == 1
+
+
+def test_manager_background_polling(wait_for, profile_client):
+    client = profile_client(poll=0)
+    manager = AppConfigManager(15, client=client, max_workers=2)
+    helper = manager.register("App", "Env", "Profile1")
+    with manager:
+        assert manager.running
+        wait_for(lambda: client.profiles.count("Profile1") >= 3)
+        late = manager.register("App", "Env", "Profile2")
+        wait_for(lambda: late.config is not None)
+    assert not manager.running
+    polls = client.polls
+    time.sleep(0.05)
+    assert client.polls == polls
+    assert helper.config.startswith("Profile1#")
+    assert len(client.sessions) == 2
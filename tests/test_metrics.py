@@ -0,0 +1,95 @@
+# type: ignore
+
+import io
+
+import boto3
+import botocore.session
+from botocore.stub import Stubber
+
+from appconfig_helper import (
+    AppConfigHelper,
+    CallbackMetricsSink,
+    PrometheusMetricsSink,
+    metrics,
+)
+
+LABELS = {"application": "App", "environment": "Env", "profile": "Profile"}
+
+
+def _response(content, next_token):
+    return {
+        "Configuration": io.BytesIO(content),
+        "ContentType": "application/json",
+        "NextPollConfigurationToken": next_token,
+        "NextPollIntervalInSeconds": 30,
+    }
+
+
+def test_helper_records_metrics(mocker):
+    client = botocore.session.get_session().create_client(
+        "appconfigdata", region_name="us-east-1"
+    )
+    measurements = []
+    with Stubber(client) as stub:
+        stub.add_response(
+            "start_configuration_session", {"InitialConfigurationToken": "token1"}
+        )
+        stub.add_response("get_latest_configuration", _response(b"{}", "token2"))
+        stub.add_client_error("get_latest_configuration")
+        stub.add_response(
+            "start_configuration_session", {"InitialConfigurationToken": "token3"}
+        )
+        stub.add_response("get_latest_configuration", _response(b"{}", "token4"))
+        stub.add_response("get_latest_configuration", _response(b"", "token5"))
+        mocker.patch.object(boto3, "client", return_value=client)
+        a = AppConfigHelper(
+            "App",
+            "Env",
+            "Profile",
+            15,
+            metrics_sink=CallbackMetricsSink(
+                lambda *measurement: measurements.append(measurement)
+            ),
+        )
+        assert a.config_age is None
+        a.update_config()
+        a.update_config(force_update=True)
+        a.update_config(force_update=True)
+        stub.assert_no_pending_responses()
+
+    names = [(kind, name) for kind, name, _, _ in measurements]
+    assert names.count(("observe", metrics.SESSION_START_SECONDS)) == 2
+    assert names.count(("observe", metrics.GET_CONFIGURATION_SECONDS)) == 3
+    assert names.count(("increment", metrics.SESSION_RESTARTS)) == 1
+    assert names.count(("gauge", metrics.LAST_UPDATE_TIMESTAMP)) == 3
+    polls = [
+        labels["result"] for _, name, _, labels in measurements if name == metrics.POLLS
+    ]
+    assert polls == ["new", "unchanged", "empty"]
+    assert ("observe", metrics.PAYLOAD_BYTES, 2, LABELS) in measurements
+    parse = [m for m in measurements if m[1] == metrics.PARSE_SECONDS]
+    assert parse[0][3] == dict(LABELS, content_type="application/json")
+    assert all(labels["profile"] == "Profile" for _, _, _, labels in measurements)
+    assert 0 <= a.config_age < 5
+
+
+def test_prometheus_render():
+    sink = PrometheusMetricsSink(buckets={"latency": (0.1, 1.0)})
+    sink.increment("requests_total", 1, {"profile": 'a"b'})
+    sink.increment("requests_total", 2, {"profile": 'a"b'})
+    sink.gauge("timestamp", 12.5, {})
+    sink.observe("latency", 0.05, {"profile": "p"})
+    sink.observe("latency", 0.5, {"profile": "p"})
+    sink.observe("latency", 5, {"profile": "p"})
+    assert sink.render() == (
+        "# TYPE requests_total counter\n"
+        'requests_total{profile="a\\"b"} 3.0\n'
+        "# TYPE timestamp gauge\n"
+        "timestamp 12.5\n"
+        "# TYPE latency histogram\n"
+        'latency_bucket{profile="p",le="0.1"} 1\n'
+        'latency_bucket{profile="p",le="1.0"} 2\n'
+        'latency_bucket{profile="p",le="+Inf"} 3\n'
+        'latency_count{profile="p"} 3\n'
+        'latency_sum{profile="p"} 5.55\n'
+    )
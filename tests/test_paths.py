@@ -0,0 +1,60 @@
+# type: ignore
+
+import pytest
+
+from appconfig_helper import AppConfigHelper
+from appconfig_helper.paths import PathIndex, compile_path, resolve
+
+CONFIG = {
+    "limits": {"default": 10, "tenants": {"a.b": 20}},
+    "regions": ["us-east-1", {"name": "eu-west-1"}],
+    "ports": {8080: "http"},
+    "enabled": False,
+}
+
+
+def test_compile_path():
+    assert compile_path("a.b.0") == ("a", "b", "0")
+    assert compile_path(("a.b", 0)) == ("a.b", 0)
+
+
+@pytest.mark.parametrize(
+    "path,expected",
+    [
+        ("limits.default", 10),
+        (("limits", "tenants", "a.b"), 20),
+        ("regions.0", "us-east-1"),
+        ("regions.1.name", "eu-west-1"),
+        ("ports.8080", "http"),
+        ("enabled", False),
+        ("limits.missing", "default"),
+        ("regions.5", "default"),
+        ("regions.first", "default"),
+        ("enabled.deeper", "default"),
+    ],
+)
+def test_resolve(path, expected):
+    assert resolve(CONFIG, compile_path(path), "default") == expected
+
+
+def test_path_index_remembers_results():
+    index = PathIndex(CONFIG)
+    assert index.get("limits.default") == 10
+    assert index.get("limits.missing", 5) == 5
+    assert index.get("limits.missing") is None
+    assert set(index._resolved) == {"limits.default", "limits.missing"}
+
+
+def test_helper_get(fake_client):
+    a = AppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=fake_client(b'{"a": {"b": 1}}', b'{"a": {"b": 2}}'),
+        fetch_on_read=True,
+    )
+    assert a.get("a.b") == 1
+    assert a.get("a.c", 3) == 3
+    assert a.update_config(force_update=True)
+    assert a.get("a.b") == 2
@@ -0,0 +1,92 @@
+# type: ignore
+
+import asyncio
+import threading
+
+from freezegun import freeze_time
+
+from appconfig_helper import (
+    AppConfigASGIMiddleware,
+    AppConfigHelper,
+    AppConfigWSGIMiddleware,
+    AsyncAppConfigHelper,
+)
+
+
+def test_pin_reads_one_version(versioned_client):
+    client = versioned_client()
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, fetch_on_read=True
+    )
+    with freeze_time("2020-01-01 00:00:00") as frozen:
+        with helper.pin() as snapshot:
+            assert snapshot.config == {"version": 1}
+            frozen.tick(60)
+            assert helper.config == {"version": 1}
+            assert helper.get("version") == 1
+            assert helper.version_label == "v1"
+            assert helper.snapshot is snapshot
+            # Another thread is not pinned
+            seen = []
+            thread = threading.Thread(target=lambda: seen.append(helper.config))
+            thread.start()
+            thread.join()
+            assert seen == [{"version": 2}]
+            assert helper.config == {"version": 1}
+            with helper.pin() as inner:
+                assert inner is snapshot
+        assert client.polls == 2
+        assert helper.config == {"version": 2}
+        assert helper.version_label == "v2"
+
+
+def test_wsgi_middleware(versioned_client):
+    client = versioned_client()
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, fetch_on_read=True
+    )
+
+    def app(environ, start_response):
+        start_response("200 OK", [])
+
+        def body():
+            yield str(helper.config["version"]).encode()
+            yield helper.version_label.encode()
+
+        return body()
+
+    wrapped = AppConfigWSGIMiddleware(app, helper)
+    with freeze_time("2020-01-01 00:00:00") as frozen:
+        response = wrapped({}, lambda *args: None)
+        frozen.tick(60)
+        assert helper.update_config()
+        # Still pinned until the server closes the response
+        assert helper.version_label == "v1"
+        assert list(response) == [b"1", b"v1"]
+        response.close()
+    assert helper.version_label == "v2"
+
+
+def test_async_pin_and_asgi_middleware(versioned_client):
+    client = versioned_client()
+    helper = AsyncAppConfigHelper("App", "Env", "Profile", 15, client=client)
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(helper.config)
+        await helper.update_config(force_update=True)
+        seen.append(helper.config)
+
+    async def main():
+        async with helper.pin() as snapshot:
+            assert snapshot.config == {"version": 1}
+            await helper.update_config(force_update=True)
+            assert helper.config == {"version": 1}
+        assert helper.config == {"version": 2}
+
+        wrapped = AppConfigASGIMiddleware(app, helper)
+        await wrapped({"type": "http"}, None, None)
+        await wrapped({"type": "lifespan"}, None, None)
+
+    asyncio.run(main())
+    assert seen == [{"version": 2}, {"version": 2}, {"version": 3}, {"version": 4}]
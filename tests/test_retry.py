@@ -0,0 +1,200 @@
+# type: ignore
+
+import asyncio
+import time
+
+import botocore.exceptions
+import pytest
+
+from appconfig_helper import (
+    AppConfigHelper,
+    AsyncAppConfigHelper,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+)
+from appconfig_helper.retry import is_connection_error, is_throttling_error
+
+
+def _client_error(code, status=400, operation="GetLatestConfiguration"):
+    return botocore.exceptions.ClientError(
+        {
+            "Error": {"Code": code, "Message": code},
+            "ResponseMetadata": {"HTTPStatusCode": status},
+        },
+        operation,
+    )
+
+
+@pytest.fixture
+def make_client(fake_client):
+    """Creates a client which raises the queued errors, in order, before
+    succeeding."""
+
+    def create(errors=(), session_errors=()):
+        return fake_client(
+            *errors,
+            "hello",
+            content_type="text/plain",
+            poll=60,
+            session_errors=session_errors,
+        )
+
+    return create
+
+
+@pytest.fixture
+def sleep(mocker):
+    return mocker.patch("appconfig_helper.appconfig_helper.time.sleep")
+
+
+def test_error_classification():
+    assert is_throttling_error(_client_error("ThrottlingException"))
+    assert is_throttling_error(_client_error("Unknown", status=429))
+    assert not is_throttling_error(_client_error("BadRequestException"))
+    assert is_connection_error(
+        botocore.exceptions.EndpointConnectionError(endpoint_url="http://x")
+    )
+    assert not is_connection_error(_client_error("ThrottlingException"))
+
+
+def test_retry_policy_full_jitter():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    for retry in range(6):
+        delays = [policy.delay(retry) for _ in range(200)]
+        assert all(0.0 <= delay <= min(5.0, 2**retry) for delay in delays)
+        assert len(set(delays)) > 1
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+def test_throttling_retries_same_token(sleep, make_client):
+    client = make_client([_client_error("ThrottlingException")] * 2)
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+    assert helper.update_config()
+    assert helper.config == "hello"
+    assert len(client.sessions) == 1
+    assert client.tokens == ["session1"] * 3
+    assert sleep.call_count == 2
+    assert sleep.call_args_list[1][0][0] <= 0.4
+
+
+def test_throttling_gives_up(sleep, make_client):
+    client = make_client([_client_error("ThrottlingException")] * 3)
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+    with pytest.raises(botocore.exceptions.ClientError):
+        helper.update_config()
+    assert len(client.tokens) == 3
+
+
+def test_bad_token_restarts_session(sleep, make_client):
+    client = make_client([_client_error("BadRequestException")])
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+    assert helper.update_config()
+    assert client.tokens == ["session1", "session2"]
+    sleep.assert_called_once_with(0.0)
+
+
+def test_session_error_not_retried(sleep, make_client):
+    client = make_client(session_errors=[_client_error("ResourceNotFoundException")])
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+    with pytest.raises(botocore.exceptions.ClientError):
+        helper.update_config()
+    assert len(client.sessions) == 1
+    assert client.tokens == []
+
+
+def test_circuit_breaker(make_client):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = make_client([_client_error("ThrottlingException")] * 2)
+    helper = AppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=client,
+        retry_policy=RetryPolicy(max_attempts=1),
+        circuit_breaker=breaker,
+    )
+    for _ in range(2):
+        with pytest.raises(botocore.exceptions.ClientError):
+            helper.update_config(force_update=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        helper.update_config(force_update=True)
+    assert len(client.tokens) == 2
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert helper.update_config(force_update=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_half_open_failure():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_circuit_breaker_trial_fails_with_other_error(asynchronous, make_client):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    client = make_client([ValueError("malformed"), ValueError("malformed")])
+    cls = AsyncAppConfigHelper if asynchronous else AppConfigHelper
+    helper = cls("App", "Env", "Profile", 15, client=client, circuit_breaker=breaker)
+
+    def update():
+        result = helper.update_config(force_update=True)
+        return asyncio.run(result) if asynchronous else result
+
+    with pytest.raises(ValueError):
+        update()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        update()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert update()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_poll_jitter(make_client):
+    client = make_client()
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, poll_jitter=0.5
+    )
+    offsets = set()
+    for _ in range(20):
+        helper.update_config(force_update=True)
+        assert 0.0 <= helper._poll_offset <= 30.0
+        offsets.add(helper._poll_offset)
+    assert len(offsets) > 1
+    assert not helper._update_due(False)
+    helper._last_update_time -= 60 + helper._poll_offset
+    assert helper._update_due(False)
+
+    with pytest.raises(ValueError):
+        AppConfigHelper("App", "Env", "Profile", 15, client=client, poll_jitter=2)
+
+
+def test_async_throttling_retries(mocker, make_client):
+    client = make_client([_client_error("ThrottlingException")])
+    helper = AsyncAppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=client,
+        retry_policy=RetryPolicy(base_delay=0.01),
+    )
+    assert asyncio.run(helper.update_config())
+    assert client.tokens == ["session1", "session1"]
@@ -0,0 +1,143 @@
+# type: ignore
+
+import enum
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import pytest
+
+try:
+    from typing import TypedDict
+except ImportError:  # Python 3.7
+    TypedDict = None
+
+
+from appconfig_helper import AppConfigHelper, SchemaError, compile_schema
+
+
+class Tier(enum.Enum):
+    FREE = "free"
+    PAID = "paid"
+
+
+@dataclass(frozen=True)
+class Limits:
+    requests: int
+    burst: float = 1.0
+
+
+class Region(NamedTuple):
+    name: str
+    weight: float = 1.0
+
+
+@dataclass(frozen=True)
+class Config:
+    name: str
+    limits: Limits
+    regions: Tuple[Region, ...] = ()
+    tiers: Dict[str, Tier] = field(default_factory=dict)
+    owner: Optional[str] = None
+    tags: List[Union[int, str]] = field(default_factory=list)
+    extra: Any = None
+
+
+DOCUMENT = {
+    "name": "service",
+    "limits": {"requests": 100, "burst": 5},
+    "regions": [{"name": "us-east-1"}, {"name": "eu-west-1", "weight": 0.5}],
+    "tiers": {"acme": "paid"},
+    "tags": [1, "two"],
+    "extra": {"anything": [1, 2]},
+    "unknown": "ignored",
+}
+
+
+def test_bind():
+    config = compile_schema(Config)(DOCUMENT)
+    assert config == Config(
+        "service",
+        Limits(100, 5.0),
+        (Region("us-east-1"), Region("eu-west-1", 0.5)),
+        {"acme": Tier.PAID},
+        None,
+        [1, "two"],
+        {"anything": [1, 2]},
+    )
+    assert isinstance(config.limits.burst, float)
+
+
+@pytest.mark.parametrize(
+    "change, path",
+    [
+        ({"name": 1}, "name"),
+        ({"limits": {"burst": 1}}, "limits.requests"),
+        ({"limits": {"requests": True}}, "limits.requests"),
+        ({"limits": "none"}, "limits"),
+        ({"regions": [{"name": "a"}, {"weight": 1}]}, "regions.1.name"),
+        ({"tiers": {"acme": "gold"}}, "tiers.acme"),
+        ({"tags": [1.5]}, "tags.0"),
+    ],
+)
+def test_invalid(change, path):
+    with pytest.raises(SchemaError) as excinfo:
+        compile_schema(Config)({**DOCUMENT, **change})
+    assert excinfo.value.path == path
+    assert str(excinfo.value).startswith(path + ":")
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        compile_schema(Tuple[int, str])
+
+
+@pytest.mark.skipif(TypedDict is None, reason="requires typing.TypedDict")
+def test_typed_dict():
+    class Settings(TypedDict):
+        enabled: bool
+        limits: Limits
+
+    assert compile_schema(Settings)({"enabled": True, "limits": {"requests": 1}}) == {
+        "enabled": True,
+        "limits": Limits(1),
+    }
+    with pytest.raises(SchemaError):
+        compile_schema(Settings)({"enabled": True})
+
+
+def test_helper_rejects_invalid_version(fake_client):
+    bad = dict(DOCUMENT, limits={"requests": "many"})
+    client = fake_client(
+        json.dumps(DOCUMENT).encode("utf-8"),
+        json.dumps(bad).encode("utf-8"),
+        json.dumps(dict(DOCUMENT, name="renamed")).encode("utf-8"),
+    )
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client, schema=Config)
+    assert helper.update_config()
+    config = helper.config
+    assert config.limits.requests == 100
+    assert helper.get("limits.requests") == 100
+    assert helper.get("regions.1.weight") == 0.5
+    assert helper.get("limits.missing", "default") == "default"
+
+    with pytest.raises(SchemaError, match="limits.requests"):
+        helper.update_config(force_update=True)
+    assert helper.config is config
+    assert helper.version_label == "v1"
+
+    assert helper.update_config(force_update=True)
+    assert helper.config.name == "renamed"
+
+
+def test_schema_and_frozen_config_exclusive(fake_client):
+    with pytest.raises(ValueError):
+        AppConfigHelper(
+            "App",
+            "Env",
+            "Profile",
+            15,
+            client=fake_client(),
+            schema=Config,
+            frozen_config=True,
+        )
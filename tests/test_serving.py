@@ -0,0 +1,165 @@
+# type: ignore
+
+import time
+
+import pytest
+
+from appconfig_helper import AppConfigHelper, RetryPolicy
+
+
+def _helper(client, **kwargs):
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, fetch_on_read=True, **kwargs
+    )
+    assert helper.config == {"version": 1}
+    helper._last_update_time -= 20
+    return helper
+
+
+def test_fetch_on_read_raises_by_default(versioned_client):
+    client = versioned_client()
+    helper = _helper(client)
+    client.error = RuntimeError("unavailable")
+    with pytest.raises(RuntimeError):
+        helper.config
+
+
+def test_stale_if_error(versioned_client):
+    client = versioned_client()
+    helper = _helper(client, stale_if_error=60)
+    client.error = RuntimeError("unavailable")
+    assert helper.config == {"version": 1}
+    assert helper.get("version") == 1
+
+    helper._failing_since -= 61
+    with pytest.raises(RuntimeError):
+        helper.config
+
+    client.error = None
+    helper._retry_not_before -= 60
+    assert helper.config == {"version": 2}
+    assert helper._failing_since is None
+
+
+def test_stale_if_error_max_staleness(versioned_client):
+    client = versioned_client()
+    helper = _helper(client, stale_if_error=600, max_staleness=60)
+    client.error = RuntimeError("unavailable")
+    assert helper.config == {"version": 1}
+
+    helper._last_update_time -= 60
+    with pytest.raises(RuntimeError):
+        helper.config
+
+
+def test_failed_refresh_backs_off(caplog, versioned_client):
+    client = versioned_client()
+    helper = _helper(client, stale_if_error=60, retry_policy=RetryPolicy(1))
+    helper._retry_policy.delay = lambda retry: 10.0 * 2**retry
+    client.error = RuntimeError("unavailable")
+    for _ in range(1000):
+        assert helper.config == {"version": 1}
+    assert client.polls == 2
+    assert caplog.text.count("Serving stale AppConfig configuration") == 1
+
+    # Once out of the stale_if_error window, reads raise without a request
+    helper._failing_since -= 61
+    with pytest.raises(RuntimeError, match="unavailable"):
+        helper.config
+    assert client.polls == 2
+
+    # Each consecutive failure backs off for longer
+    helper._retry_not_before -= 10
+    with pytest.raises(RuntimeError):
+        helper.config
+    assert client.polls == 3
+    assert helper._retry_not_before - time.time() > 15
+
+    client.error = None
+    assert helper.update_config(force_update=True)
+    assert helper.config == {"version": 2}
+    assert helper._refresh_error is None
+
+
+def test_stale_while_revalidate(versioned_client):
+    client = versioned_client()
+    helper = _helper(client, stale_while_revalidate=True)
+    client.release.clear()
+
+    start = time.monotonic()
+    assert helper.config == {"version": 1}
+    assert helper.config == {"version": 1}
+    assert time.monotonic() - start < 1
+
+    client.release.set()
+    deadline = time.monotonic() + 5
+    while helper._config == {"version": 1} and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert helper.config == {"version": 2}
+    assert client.polls == 2
+
+
+def test_stale_while_revalidate_errors_logged(caplog, versioned_client):
+    client = versioned_client()
+    helper = _helper(client, stale_while_revalidate=True, max_staleness=60)
+    helper._retry_policy.delay = lambda retry: 10.0
+    client.error = RuntimeError("unavailable")
+
+    assert helper.config == {"version": 1}
+    deadline = time.monotonic() + 5
+    while "Revalidating" not in caplog.text and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "Revalidating AppConfig configuration failed" in caplog.text
+    # No more threads are started until the backoff is over
+    for _ in range(100):
+        assert helper.config == {"version": 1}
+    assert client.polls == 2
+
+    helper._last_update_time -= 60
+    with pytest.raises(RuntimeError):
+        helper.config
+
+
+def test_stale_while_revalidate_first_fetch_waits(versioned_client):
+    client = versioned_client()
+    helper = AppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=client,
+        fetch_on_read=True,
+        stale_while_revalidate=True,
+    )
+    assert helper.config == {"version": 1}
+
+
+def test_serving_policy_validation(versioned_client):
+    client = versioned_client()
+    with pytest.raises(ValueError):
+        AppConfigHelper("App", "Env", "Profile", 15, client=client, stale_if_error=30)
+    with pytest.raises(ValueError):
+        AppConfigHelper(
+            "App", "Env", "Profile", 15, client=client, stale_while_revalidate=True
+        )
+    with pytest.raises(ValueError):
+        AppConfigHelper(
+            "App",
+            "Env",
+            "Profile",
+            15,
+            client=client,
+            fetch_on_read=True,
+            stale_if_error=-1,
+        )
+    with pytest.raises(ValueError):
+        AppConfigHelper(
+            "App",
+            "Env",
+            "Profile",
+            30,
+            client=client,
+            fetch_on_read=True,
+            stale_if_error=60,
+            max_staleness=20,
+        )
@@ -0,0 +1,153 @@
+# type: ignore
+
+import os
+import time
+
+import pytest
+
+from appconfig_helper.shared import SharedAppConfigHelper, SharedEntry, SharedSegment
+
+
+def _helper(path, client):
+    return SharedAppConfigHelper("App", "Env", "Profile", 15, path=path, client=client)
+
+
+def test_segment_round_trip(tmp_path):
+    segment = SharedSegment(tmp_path / "segment", capacity=1024)
+    assert segment.read() == (0, None)
+    entry = SharedEntry(b"hello", "text/plain", None, 12.5)
+    assert segment.write(entry) == 2
+    assert segment.read() == (2, entry)
+
+    other = SharedSegment(tmp_path / "segment")
+    assert other.capacity == 1024
+    assert other.write(SharedEntry(b"world", "text/plain", "v2", 13.0)) == 4
+    assert segment.read() == (4, SharedEntry(b"world", "text/plain", "v2", 13.0))
+    with pytest.raises(ValueError):
+        segment.write(SharedEntry(b"x" * 1024, "text/plain", None, 14.0))
+    segment.close()
+    other.close()
+
+
+def test_one_process_fetches(tmp_path, fake_client):
+    path = tmp_path / "segment"
+    leader_client = fake_client(b'{"hello": "world"}', b'{"hello": "again"}')
+    follower_client = fake_client()
+    leader = _helper(path, leader_client)
+    follower = _helper(path, follower_client)
+
+    assert leader.config == {"hello": "world"}
+    assert leader.is_leader
+    assert follower.config == {"hello": "world"}
+    assert not follower.is_leader
+    assert follower.version_label == "v1"
+    assert follower.generation == leader.generation == 2
+    assert follower_client.polls == 0
+
+    config = follower.config
+    assert not follower.update_config()
+    assert follower.config is config
+
+    leader._helper.update_config(force_update=True)
+    assert follower.config == {"hello": "again"}
+    assert follower.version_label == "v2"
+    leader.close()
+    follower.close()
+
+
+def test_leadership_handover(tmp_path, fake_client):
+    path = tmp_path / "segment"
+    leader = _helper(path, fake_client(b'{"hello": "world"}'))
+    follower = _helper(path, fake_client(b'{"hello": "again"}'))
+    assert leader.config == {"hello": "world"}
+    assert follower.config == {"hello": "world"}
+    leader.close()
+
+    follower._next_election = 0.0
+    assert follower.config == {"hello": "again"}
+    assert follower.is_leader
+    assert follower.generation == 4
+    follower.close()
+
+
+def test_leader_polls_without_being_read(tmp_path, fake_client):
+    path = tmp_path / "segment"
+    leader_client = fake_client(
+        b'{"hello": "world"}', b'{"hello": "world"}', b'{"hello": "again"}', poll=0
+    )
+    leader = _helper(path, leader_client)
+    follower_client = fake_client()
+    follower = _helper(path, follower_client)
+    leader.update_config()
+    assert leader.is_leader
+    assert leader._helper.background_refresh_running
+
+    deadline = time.monotonic() + 5
+    while follower.config != {"hello": "again"}:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    assert follower_client.polls == 0
+    leader.close()
+    assert leader_client.polls >= 3
+    follower.close()
+
+
+def test_stalled_leader_is_bypassed(tmp_path, fake_client):
+    path = tmp_path / "segment"
+    follower_client = fake_client(b'{"hello": "again"}')
+    leader = _helper(path, fake_client(b'{"hello": "world"}'))
+    follower = _helper(path, follower_client)
+    assert leader.config == {"hello": "world"}
+    assert follower.config == {"hello": "world"}
+    assert not follower._stalled()
+
+    # The leader stops polling, but keeps the lock
+    leader._helper.stop_background_refresh()
+    stale = time.time() - 15 - SharedAppConfigHelper.STALE_MARGIN - 1
+    entry = SharedEntry(leader.raw_config, leader.content_type, "v1", stale)
+    leader._segment.write(entry)
+    assert follower.config == {"hello": "again"}
+    assert not follower.is_leader
+    assert follower_client.polls == 1
+    assert follower.config == {"hello": "again"}
+    assert follower_client.polls == 1
+
+    # Until the segment is written again
+    leader._write()
+    assert follower.config == {"hello": "world"}
+    assert follower._helper is None
+    leader.close()
+    follower.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_forked_child_does_not_inherit_leadership(tmp_path, fake_client):
+    path = tmp_path / "segment"
+    client = fake_client(b'{"hello": "world"}')
+    leader = _helper(path, client)
+    assert leader.config == {"hello": "world"}
+    assert leader.is_leader
+
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            polls = client.polls
+            if not leader.is_leader:
+                leader._helper._last_update_time = 0.0
+                leader.update_config()
+                resigned = leader._helper is None and leader._lock_fd is None
+                if resigned and client.polls == polls:
+                    status = 0 if leader.config == {"hello": "world"} else 1
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+    # The parent still holds the lock
+    assert leader.is_leader
+    other = _helper(path, fake_client())
+    other._try_lead()
+    assert not other.is_leader
+    other.close()
+    leader.close()
@@ -0,0 +1,66 @@
+# type: ignore
+
+from types import MappingProxyType
+
+import pytest
+
+from appconfig_helper import AppConfigHelper
+from appconfig_helper.snapshot import ConfigSnapshot, freeze
+
+
+def test_freeze():
+    frozen = freeze({"a": [1, {"b": 2}], "c": {"d"}, "e": {}, "f": []})
+    assert isinstance(frozen, MappingProxyType)
+    assert frozen == {"a": (1, {"b": 2}), "c": frozenset({"d"}), "e": {}, "f": ()}
+    assert isinstance(frozen["a"][1], MappingProxyType)
+    assert isinstance(frozen["e"], MappingProxyType)
+    with pytest.raises(TypeError):
+        frozen["a"] = 1
+    with pytest.raises(TypeError):
+        frozen["a"][1]["b"] = 3
+
+
+def test_freeze_shares_unchanged_parts():
+    first = freeze({"same": {"x": [1, 2]}, "changed": {"y": 1, "z": [3]}})
+    second = freeze({"same": {"x": [1, 2]}, "changed": {"y": 2, "z": [3]}}, first)
+    assert second["same"] is first["same"]
+    assert second["changed"] is not first["changed"]
+    assert second["changed"]["z"] is first["changed"]["z"]
+    assert freeze({"same": {"x": [1, 2]}, "changed": {"y": 2, "z": [3]}}, second) is (
+        second
+    )
+    assert freeze({"a": True}, freeze({"a": 1}))["a"] is True
+
+
+def test_helper_frozen_config(fake_client):
+    a = AppConfigHelper(
+        "App",
+        "Env",
+        "Profile",
+        15,
+        client=fake_client(b'{"a": {"b": [1]}}', b'{"a": {"b": [1]}, "c": 2}'),
+        frozen_config=True,
+    )
+    assert a.snapshot == ConfigSnapshot(None, None, None, None, None)
+    a.update_config()
+    first = a.snapshot
+    assert isinstance(a.config, MappingProxyType)
+    assert first.config is a.config
+    assert first.version_label == "v1"
+    assert first.raw_config == b'{"a": {"b": [1]}}'
+    assert a.get("a.b.0") == 1
+
+    a.update_config(force_update=True)
+    assert first.version_label == "v1"
+    assert first.config == {"a": {"b": (1,)}}
+    assert a.snapshot.version_label == "v2"
+    assert a.snapshot.config["a"] is first.config["a"]
+
+
+def test_helper_snapshot_without_frozen_config(fake_client):
+    a = AppConfigHelper("App", "Env", "Profile", 15, client=fake_client(b'{"a": [1]}'))
+    a.update_config()
+    assert a.snapshot.config is a.config
+    assert a.config == {"a": [1]}
+    assert a.snapshot.content_type == "application/json"
+    assert a.snapshot.config_digest == a.config_digest
@@ -0,0 +1,110 @@
+# type: ignore
+
+import hashlib
+import io
+
+import pytest
+import yaml
+from botocore.response import StreamingBody
+
+from appconfig_helper import AppConfigHelper
+
+CONFIG = {"items": [{"id": index, "name": f"item-{index}"} for index in range(5000)]}
+YAML_CONTENT = yaml.safe_dump(CONFIG).encode("utf-8")
+
+
+class _RecordingBody(io.BytesIO):
+    """Response body which records the size of each read."""
+
+    def __init__(self, content):
+        super().__init__(content)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+@pytest.fixture
+def make_client(fake_client):
+    def create(*contents, content_type="application/x-yaml"):
+        return fake_client(*contents, content_type=content_type, stream=_RecordingBody)
+
+    return create
+
+
+def test_yaml_parsed_while_reading(make_client):
+    client = make_client(YAML_CONTENT, YAML_CONTENT, b"")
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, retain_raw_config=False
+    )
+    assert helper.update_config()
+    assert helper.config == CONFIG
+    assert helper.raw_config is None
+    assert helper.config_digest == hashlib.sha256(YAML_CONTENT).hexdigest()
+    reads = client.streams[0].reads
+    assert len(reads) > 1
+    assert all(0 < size < len(YAML_CONTENT) for size in reads)
+
+    assert not helper.update_config(force_update=True)
+    assert not helper.update_config(force_update=True)
+
+
+def test_yaml_streaming_body(make_client):
+    client = make_client()
+    client.get_latest_configuration = lambda ConfigurationToken: {
+        "Configuration": StreamingBody(io.BytesIO(YAML_CONTENT), len(YAML_CONTENT)),
+        "ContentType": "application/x-yaml",
+        "NextPollConfigurationToken": "token1",
+        "NextPollIntervalInSeconds": 15,
+        "VersionLabel": "v1",
+    }
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, retain_raw_config=False
+    )
+    assert helper.update_config()
+    assert helper.config == CONFIG
+
+
+def test_streamed_yaml_error(make_client):
+    client = make_client(b"broken:\n    - yaml\n- content\n", YAML_CONTENT)
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, retain_raw_config=False
+    )
+    with pytest.raises(ValueError, match="line 3 column 1"):
+        helper.update_config()
+    assert helper._next_config_token == "token1"
+    assert helper.update_config(force_update=True)
+    assert helper.config == CONFIG
+
+
+def test_json_not_retained(make_client):
+    client = make_client(b'{"hello": "world"}', content_type="application/json")
+    helper = AppConfigHelper(
+        "App", "Env", "Profile", 15, client=client, retain_raw_config=False
+    )
+    assert helper.update_config()
+    assert helper.config == {"hello": "world"}
+    assert helper.raw_config is None
+    assert helper.snapshot.raw_config is None
+
+
+def test_raw_config_retained_by_default(make_client):
+    client = make_client(YAML_CONTENT)
+    helper = AppConfigHelper("App", "Env", "Profile", 15, client=client)
+    assert helper.update_config()
+    assert helper.raw_config == YAML_CONTENT
+    assert client.streams[0].reads == [-1]
+
+
+def test_retain_raw_config_required_for_cache(tmp_path, make_client):
+    with pytest.raises(ValueError):
+        AppConfigHelper(
+            "App",
+            "Env",
+            "Profile",
+            15,
+            client=make_client(),
+            cache_dir=tmp_path,
+            retain_raw_config=False,
+        )